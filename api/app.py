@@ -1,7 +1,7 @@
-from flask import Flask, jsonify
+import time
+import hmac
+from flask import Flask, Response, jsonify, request, g
 from flask_cors import CORS
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 from routes.v1.auth import bp as auth_bp
 from routes.v1.lotes import bp as lotes_bp
 from routes.v1.costos import bp as costos_bp
@@ -9,18 +9,21 @@ from routes.v1.tipos_costo import bp as tipos_costo_bp
 from routes.v1.analytics import bp as analytics_bp
 from routes.v1.produccion import bp as produccion_bp
 from routes.v1.prediccion import bp as prediccion_bp
+from routes.v1.jobs import bp as jobs_bp
+from routes.v1.export import bp as export_bp
 from routes.features import bp as features_bp
+from services import jobs_service
+from utils import http_cache, metrics, query_profiler, respuestas
+from utils.rate_limit import aplicar_costos, limiter
+from db import db
 from config import settings
 
-# 🔹 Crear la instancia del limiter fuera de la función
-limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=[settings.RATE_LIMIT]
-)
-
 def create_app():
     app = Flask(__name__)
-    CORS(app)
+    CORS(app, expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag"])
+
+    # JSON con orjson y compresion br/gzip (primer after_request: corre ultimo)
+    respuestas.instalar(app)
 
     # Seguridad básica
     @app.after_request
@@ -30,6 +33,52 @@ def create_app():
         resp.headers["X-Content-Type-Options"] = "nosniff"
         return resp
 
+    # Perfilado de consultas Prisma por request
+    if settings.PROFILER_ENABLED and query_profiler.instrumentar_prisma(db):
+        @app.before_request
+        def start_query_profile():
+            g.perfil_token = query_profiler.iniciar_perfil()
+
+        @app.after_request
+        def finish_query_profile(resp):
+            perfil = query_profiler.perfil_actual()
+            if perfil is None:
+                return resp
+            ruta = request.url_rule.rule if request.url_rule else request.path
+            query_profiler.cerrar_perfil(ruta, request.method, resp.status_code)
+            resp.headers["Server-Timing"] = query_profiler.server_timing(perfil)
+            return resp
+
+        @app.teardown_request
+        def reset_query_profile(exc):
+            token = g.pop("perfil_token", None)
+            if token is not None:
+                query_profiler.descartar_perfil(token)
+
+    # Métricas por ruta (GET /metrics)
+    metrics.instrumentar_conexion(db)
+
+    @app.before_request
+    def start_request_timer():
+        g.inicio_request = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(resp):
+        inicio = g.pop("inicio_request", None)
+        if inicio is None:
+            return resp
+        # Plantilla de la ruta (no el path) para acotar la cardinalidad de labels
+        ruta = request.url_rule.rule if request.url_rule else "<sin_ruta>"
+        metrics.medir_request(request.method, ruta, resp.status_code, time.perf_counter() - inicio)
+        perfil = query_profiler.perfil_actual()
+        if perfil is not None:
+            metrics.medir_db_request(request.method, ruta, perfil.consultas, perfil.tiempo_db)
+        metrics.actualizar_memoria()
+        return resp
+
+    # Las escrituras exitosas cambian las versiones de los ETag (utils/http_cache.py)
+    app.after_request(http_cache.registrar_escritura)
+
     # 🔹 Inicializar el limiter dentro de la app
     limiter.init_app(app)
 
@@ -42,29 +91,62 @@ def create_app():
     app.register_blueprint(features_bp, url_prefix="/api/v1")
     app.register_blueprint(produccion_bp, url_prefix="/api/v1")
     app.register_blueprint(prediccion_bp, url_prefix="/api/v1")
+    app.register_blueprint(jobs_bp, url_prefix="/api/v1")
+    app.register_blueprint(export_bp, url_prefix="/api/v1")
+
+    # Presupuesto compartido de las rutas caras (utils/rate_limit.py)
+    aplicar_costos(app)
+
+    # Despachador de trabajos en segundo plano (uno por worker, tras el fork)
+    @app.before_request
+    def start_jobs_dispatcher():
+        jobs_service.iniciar_despachador()
 
     @app.get("/")
     def home():
         return jsonify(
             message="API Granja del Cerdo live",
             endpoints=[
-                "/api/v1/login", 
+                "/api/v1/login",
+                "/api/v1/refresh",
+                "/api/v1/logout",
                 "/api/v1/lotes/predict",
                 "/api/v1/lotes",
+                "/api/v1/lotes/import",
                 "/api/v1/tipos-costo",
                 "/api/v1/lotes/{id}/costos",
+                "/api/v1/lotes/{id}/costos/bulk",
+                "/api/v1/costos/bulk",
                 "/api/v1/dashboard/overview",
+                "/api/v1/dashboard/ocupacion",
                 "/api/v1/lotes/{id}/costos/aggregates",
                 "/api/v1/lotes/{id}/produccion",
                 "/api/v1/lotes/{id}/features",
-                "/health"
+                "/api/v1/lotes/{id}/predicciones",
+                "/api/v1/predicciones/precision",
+                "/api/v1/modelo/deriva",
+                "/api/v1/trabajos",
+                "/api/v1/export/{lotes|costos|predicciones}",
+                "/health",
+                "/metrics"
             ]
         )
 
     @app.get("/health")
+    @limiter.exempt
     def health():
         return jsonify(status="ok")
 
+    @app.get("/metrics")
+    @limiter.exempt
+    def metrics_endpoint():
+        if settings.METRICS_TOKEN:
+            auth = request.headers.get("Authorization", "")
+            if not hmac.compare_digest(auth, f"Bearer {settings.METRICS_TOKEN}"):
+                return jsonify(error="unauthorized"), 401
+        cuerpo, content_type = metrics.exportar()
+        return Response(cuerpo, content_type=content_type)
+
     return app
 
 
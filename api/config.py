@@ -6,17 +6,76 @@ class Settings(BaseSettings):
     
     # Autenticación
     JWT_SECRET: str = "mysecret123"
+    ACCESS_TOKEN_TTL_SECONDS: int = 900  # 15 min; la UI lo renueva con /refresh
+    REFRESH_TOKEN_TTL_SECONDS: int = 7 * 24 * 3600  # 7 dias
     
     # Servidor
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
-    RATE_LIMIT: str = "100/minute"
+    RATE_LIMIT: str = "100/minute"  # Por ruta y cliente
+    RATE_LIMIT_COSTOSO: str = "300/minute"  # Presupuesto comun de las rutas caras (ver utils/rate_limit.py)
+    RATE_LIMIT_STORAGE_URI: str = "sqlite:///ratelimit.sqlite3"  # Compartido por los workers; memory:// = por worker
     
     # Machine Learning
     # Ajustado a la nueva estructura: los modelos viven en ml/models/
     MODEL_PATH: str = "ml/models/xgboost_24_features.pkl"
     DEFAULT_MARGIN_RATE: float = 0.10  # 10% de margen por defecto
 
+    # Escrituras masivas (seed, importaciones)
+    BULK_CHUNK_SIZE: int = 500  # Filas por transaccion en create_many
+
+    # Trabajos en segundo plano (entrenamiento, datasets, poblado de BD)
+    JOBS_DB_PATH: str = "jobs.sqlite3"  # Relativo a api/
+    JOBS_MAX_CONCURRENT: int = 1  # Limite global (todos los workers)
+    JOBS_NICE: int = 10  # Prioridad de CPU de los subprocesos
+    JOBS_THREADS: int = 1  # Hilos de BLAS/OpenMP por trabajo
+    JOBS_POLL_SECONDS: float = 5.0
+    JOBS_KILL_GRACE_SECONDS: float = 10.0  # Tras cancelar: SIGTERM y, pasado este tiempo, SIGKILL
+
+    # Perfilado de consultas por request (Server-Timing + logs estructurados)
+    PROFILER_ENABLED: bool = True
+    PROFILER_LOG_ALL: bool = False  # True: loguea todos los requests con consultas (no solo lentas o N+1)
+    PROFILER_SLOW_QUERY_MS: float = 200.0
+    PROFILER_N1_THRESHOLD: int = 10  # Repeticiones de la misma consulta en un request
+
+    # Indice de ocupacion (features y GET /dashboard/ocupacion)
+    OCUPACION_VERSION_PATH: str = "ocupacion.sqlite3"  # Version compartida entre workers, relativo a api/
+    OCUPACION_TTL_SECONDS: float = 300.0  # Reconstruccion periodica (escrituras fuera de la API)
+    OCUPACION_VERSION_POLL_SECONDS: float = 1.0  # Cada cuanto un worker relee la version compartida
+
+    # Login: cache de usuarios y pool de bcrypt (por worker), tope global de logins
+    AUTH_USER_CACHE_TTL_SECONDS: float = 60.0
+    AUTH_USER_CACHE_MAX: int = 1024
+    AUTH_BCRYPT_WORKERS: int = 2  # Verificaciones bcrypt simultaneas por worker
+    AUTH_LOGIN_MAX_CONCURRENTES: int = 0  # Entre todos los workers; 0 = workers - 1
+    AUTH_LOGIN_ESPERA_SECONDS: float = 0.5  # Espera por un cupo de login; sin cupo -> 503 login_saturado
+
+    # ETag / GET condicional (versiones de datos compartidas entre workers)
+    VERSIONES_PATH: str = "versiones.sqlite3"  # Relativo a api/
+    ETAG_MAX_AGE_SECONDS: float = 300.0  # Las etiquetas cambian al menos con esta frecuencia
+
+    # Monitor de deriva de features (GET /modelo/deriva)
+    DERIVA_PATH: str = "deriva.sqlite3"  # Resumenes compartidos entre workers, relativo a api/
+    DERIVA_FLUSH_SECONDS: float = 10.0  # Cada cuanto un worker vuelca lo acumulado
+    DERIVA_RETENCION_DIAS: int = 90
+
+    # Exportacion columnar (GET /export/<dataset>, Arrow IPC o Parquet)
+    EXPORT_CHUNK_ROWS: int = 5000  # Filas por consulta y por RecordBatch / row group
+
+    # Respuestas: compresion br/gzip segun Accept-Encoding (JSON con orjson si esta instalado)
+    COMPRESION_ENABLED: bool = True
+    COMPRESION_MIN_BYTES: int = 1024  # Cuerpos mas chicos se envian sin comprimir
+    COMPRESION_GZIP_NIVEL: int = 6
+    COMPRESION_BROTLI_CALIDAD: int = 5  # 0-11; por encima de ~6 el costo de CPU crece mucho
+
+    # Cache de tokens JWT verificados (por worker) y revocaciones compartidas
+    JWT_CACHE_MAX_TOKENS: int = 1024
+    JWT_REVOCADOS_PATH: str = "auth.sqlite3"  # Relativo a api/
+    JWT_REVOCADOS_POLL_SECONDS: float = 1.0  # Demora maxima para ver un logout de otro worker
+
+    # Metricas (GET /metrics). Si se define, se exige "Authorization: Bearer <token>"
+    METRICS_TOKEN: str | None = None
+
     class Config:
          model_config = SettingsConfigDict(extra='ignore', env_file=".env")
 
@@ -1,10 +1,16 @@
 """
 Script Único para Poblar Base de Datos
 Genera 100 lotes con todas las relaciones correctas
-Ejecutar desde: cd api && python generar_datos_completos.py
+Ejecutar desde: cd api && python generar_datos_completos.py [--lotes 5000] [--chunk-size 500]
 """
+import argparse
 import asyncio
 from db import db
+from services.bulk_service import (
+    ReporteThroughput, create_many_en_bloques, en_bloques, insertar_grupos, reservar_ids
+)
+from services import ocupacion_service, versiones_service
+from config import settings
 from datetime import datetime, timedelta
 import random
 
@@ -91,35 +97,34 @@ def generar_lote_realista():
     }
 
 # ==================== FUNCIONES DE POBLACIÓN ====================
+# Todas las inserciones se hacen en bloque (create_many) para evitar un viaje
+# a la BD por fila; ver services/bulk_service.py.
 
-async def poblar_tipos_costo():
+async def poblar_tipos_costo(reporte):
     """Poblar tipos de costo"""
     print("1️⃣ Poblando Tipos de Costo...")
-    count = 0
-    for tipo in TIPOS_COSTO_DATA:
-        existing = await db.tipocosto.find_first(where={"nombre_tipo": tipo["nombre_tipo"]})
-        if not existing:
-            await db.tipocosto.create(data=tipo)
-            count += 1
+    count = await create_many_en_bloques(
+        db, "tipocosto", TIPOS_COSTO_DATA, skip_duplicates=True, reporte=reporte
+    )
     print(f"   ✅ {count} tipos de costo creados")
     return await db.tipocosto.find_many()
 
-async def poblar_feriados():
+async def poblar_feriados(reporte):
     """Poblar feriados"""
     print("2️⃣ Poblando Feriados...")
-    count = 0
-    for feriado in FERIADOS_DATA:
-        fecha = datetime.strptime(feriado["fecha"], "%Y-%m-%d")
-        existing = await db.feriado.find_first(where={"fecha": fecha})
-        if not existing:
-            await db.feriado.create(data={
-                "nombre_feriado": feriado["nombre_feriado"],
-                "fecha": fecha
-            })
-            count += 1
+    fechas = [datetime.strptime(f["fecha"], "%Y-%m-%d") for f in FERIADOS_DATA]
+    existentes = await db.feriado.find_many(where={"fecha": {"in": fechas}})
+    fechas_existentes = {f.fecha.date() for f in existentes}
+
+    nuevos = [
+        {"nombre_feriado": feriado["nombre_feriado"], "fecha": fecha}
+        for feriado, fecha in zip(FERIADOS_DATA, fechas)
+        if fecha.date() not in fechas_existentes
+    ]
+    count = await create_many_en_bloques(db, "feriado", nuevos, reporte=reporte)
     print(f"   ✅ {count} feriados creados")
 
-async def poblar_gastos_mensuales(tipos_costo):
+async def poblar_gastos_mensuales(tipos_costo, reporte):
     """Poblar gastos mensuales para los últimos meses"""
     print("3️⃣ Poblando Gastos Mensuales...")
     
@@ -131,7 +136,7 @@ async def poblar_gastos_mensuales(tipos_costo):
         print("   ⚠️ Tipos de costo no encontrados")
         return
     
-    count = 0
+    filas = []
     fecha_actual = datetime.now()
     
     for i in range(MESES_HISTORICOS):
@@ -156,121 +161,127 @@ async def poblar_gastos_mensuales(tipos_costo):
             })
         
         for gasto in gastos:
-            try:
-                existing = await db.gastomensual.find_first(where={
-                    "mes": mes,
-                    "anio": anio,
-                    "id_tipo_costo": gasto["id_tipo_costo"],
-                    "descripcion": gasto["descripcion"]
-                })
-                
-                if not existing:
-                    await db.gastomensual.create(data={
-                        **gasto,
-                        "mes": mes,
-                        "anio": anio,
-                        "fecha_registro": mes_fecha.replace(day=1)
-                    })
-                    count += 1
-            except:
-                pass  # Ignorar duplicados por restricción única
+            filas.append({
+                **gasto,
+                "mes": mes,
+                "anio": anio,
+                "fecha_registro": mes_fecha.replace(day=1)
+            })
     
+    # skip_duplicates respeta la restricción única (mes, anio, id_tipo_costo)
+    count = await create_many_en_bloques(
+        db, "gastomensual", filas, skip_duplicates=True, reporte=reporte
+    )
     print(f"   ✅ {count} gastos mensuales creados")
 
-async def poblar_lotes(tipos_costo):
-    """Poblar 100 lotes con costos y producción"""
-    print(f"4️⃣ Poblando {NUM_LOTES} Lotes...")
+def construir_filas_lote(id_lote, lote_data, tipo_alimentacion, tipo_sanitario, tipo_transporte):
+    """
+    Construye en memoria las filas de costos y producción de un lote.
+    Returns: (costos, produccion | None)
+    """
+    cantidad = lote_data["cantidad_animales"]
+    duracion = lote_data["duracion_estadia_dias"] or 20
+    fecha_adq = lote_data["fecha_adquisicion"]
+    costos = []
+    
+    # Costo de Alimentación (siempre)
+    if tipo_alimentacion:
+        costos.append({
+            "id_lote": id_lote,
+            "id_tipo_costo": tipo_alimentacion.id_tipo_costo,
+            "monto": round(cantidad * duracion * random.uniform(8, 12), 2),
+            "fecha_gasto": fecha_adq + timedelta(days=duracion // 2),
+            "descripcion": "Alimento balanceado"
+        })
+    
+    # Costo Sanitario (siempre)
+    if tipo_sanitario:
+        costos.append({
+            "id_lote": id_lote,
+            "id_tipo_costo": tipo_sanitario.id_tipo_costo,
+            "monto": round(cantidad * random.uniform(15, 25), 2),
+            "fecha_gasto": fecha_adq + timedelta(days=random.randint(1, 7)),
+            "descripcion": "Vacunas y desparasitación"
+        })
+    
+    # Costo de Transporte (80% de lotes)
+    if tipo_transporte and random.random() > 0.2:
+        costos.append({
+            "id_lote": id_lote,
+            "id_tipo_costo": tipo_transporte.id_tipo_costo,
+            "monto": round(random.uniform(300, 600), 2),
+            "fecha_gasto": fecha_adq,
+            "descripcion": "Flete y combustible"
+        })
+    
+    # Producción (70% de lotes)
+    produccion = None
+    if random.random() > 0.3:
+        peso_entrada_total = lote_data["peso_promedio_entrada"] * cantidad
+        # Ganancia de peso: 15-25 kg por animal
+        ganancia_peso = random.uniform(15, 25) * cantidad
+        merma = lote_data["merma_peso_transporte"] or 0
+        peso_salida = peso_entrada_total + ganancia_peso - merma
+        
+        # Precio de venta: margen de 10-35% sobre la compra, en el rango del dataset de entrenamiento
+        precio_venta = lote_data["precio_compra_kg"] * random.uniform(1.10, 1.35)
+        produccion = {
+            "id_lote": id_lote,
+            "peso_salida_total": round(peso_salida, 2),
+            "precio_venta_kg": round(min(max(precio_venta, 20.0), 35.0), 2),
+            "fecha_cierre": fecha_adq + timedelta(days=duracion),
+            "mortalidad_unidades": random.randint(0, 2) if random.random() > 0.8 else 0
+        }
+    
+    return costos, produccion
+
+async def poblar_lotes(tipos_costo, reporte, num_lotes=NUM_LOTES, chunk_size=None):
+    """Poblar lotes con costos y producción (en bloques transaccionales)"""
+    print(f"4️⃣ Poblando {num_lotes} Lotes...")
     
     tipo_alimentacion = next((t for t in tipos_costo if t.nombre_tipo == "Alimentación"), None)
     tipo_sanitario = next((t for t in tipos_costo if t.nombre_tipo == "Sanitario"), None)
     tipo_transporte = next((t for t in tipos_costo if t.nombre_tipo == "Transporte"), None)
     
-    lotes_creados = 0
-    costos_creados = 0
-    producciones_creadas = 0
+    # Reservar todos los IDs de una vez para poder enlazar costos y producción
+    ids = await reservar_ids(db, "Lote", "id_lote", num_lotes)
     
-    for i in range(NUM_LOTES):
-        try:
-            # Generar datos del lote
+    grupos = []
+    for bloque in en_bloques(ids, chunk_size):
+        grupo = {"lote": [], "costo": [], "produccion": []}
+        for id_lote in bloque:
             lote_data = generar_lote_realista()
-            
-            # Crear lote
-            lote = await db.lote.create(data=lote_data)
-            lotes_creados += 1
-            
-            # Crear costos para el lote
-            cantidad = lote.cantidad_animales
-            duracion = lote.duracion_estadia_dias or 20
-            fecha_adq = lote.fecha_adquisicion
-            
-            # Costo de Alimentación (siempre)
-            if tipo_alimentacion:
-                await db.costo.create(data={
-                    "id_lote": lote.id_lote,
-                    "id_tipo_costo": tipo_alimentacion.id_tipo_costo,
-                    "monto": round(cantidad * duracion * random.uniform(8, 12), 2),
-                    "fecha_gasto": fecha_adq + timedelta(days=duracion // 2),
-                    "descripcion": "Alimento balanceado"
-                })
-                costos_creados += 1
-            
-            # Costo Sanitario (siempre)
-            if tipo_sanitario:
-                await db.costo.create(data={
-                    "id_lote": lote.id_lote,
-                    "id_tipo_costo": tipo_sanitario.id_tipo_costo,
-                    "monto": round(cantidad * random.uniform(15, 25), 2),
-                    "fecha_gasto": fecha_adq + timedelta(days=random.randint(1, 7)),
-                    "descripcion": "Vacunas y desparasitación"
-                })
-                costos_creados += 1
-            
-            # Costo de Transporte (80% de lotes)
-            if tipo_transporte and random.random() > 0.2:
-                await db.costo.create(data={
-                    "id_lote": lote.id_lote,
-                    "id_tipo_costo": tipo_transporte.id_tipo_costo,
-                    "monto": round(random.uniform(300, 600), 2),
-                    "fecha_gasto": fecha_adq,
-                    "descripcion": "Flete y combustible"
-                })
-                costos_creados += 1
-            
-            # Crear Producción (70% de lotes)
-            if random.random() > 0.3:
-                peso_entrada_total = lote.peso_promedio_entrada * cantidad
-                # Ganancia de peso: 15-25 kg por animal
-                ganancia_peso = random.uniform(15, 25) * cantidad
-                merma = lote.merma_peso_transporte or 0
-                peso_salida = peso_entrada_total + ganancia_peso - merma
-                
-                await db.produccion.create(data={
-                    "id_lote": lote.id_lote,
-                    "peso_salida_total": round(peso_salida, 2),
-                    "mortalidad_unidades": random.randint(0, 2) if random.random() > 0.8 else 0
-                })
-                producciones_creadas += 1
-            
-            # Progreso cada 10 lotes
-            if (i + 1) % 10 == 0:
-                print(f"   📊 Progreso: {i + 1}/{NUM_LOTES} lotes")
-        
+            costos, produccion = construir_filas_lote(
+                id_lote, lote_data, tipo_alimentacion, tipo_sanitario, tipo_transporte
+            )
+            grupo["lote"].append({"id_lote": id_lote, **lote_data})
+            grupo["costo"].extend(costos)
+            if produccion:
+                grupo["produccion"].append(produccion)
+        grupos.append(grupo)
+    
+    lotes_antes = reporte.filas.get("lote", 0)
+    for i, grupo in enumerate(grupos, start=1):
+        try:
+            await insertar_grupos(db, [grupo], reporte=reporte)
         except Exception as e:
-            print(f"   ⚠️ Error en lote {i + 1}: {e}")
+            print(f"   ⚠️ Error en bloque {i}: {e}")
+        print(f"   📊 Progreso: {reporte.filas.get('lote', 0) - lotes_antes}/{num_lotes} lotes")
     
-    print(f"   ✅ {lotes_creados} lotes creados")
-    print(f"   ✅ {costos_creados} costos creados")
-    print(f"   ✅ {producciones_creadas} producciones creadas")
+    print(f"   ✅ {reporte.filas.get('lote', 0)} lotes creados")
+    print(f"   ✅ {reporte.filas.get('costo', 0)} costos creados")
+    print(f"   ✅ {reporte.filas.get('produccion', 0)} producciones creadas")
 
 # ==================== FUNCIÓN PRINCIPAL ====================
 
-async def main():
+async def main(num_lotes=NUM_LOTES, chunk_size=None):
     """Función principal de población"""
     print("=" * 60)
     print("🚀 GENERACIÓN DE DATOS COMPLETOS")
     print("=" * 60)
     print(f"📊 Configuración:")
-    print(f"   - Lotes a crear: {NUM_LOTES}")
+    print(f"   - Lotes a crear: {num_lotes}")
+    print(f"   - Tamaño de bloque: {chunk_size or settings.BULK_CHUNK_SIZE}")
     print(f"   - Meses históricos: {MESES_HISTORICOS}")
     print(f"   - Tipos de costo: {len(TIPOS_COSTO_DATA)}")
     print(f"   - Feriados: {len(FERIADOS_DATA)}")
@@ -279,18 +290,25 @@ async def main():
     
     try:
         await db.connect()
+        reporte = ReporteThroughput()
         
         # 1. Tipos de Costo
-        tipos_costo = await poblar_tipos_costo()
+        tipos_costo = await poblar_tipos_costo(reporte)
         
         # 2. Feriados
-        await poblar_feriados()
+        await poblar_feriados(reporte)
         
         # 3. Gastos Mensuales
-        await poblar_gastos_mensuales(tipos_costo)
+        await poblar_gastos_mensuales(tipos_costo, reporte)
         
         # 4. Lotes (con costos y producción)
-        await poblar_lotes(tipos_costo)
+        await poblar_lotes(tipos_costo, reporte, num_lotes=num_lotes, chunk_size=chunk_size)
+        # Los workers de la API reconstruyen su indice de ocupacion y cambian sus ETag
+        ocupacion_service.invalidar()
+        versiones_service.invalidar()
+        
+        print()
+        reporte.imprimir("Throughput de escritura")
         
         # Resumen final
         print()
@@ -324,4 +342,9 @@ async def main():
         await db.disconnect()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Pobla la BD con datos de ejemplo usando inserciones en bloque.")
+    parser.add_argument("--lotes", type=int, default=NUM_LOTES, help=f"lotes a generar (default: {NUM_LOTES})")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="filas de lote por transaccion (default: BULK_CHUNK_SIZE)")
+    args = parser.parse_args()
+    asyncio.run(main(num_lotes=args.lotes, chunk_size=args.chunk_size))
@@ -0,0 +1,69 @@
+# api/gunicorn.conf.py
+"""
+Configuracion de gunicorn (se carga sola al ejecutar gunicorn desde api/).
+
+Metricas: cada worker escribe sus metricas de Prometheus en
+PROMETHEUS_MULTIPROC_DIR, y GET /metrics las agrega todas. El directorio se
+limpia al arrancar y las metricas de un worker que muere se marcan como tal.
+
+Preload (GUNICORN_PRELOAD, activo por defecto): la app, el modelo XGBoost y
+sus librerias se cargan una sola vez en el master y los workers los
+comparten copy-on-write, asi sumar workers no multiplica la memoria del
+modelo ni el tiempo de arranque. Tras reentrenar, cada worker recarga su
+propia copia al ver el .pkl nuevo; reiniciar gunicorn vuelve a compartirla.
+Con GUNICORN_PRELOAD=0 cada worker importa la app y carga el modelo por su
+cuenta (util para desarrollar con --reload).
+
+Login: el master crea los cupos de login compartidos por todos los workers
+(services/auth_service.py) antes de levantarlos, y libera los que tenia un
+worker que muere.
+"""
+import gc
+import os
+import shutil
+import tempfile
+
+# Debe definirse antes de que los workers importen prometheus_client
+PROMETHEUS_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "granja_prometheus")
+)
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1").lower() not in ("0", "false", "no")
+
+
+def on_starting(server):
+    shutil.rmtree(PROMETHEUS_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_DIR, exist_ok=True)
+
+    # Antes del fork: los workers (con o sin preload) heredan los mismos cupos
+    from services import auth_service
+    cupos = auth_service.crear_cupos_login(server.cfg.workers)
+    server.log.info("Logins simultaneos: %d (de %d workers)", cupos, server.cfg.workers)
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from services import modelo_service
+    try:
+        resumen = modelo_service.precargar()
+        server.log.info("Modelo precargado en el master: %s", resumen)
+    except Exception as e:
+        # Sin modelo la API sigue sirviendo; /lotes/predict reporta el error
+        server.log.warning("No se pudo precargar el modelo: %s", e)
+
+    # Lo cargado hasta aqui queda fuera del GC: las recolecciones de los
+    # workers no escriben en esos objetos y sus paginas siguen compartidas
+    gc.collect()
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+    # Un worker muerto a mitad de un login (p. ej. por timeout) no suelta su cupo
+    from services import auth_service
+    liberados = auth_service.liberar_cupos_de(worker.pid)
+    if liberados:
+        server.log.warning("Liberados %d cupos de login del worker %s", liberados, worker.pid)
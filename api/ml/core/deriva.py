@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Deriva de distribuciones entre el entrenamiento y lo que sirve la API.
+
+Al entrenar, `perfil_referencia` resume cada feature (y la prediccion) en
+un histograma sobre cortes por cuantiles del dataset: ~10 bins de igual
+masa. Se guarda con el modelo (train_xgboost.guardar_modelo).
+
+Al servir, cada valor cae en uno de esos mismos bins (`Resumen.agregar`):
+memoria constante y O(1) por prediccion, sin guardar las observaciones.
+Junto con el histograma se lleva media y varianza en linea (Welford) y los
+resumenes de varios procesos o dias se combinan sin perdida (`combinar`).
+
+Medidas contra la referencia:
+- PSI (population stability index): < 0.1 estable, 0.1-0.25 moderada,
+  > 0.25 significativa (umbrales habituales).
+- KS: maxima diferencia entre las distribuciones acumuladas, evaluada en
+  los cortes (aproximacion por bins del estadistico de Kolmogorov-Smirnov).
+
+Sin dependencias de la BD ni de pandas: lo usan ml/train_xgboost.py y
+services/deriva_service.py.
+"""
+from __future__ import annotations
+
+import math
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+N_BINS = 10
+# Nombre de la "feature" con la que se sigue la prediccion del modelo
+PREDICCION = "precio_predicho"
+
+PSI_MODERADA = 0.1
+PSI_SIGNIFICATIVA = 0.25
+
+# Piso de las proporciones en PSI: un bin vacio no da infinito
+_EPS = 1e-4
+
+
+def perfil_referencia(columnas: Dict[str, Iterable[float]], n_bins: int = N_BINS) -> Dict[str, Dict]:
+    """
+    {nombre: valores} -> {nombre: {"cortes", "proporciones", "n", "media", "std"}}
+    con listas de floats (se serializa con pickle o JSON).
+    """
+    perfil = {}
+    for nombre, valores in columnas.items():
+        v = np.asarray(valores, dtype=float)
+        v = v[np.isfinite(v)]
+        if v.size == 0:
+            continue
+        # Las features discretas (mes, feriado) repiten cortes: quedan menos bins
+        cortes = np.unique(np.quantile(v, np.linspace(0, 1, n_bins + 1)[1:-1]))
+        conteos = np.bincount(np.searchsorted(cortes, v, side="right"), minlength=cortes.size + 1)
+        perfil[nombre] = {
+            "cortes": cortes.tolist(),
+            "proporciones": (conteos / v.size).tolist(),
+            "n": int(v.size),
+            "media": float(v.mean()),
+            "std": float(v.std()),
+        }
+    return perfil
+
+
+class Resumen:
+    """Histograma sobre cortes fijos + media/varianza en linea de una variable."""
+
+    __slots__ = ("conteos", "n", "media", "m2")
+
+    def __init__(self, n_bins: int):
+        self.conteos: List[int] = [0] * n_bins
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+
+    def agregar(self, valor: float, cortes: Sequence[float]) -> None:
+        if not math.isfinite(valor):
+            return
+        self.conteos[bisect_right(cortes, valor)] += 1
+        self.n += 1
+        delta = valor - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (valor - self.media)
+
+    def combinar(self, otro: "Resumen") -> None:
+        """Suma `otro` (mismos cortes) a este resumen (Chan et al.)."""
+        if otro.n == 0:
+            return
+        n = self.n + otro.n
+        delta = otro.media - self.media
+        self.media += delta * otro.n / n
+        self.m2 += otro.m2 + delta * delta * self.n * otro.n / n
+        self.n = n
+        self.conteos = [a + b for a, b in zip(self.conteos, otro.conteos)]
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.n) if self.n else 0.0
+
+    def a_dict(self) -> Dict:
+        return {"conteos": self.conteos, "n": self.n, "media": self.media, "m2": self.m2}
+
+    @classmethod
+    def de_dict(cls, datos: Dict) -> "Resumen":
+        r = cls(len(datos["conteos"]))
+        r.conteos = list(datos["conteos"])
+        r.n, r.media, r.m2 = datos["n"], datos["media"], datos["m2"]
+        return r
+
+
+def psi(esperadas: Sequence[float], conteos: Sequence[int]) -> float:
+    n = sum(conteos)
+    if n == 0:
+        return 0.0
+    total = 0.0
+    for e, c in zip(esperadas, conteos):
+        e = max(e, _EPS)
+        a = max(c / n, _EPS)
+        total += (a - e) * math.log(a / e)
+    return total
+
+
+def ks(esperadas: Sequence[float], conteos: Sequence[int]) -> float:
+    n = sum(conteos)
+    if n == 0:
+        return 0.0
+    acum_e = acum_a = maximo = 0.0
+    for e, c in zip(esperadas, conteos):
+        acum_e += e
+        acum_a += c / n
+        maximo = max(maximo, abs(acum_a - acum_e))
+    return maximo
+
+
+def clasificar(valor_psi: float) -> str:
+    if valor_psi >= PSI_SIGNIFICATIVA:
+        return "significativa"
+    if valor_psi >= PSI_MODERADA:
+        return "moderada"
+    return "estable"
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Kernel puro y vectorizado de las 24 features del modelo XGBoost.
+
+No accede a la BD: recibe los atributos de los lotes y el contexto ya
+calculado (agregados del mes, animales en granja, dias al proximo feriado)
+como arrays de numpy (o escalares) y devuelve todas las features de una vez.
+
+Lo usan:
+- services/features_service.py: un lote (API) y muchos lotes (batch)
+- ml/data/generate_data.py: generacion del dataset de entrenamiento
+
+Asi las features de entrenamiento y de produccion salen de las mismas
+formulas. Las constantes de costo con las que la API estima valores
+faltantes son los defaults de ParametrosCosto; el generador de datos las
+reemplaza por arrays aleatorios.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, Tuple
+
+import numpy as np
+
+# Orden de columnas con el que se entrena y se predice
+FEATURES_24: Tuple[str, ...] = (
+    # Grupo 1: Adquisicion
+    "cantidad_animales",
+    "peso_promedio_entrada",
+    "precio_compra_kg",
+    "costo_adquisicion_total",
+    # Grupo 2: Logistica
+    "costo_combustible_viaje",
+    "costo_peajes_lavado",
+    "costo_flete_estimado",
+    "mantenimiento_camion_prorrateado",
+    # Grupo 3: Costos Fijos Dinamicos
+    "costo_fijo_diario_lote",
+    "factor_ocupacion_granja",
+    "tasa_consumo_energia_agua",
+    "costo_mano_obra_asignada",
+    # Grupo 4: Estadia
+    "duracion_estadia_dias",
+    "costo_alimentacion_total",
+    "costo_sanitario_total",
+    "merma_peso_transporte",
+    "peso_salida_esperado",
+    # Grupo 5: Temporales
+    "mes_adquisicion",
+    "dia_semana_llegada",
+    "es_feriado_proximo",
+    "dias_para_festividad",
+    # Grupo 6: Compuestas
+    "costo_operativo_por_cabeza",
+    "ratio_alimento_precio_compra",
+    "indicador_eficiencia_estadia",
+)
+
+FEATURES_ENTERAS = frozenset({
+    "duracion_estadia_dias", "mes_adquisicion", "dia_semana_llegada",
+    "es_feriado_proximo", "dias_para_festividad",
+})
+
+# Constantes de negocio
+CAPACIDAD_GRANJA = 1000  # Capacidad maxima de animales
+DISTANCIAS_KM = {
+    "Santa Cruz": 350,
+    "Beni": 520,
+    "Pando": 680,
+    "La Paz": 400,
+    "Cochabamba": 300,
+}
+DISTANCIA_DEFAULT_KM = 350
+
+# Costos fijos mensuales (para prorrateo)
+SUELDOS_MENSUALES = 11000.0
+GASTOS_OPERATIVOS_MENSUALES = 3250.0
+MANTENIMIENTO_CAMION_MENSUAL = 3000.0
+
+VENTANA_FERIADO_DIAS = 7
+SIN_FERIADO = 999  # dias_para_festividad cuando no hay feriado en la ventana
+VENTANA_OCUPACION_DIAS = 7  # Lotes activos: +/- 7 dias
+
+
+@dataclass
+class ParametrosCosto:
+    """
+    Tarifas para estimar costos que el lote no trae. Cada campo acepta un
+    escalar o un array por lote (el generador de datos usa arrays aleatorios).
+    """
+    precio_diesel_litro: Any = 3.7
+    rendimiento_km_litro: Any = 25.0
+    peajes_lavado: Any = 3 * 40 + 100  # 3 peajes * 40 Bs + lavado 100 Bs
+    flete_base: Any = 300.0
+    flete_por_km: Any = 1.0
+    flete_por_animal: Any = 10.0
+    alimento_dia_animal: Any = 1.5
+    sanitario_animal: Any = 10.0
+    merma_kg_animal: Any = 0.5
+    ganancia_kg_dia: Any = 1.15
+
+
+# ------------------------------
+# Helpers de fechas y contexto
+# ------------------------------
+
+def a_dias(fechas: Iterable[Any]) -> np.ndarray:
+    """Fechas (datetime con o sin tz, date o datetime64) -> datetime64[D]."""
+    if isinstance(fechas, np.ndarray) and np.issubdtype(fechas.dtype, np.datetime64):
+        return fechas.astype("datetime64[D]")
+    return np.array(
+        [f.replace(tzinfo=None) if isinstance(f, datetime) else f for f in fechas],
+        dtype="datetime64[D]",
+    )
+
+
+def mes_y_dia_semana(dias: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Mes (1-12) y dia de la semana (lunes=0) de un array datetime64[D]."""
+    mes = dias.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    # 1970-01-01 fue jueves (3)
+    dia_semana = (dias.astype(np.int64) + 3) % 7
+    return mes, dia_semana
+
+
+def dias_para_feriado(dias: np.ndarray, feriados: Iterable[Any],
+                      ventana: int = VENTANA_FERIADO_DIAS) -> np.ndarray:
+    """Dias hasta el primer feriado en [fecha, fecha + ventana], o SIN_FERIADO."""
+    feriados = np.sort(a_dias(list(feriados)))
+    if feriados.size == 0:
+        return np.full(dias.shape, SIN_FERIADO, dtype=np.int64)
+    idx = np.searchsorted(feriados, dias, side="left")
+    proximo = feriados[np.minimum(idx, feriados.size - 1)]
+    distancia = (proximo - dias).astype(np.int64)
+    valido = (idx < feriados.size) & (distancia <= ventana)
+    return np.where(valido, distancia, SIN_FERIADO)
+
+
+def distancias_km(ubicaciones: Iterable[str | None]) -> np.ndarray:
+    return np.array(
+        [DISTANCIAS_KM.get(u or "Santa Cruz", DISTANCIA_DEFAULT_KM) for u in ubicaciones],
+        dtype=np.float64,
+    )
+
+
+def _arr(valor, n: int) -> np.ndarray:
+    """Escalar/lista/None -> array float64 de largo n (None -> 0)."""
+    if valor is None:
+        return np.zeros(n)
+    a = np.asarray(valor, dtype=np.float64)
+    a = np.nan_to_num(a, nan=0.0)
+    return np.broadcast_to(a, (n,)) if a.ndim == 0 else a
+
+
+def _o_estimado(valor: np.ndarray, estimado: np.ndarray) -> np.ndarray:
+    # Valor registrado en BD si existe (distinto de 0); si no, la estimacion
+    return np.where(valor != 0, valor, estimado)
+
+
+# ------------------------------
+# Kernel
+# ------------------------------
+
+def calcular_features(
+    *,
+    cantidad_animales,
+    peso_promedio_entrada,
+    precio_compra_kg,
+    duracion_estadia_dias,
+    fechas: np.ndarray,
+    distancia_km,
+    viajes_mes,
+    animales_en_granja,
+    animales_mes,
+    servicios_basicos_mes,
+    mano_obra_mes,
+    gasto_total_mes,
+    dias_festividad,
+    costo_combustible=None,
+    costo_peajes_lavado=None,
+    costo_flete=None,
+    merma_peso_transporte=None,
+    parametros: ParametrosCosto | None = None,
+) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """
+    Calcula las 24 features para n lotes.
+
+    Args:
+        fechas: fecha de adquisicion, datetime64[D] (ver `a_dias`)
+        viajes_mes: lotes adquiridos en el mes de cada lote
+        animales_en_granja: animales de los lotes en [fecha - 7, fecha + 7]
+        animales_mes: animales adquiridos en el mes (0 -> se usa el propio lote)
+        servicios_basicos_mes / mano_obra_mes / gasto_total_mes: gastos
+            mensuales del mes, a prorratear por animales
+        dias_festividad: dias al proximo feriado (SIN_FERIADO si no hay)
+        costo_combustible, costo_peajes_lavado, costo_flete,
+        merma_peso_transporte: valores registrados; 0/None/NaN -> estimar
+
+    Returns:
+        (features, extras): dicts nombre -> array de largo n
+    """
+    p = parametros or ParametrosCosto()
+    cantidad = np.asarray(cantidad_animales, dtype=np.float64)
+    n = cantidad.shape[0]
+    peso = _arr(peso_promedio_entrada, n)
+    precio = _arr(precio_compra_kg, n)
+    dias_estadia = _arr(duracion_estadia_dias, n).astype(np.int64)
+    distancia = _arr(distancia_km, n)
+
+    # Grupo 1: Adquisicion
+    costo_adquisicion_total = cantidad * peso * precio
+
+    # Grupo 2: Logistica y Transporte
+    costo_combustible_viaje = _o_estimado(
+        _arr(costo_combustible, n), distancia / p.rendimiento_km_litro * p.precio_diesel_litro
+    )
+    costo_peajes = _o_estimado(_arr(costo_peajes_lavado, n), _arr(p.peajes_lavado, n))
+    costo_flete_estimado = _o_estimado(
+        _arr(costo_flete, n), p.flete_base + distancia * p.flete_por_km + cantidad * p.flete_por_animal
+    )
+    mantenimiento_camion = MANTENIMIENTO_CAMION_MENSUAL / np.maximum(_arr(viajes_mes, n), 1)
+
+    # Grupo 3: Costos Fijos Dinamicos
+    costo_fijo_diario = (SUELDOS_MENSUALES + GASTOS_OPERATIVOS_MENSUALES) / 30
+    costo_fijo_diario_lote = costo_fijo_diario * dias_estadia
+    factor_ocupacion = np.minimum(_arr(animales_en_granja, n) / CAPACIDAD_GRANJA, 1.0)
+
+    animales_mes = _arr(animales_mes, n)
+    proporcion = cantidad / np.where(animales_mes == 0, cantidad, animales_mes)
+    tasa_consumo_energia_agua = _arr(servicios_basicos_mes, n) * proporcion
+    costo_mano_obra_asignada = _arr(mano_obra_mes, n) * proporcion
+    gasto_mes_prorrateado = _arr(gasto_total_mes, n) * proporcion
+
+    # Grupo 4: Estadia, Alimento y Sanidad
+    costo_alimentacion_total = cantidad * dias_estadia * p.alimento_dia_animal
+    costo_sanitario_total = cantidad * p.sanitario_animal
+    merma = _o_estimado(_arr(merma_peso_transporte, n), cantidad * p.merma_kg_animal)
+    peso_salida_esperado = np.where(
+        dias_estadia > 0,
+        (peso + p.ganancia_kg_dia * dias_estadia - merma / cantidad) * cantidad,
+        cantidad * peso,
+    )
+
+    # Grupo 5: Temporales y de Mercado
+    mes_adquisicion, dia_semana_llegada = mes_y_dia_semana(fechas)
+    dias_festividad = np.asarray(dias_festividad, dtype=np.int64)
+    es_feriado_proximo = (dias_festividad <= VENTANA_FERIADO_DIAS).astype(np.int64)
+
+    # Grupo 6: Compuestas
+    costo_logistica = costo_flete_estimado + costo_combustible_viaje + costo_peajes
+    costo_operativo_por_cabeza = (costo_logistica + costo_fijo_diario_lote) / cantidad
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio_alimento_precio_compra = np.where(
+            costo_adquisicion_total > 0, costo_alimentacion_total / costo_adquisicion_total, 0.0
+        )
+        indicador_eficiencia_estadia = np.where(dias_estadia > 0, peso / dias_estadia, 0.0)
+
+    features = {
+        "cantidad_animales": cantidad,
+        "peso_promedio_entrada": peso,
+        "precio_compra_kg": precio,
+        "costo_adquisicion_total": costo_adquisicion_total,
+        "costo_combustible_viaje": costo_combustible_viaje,
+        "costo_peajes_lavado": costo_peajes,
+        "costo_flete_estimado": costo_flete_estimado,
+        "mantenimiento_camion_prorrateado": mantenimiento_camion,
+        "costo_fijo_diario_lote": costo_fijo_diario_lote,
+        "factor_ocupacion_granja": factor_ocupacion,
+        "tasa_consumo_energia_agua": tasa_consumo_energia_agua,
+        "costo_mano_obra_asignada": costo_mano_obra_asignada,
+        "duracion_estadia_dias": dias_estadia,
+        "costo_alimentacion_total": costo_alimentacion_total,
+        "costo_sanitario_total": costo_sanitario_total,
+        "merma_peso_transporte": merma,
+        "peso_salida_esperado": peso_salida_esperado,
+        "mes_adquisicion": mes_adquisicion,
+        "dia_semana_llegada": dia_semana_llegada,
+        "es_feriado_proximo": es_feriado_proximo,
+        "dias_para_festividad": dias_festividad,
+        "costo_operativo_por_cabeza": costo_operativo_por_cabeza,
+        "ratio_alimento_precio_compra": ratio_alimento_precio_compra,
+        "indicador_eficiencia_estadia": indicador_eficiencia_estadia,
+    }
+
+    extras = {
+        "costo_logistica_total": costo_logistica,
+        "costo_fijo_total": costo_fijo_diario_lote + tasa_consumo_energia_agua + costo_mano_obra_asignada,
+        "costo_variable_total": costo_adquisicion_total + costo_logistica + costo_alimentacion_total + costo_sanitario_total,
+        "kilos_entrada": cantidad * peso,
+        "peso_salida_total": peso_salida_esperado,
+        "gasto_total_mes_prorrateado": gasto_mes_prorrateado,
+    }
+    return features, extras
+
+
+def matriz_features(features: Dict[str, np.ndarray]) -> np.ndarray:
+    """Dict de features -> matriz (n, 24) en el orden de FEATURES_24."""
+    return np.column_stack([np.asarray(features[nombre], dtype=np.float64) for nombre in FEATURES_24])
+
+
+def fila(columnas: Dict[str, np.ndarray], i: int, enteras: frozenset = FEATURES_ENTERAS) -> Dict[str, Any]:
+    """Fila i como dict de escalares de Python (int para enteras, float para el resto)."""
+    return {
+        nombre: int(valores[i]) if nombre in enteras else float(valores[i])
+        for nombre, valores in columnas.items()
+    }
@@ -10,13 +10,18 @@ Incluye:
 - Variables temporales y de mercado (Grupo 5)
 - Variables compuestas (Grupo 6)
 """
-import os
-import math
+import sys
 import argparse
 import numpy as np
 import pandas as pd
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from ml.core.features_kernel import (
+    FEATURES_24, FEATURES_ENTERAS, SUELDOS_MENSUALES, ParametrosCosto, calcular_features, dias_para_feriado,
+)
 
 # ------------------------------
 # Parametros y helpers
@@ -29,7 +34,7 @@ RANGO_ANIMALES = (10, 120)
 RANGO_PESO_ENTRADA = (80.0, 115.0)
 RANGO_PRECIO_COMPRA = (18.0, 25.0)
 RANGO_DIAS = (1, 3)
-CAPACIDAD_GRANJA = 1000  # Capacidad maxima de la granja
+ANIO = 2026
 
 # Ubicaciones de origen (para calcular distancia)
 UBICACIONES = ["Santa Cruz", "Beni", "Pando"]
@@ -52,41 +57,16 @@ FERIADOS_2026 = [
     datetime(2026, 12, 31), # Fin de Año
 ]
 
-# Costos fijos mensuales (para prorrateo)
-SUELDOS_MENSUALES = 11000.0  # Bs
-GASTOS_OPERATIVOS_MENSUALES = 3250.0  # Bs
+# Gasto mensual de servicios basicos a prorratear (sueldos y demas constantes en features_kernel)
 SERVICIOS_BASICOS_MENSUALES = 850.0  # Bs (promedio)
-MANTENIMIENTO_CAMION_MENSUAL = 3000.0  # Bs
-
-
-def generar_fecha_aleatoria(year=2026):
-    """Genera una fecha aleatoria en el año especificado."""
-    start_date = datetime(year, 1, 1)
-    end_date = datetime(year, 12, 31)
-    days_between = (end_date - start_date).days
-    random_days = int(rng.integers(0, days_between + 1))
-    return start_date + timedelta(days=random_days)
-
-
-def calcular_feriado_proximo(fecha):
-    """
-    Calcula si hay un feriado en los proximos 7 dias.
-    Retorna: (es_feriado_proximo, dias_para_festividad)
-    """
-    fecha_limite = fecha + timedelta(days=7)
-    feriados_proximos = [f for f in FERIADOS_2026 if fecha <= f <= fecha_limite]
-    
-    if feriados_proximos:
-        feriado_cercano = min(feriados_proximos)
-        dias = (feriado_cercano - fecha).days
-        return True, dias
-    else:
-        return False, 999
 
 
 def generar_lote_completo(n_rows: int) -> pd.DataFrame:
     """
     Genera dataset completo con las 24 features para XGBoost.
+
+    Solo se sortean aqui los datos de cada lote y las tarifas; las features
+    se calculan con ml/core/features_kernel.py, el mismo codigo que usa la API.
     """
     # ========================================
     # GRUPO 1: Variables de Adquisicion
@@ -96,152 +76,101 @@ def generar_lote_completo(n_rows: int) -> pd.DataFrame:
     peso_promedio_entrada = np.clip(peso_promedio_entrada, RANGO_PESO_ENTRADA[0], RANGO_PESO_ENTRADA[1])
     precio_compra_kg = rng.uniform(RANGO_PRECIO_COMPRA[0], RANGO_PRECIO_COMPRA[1], size=n_rows)
     
-    # Feature #4: costo_adquisicion_total (calculado)
-    costo_adquisicion_total = cantidad_animales * peso_promedio_entrada * precio_compra_kg
-    
     # ========================================
     # GRUPO 2: Logistica y Transporte
     # ========================================
     ubicacion_origen = rng.choice(UBICACIONES, size=n_rows)
     distancia_km = np.array([DISTANCIAS_KM[loc] for loc in ubicacion_origen])
     
-    # Feature #5: costo_combustible_viaje (basado en distancia)
-    # Diesel: ~3.7 Bs/litro, consumo: ~25 km/litro
-    litros_diesel = distancia_km / 25.0
-    costo_combustible_viaje = litros_diesel * rng.uniform(3.5, 4.0, size=n_rows)
+    # Diesel: 3.5-4.0 Bs/litro
+    precio_diesel_litro = rng.uniform(3.5, 4.0, size=n_rows)
     
-    # Feature #6: costo_peajes_lavado
     # Peajes: 2-4 por viaje, ~30-50 Bs cada uno + lavado 80-120 Bs
     num_peajes = rng.integers(2, 5, size=n_rows)
     costo_peajes = num_peajes * rng.uniform(30, 50, size=n_rows)
     costo_lavado = rng.uniform(80, 120, size=n_rows)
     costo_peajes_lavado = costo_peajes + costo_lavado
     
-    # Feature #7: costo_flete_estimado
     # Flete: base + por km + por animal
-    base_flete = rng.uniform(200, 400, size=n_rows)
-    por_km = distancia_km * rng.uniform(0.5, 1.5, size=n_rows)
-    por_animal = cantidad_animales * rng.uniform(5, 15, size=n_rows)
-    costo_flete_estimado = base_flete + por_km + por_animal
+    flete_base = rng.uniform(200, 400, size=n_rows)
+    flete_por_km = rng.uniform(0.5, 1.5, size=n_rows)
+    flete_por_animal = rng.uniform(5, 15, size=n_rows)
     
-    # Feature #8: mantenimiento_camion_prorrateado
-    # Generar fechas para calcular viajes del mes
-    fechas_adquisicion = [generar_fecha_aleatoria() for _ in range(n_rows)]
-    viajes_por_mes = {}
-    for fecha in fechas_adquisicion:
-        mes_key = (fecha.year, fecha.month)
-        viajes_por_mes[mes_key] = viajes_por_mes.get(mes_key, 0) + 1
+    # Fechas de adquisicion en el año (para viajes y gastos del mes)
+    inicio = np.datetime64(f"{ANIO}-01-01")
+    dias_en_anio = int((np.datetime64(f"{ANIO + 1}-01-01") - inicio).astype(int))
+    fechas = inicio + rng.integers(0, dias_en_anio, size=n_rows)
     
-    mantenimiento_camion_prorrateado = np.array([
-        MANTENIMIENTO_CAMION_MENSUAL / viajes_por_mes[(fecha.year, fecha.month)]
-        for fecha in fechas_adquisicion
-    ])
+    # Viajes y animales por mes
+    _, idx_mes, viajes_mes = np.unique(fechas.astype("datetime64[M]"), return_inverse=True, return_counts=True)
+    animales_mes = np.bincount(idx_mes, weights=cantidad_animales)
     
     # ========================================
     # GRUPO 3: Costos Fijos Dinamicos
     # ========================================
     duracion_estadia_dias = rng.integers(RANGO_DIAS[0], RANGO_DIAS[1] + 1, size=n_rows)
     
-    # Feature #9: costo_fijo_diario_lote
-    costo_fijo_diario = (SUELDOS_MENSUALES + GASTOS_OPERATIVOS_MENSUALES) / 30
-    costo_fijo_diario_lote = costo_fijo_diario * duracion_estadia_dias
-    
-    # Feature #10: factor_ocupacion_granja
     # Simular ocupacion variable (30-90% de capacidad)
     animales_en_granja = rng.integers(300, 900, size=n_rows)
-    factor_ocupacion_granja = animales_en_granja / CAPACIDAD_GRANJA
-    
-    # Feature #11: tasa_consumo_energia_agua
-    # Prorrateo de servicios basicos por animal
-    animales_mes = {}
-    for i, fecha in enumerate(fechas_adquisicion):
-        mes_key = (fecha.year, fecha.month)
-        animales_mes[mes_key] = animales_mes.get(mes_key, 0) + cantidad_animales[i]
-    
-    tasa_consumo_energia_agua = np.array([
-        (SERVICIOS_BASICOS_MENSUALES / animales_mes[(fecha.year, fecha.month)]) * cantidad_animales[i]
-        for i, fecha in enumerate(fechas_adquisicion)
-    ])
-    
-    # Feature #12: costo_mano_obra_asignada
-    costo_mano_obra_asignada = np.array([
-        (SUELDOS_MENSUALES / animales_mes[(fecha.year, fecha.month)]) * cantidad_animales[i]
-        for i, fecha in enumerate(fechas_adquisicion)
-    ])
     
     # ========================================
     # GRUPO 4: Estadia, Alimento y Sanidad
     # ========================================
-    # Feature #13: duracion_estadia_dias (ya calculado arriba)
-    
-    # Feature #14: costo_alimentacion_total
-    # 1.5 Bs/dia/cerdo (promedio)
-    costo_alimentacion_total = cantidad_animales * duracion_estadia_dias * rng.uniform(1.0, 2.0, size=n_rows)
-    
-    # Feature #15: costo_sanitario_total
-    # Vacunas + higiene: 5-15 Bs por animal
-    costo_sanitario_total = cantidad_animales * rng.uniform(5, 15, size=n_rows)
-    
-    # Feature #16: merma_peso_transporte
-    # Perdida de 0.3-0.8 kg por cerdo durante transporte
-    merma_peso_transporte = cantidad_animales * rng.uniform(0.3, 0.8, size=n_rows)
-    
-    # Feature #17: peso_salida_esperado
-    # Ganancia de 0.8-1.5 kg/dia/cerdo
-    ganancia_por_dia = rng.uniform(0.8, 1.5, size=n_rows)
-    peso_ganado = ganancia_por_dia * duracion_estadia_dias
-    peso_salida_promedio = peso_promedio_entrada + peso_ganado - (merma_peso_transporte / cantidad_animales)
-    peso_salida_esperado = peso_salida_promedio * cantidad_animales
-    
-    # ========================================
-    # GRUPO 5: Variables Temporales y de Mercado
-    # ========================================
-    # Feature #18: mes_adquisicion
-    mes_adquisicion = np.array([fecha.month for fecha in fechas_adquisicion])
-    
-    # Feature #19: dia_semana_llegada
-    dia_semana_llegada = np.array([fecha.weekday() for fecha in fechas_adquisicion])
-    
-    # Features #20 y #21: es_feriado_proximo, dias_para_festividad
-    feriados_info = [calcular_feriado_proximo(fecha) for fecha in fechas_adquisicion]
-    es_feriado_proximo = np.array([info[0] for info in feriados_info], dtype=int)
-    dias_para_festividad = np.array([info[1] for info in feriados_info])
-    
-    # ========================================
-    # GRUPO 6: Variables Compuestas
-    # ========================================
-    # Feature #22: costo_operativo_por_cabeza
-    costo_logistica = costo_flete_estimado + costo_combustible_viaje + costo_peajes_lavado
-    costo_operativo_por_cabeza = (costo_logistica + costo_fijo_diario_lote) / cantidad_animales
-    
-    # Feature #23: ratio_alimento_precio_compra
-    ratio_alimento_precio_compra = costo_alimentacion_total / costo_adquisicion_total
-    
-    # Feature #24: indicador_eficiencia_estadia
-    indicador_eficiencia_estadia = peso_promedio_entrada / duracion_estadia_dias
+    costo_alimento_dia = rng.uniform(1.0, 2.0, size=n_rows)  # Bs/dia/cerdo
+    costo_sanitario_animal = rng.uniform(5, 15, size=n_rows)  # Vacunas + higiene
+    merma_kg_animal = rng.uniform(0.3, 0.8, size=n_rows)  # Perdida por cerdo en transporte
+    ganancia_kg_dia = rng.uniform(0.8, 1.5, size=n_rows)
+    
+    parametros = ParametrosCosto(
+        precio_diesel_litro=precio_diesel_litro,
+        flete_base=flete_base,
+        flete_por_km=flete_por_km,
+        flete_por_animal=flete_por_animal,
+        alimento_dia_animal=costo_alimento_dia,
+        sanitario_animal=costo_sanitario_animal,
+        merma_kg_animal=merma_kg_animal,
+        ganancia_kg_dia=ganancia_kg_dia,
+    )
+    
+    # ========================================
+    # Features (kernel compartido con la API)
+    # ========================================
+    f, extras = calcular_features(
+        cantidad_animales=cantidad_animales,
+        peso_promedio_entrada=peso_promedio_entrada,
+        precio_compra_kg=precio_compra_kg,
+        duracion_estadia_dias=duracion_estadia_dias,
+        fechas=fechas,
+        distancia_km=distancia_km,
+        viajes_mes=viajes_mes[idx_mes],
+        animales_en_granja=animales_en_granja,
+        animales_mes=animales_mes[idx_mes],
+        servicios_basicos_mes=SERVICIOS_BASICOS_MENSUALES,
+        mano_obra_mes=SUELDOS_MENSUALES,
+        gasto_total_mes=SERVICIOS_BASICOS_MENSUALES + SUELDOS_MENSUALES,
+        dias_festividad=dias_para_feriado(fechas, FERIADOS_2026),
+        costo_peajes_lavado=costo_peajes_lavado,
+        parametros=parametros,
+    )
     
     # ========================================
     # TARGET: Precio de venta por kg
     # ========================================
     # Calcular precio de venta basado en costos + margen
-    costo_total = (costo_adquisicion_total + costo_logistica + costo_alimentacion_total + 
-                   costo_sanitario_total + costo_fijo_diario_lote)
-    costo_por_kg = costo_total / peso_salida_esperado
+    costo_total = (f["costo_adquisicion_total"] + extras["costo_logistica_total"] +
+                   f["costo_alimentacion_total"] + f["costo_sanitario_total"] + f["costo_fijo_diario_lote"])
+    costo_por_kg = costo_total / f["peso_salida_esperado"]
+    
+    # Margen segun estacionalidad: alta demanda (dic, ene), baja (may, jun)
+    mes = f["mes_adquisicion"]
+    alta = np.isin(mes, [12, 1])
+    baja = np.isin(mes, [5, 6])
+    margen_min = np.select([alta, baja], [0.12, 0.05], default=0.08)
+    margen_max = np.select([alta, baja], [0.22, 0.12], default=0.18)
+    margen_base = rng.uniform(margen_min, margen_max)
     
-    # Margen segun estacionalidad y feriados
-    margen_base = np.zeros(n_rows)
-    for i in range(n_rows):
-        mes = mes_adquisicion[i]
-        if mes in [12, 1]:  # Alta demanda
-            margen_base[i] = rng.uniform(0.12, 0.22)
-        elif mes in [5, 6]:  # Baja demanda
-            margen_base[i] = rng.uniform(0.05, 0.12)
-        else:
-            margen_base[i] = rng.uniform(0.08, 0.18)
-        
-        # Bonus por feriado proximo
-        if es_feriado_proximo[i] and dias_para_festividad[i] <= 3:
-            margen_base[i] += 0.03
+    # Bonus por feriado proximo
+    margen_base += np.where(f["dias_para_festividad"] <= 3, 0.03, 0.0)
     
     precio_venta_kg = costo_por_kg * (1 + margen_base)
     precio_venta_kg = np.clip(precio_venta_kg, 20.0, 35.0)
@@ -249,46 +178,14 @@ def generar_lote_completo(n_rows: int) -> pd.DataFrame:
     # ========================================
     # Crear DataFrame
     # ========================================
+    decimales = {"factor_ocupacion_granja": 4, "ratio_alimento_precio_compra": 4}
     df = pd.DataFrame({
-        # Grupo 1: Adquisicion
-        "cantidad_animales": cantidad_animales,
-        "peso_promedio_entrada": np.round(peso_promedio_entrada, 2),
-        "precio_compra_kg": np.round(precio_compra_kg, 2),
-        "costo_adquisicion_total": np.round(costo_adquisicion_total, 2),
-        
-        # Grupo 2: Logistica
-        "costo_combustible_viaje": np.round(costo_combustible_viaje, 2),
-        "costo_peajes_lavado": np.round(costo_peajes_lavado, 2),
-        "costo_flete_estimado": np.round(costo_flete_estimado, 2),
-        "mantenimiento_camion_prorrateado": np.round(mantenimiento_camion_prorrateado, 2),
-        
-        # Grupo 3: Costos Fijos Dinamicos
-        "costo_fijo_diario_lote": np.round(costo_fijo_diario_lote, 2),
-        "factor_ocupacion_granja": np.round(factor_ocupacion_granja, 4),
-        "tasa_consumo_energia_agua": np.round(tasa_consumo_energia_agua, 2),
-        "costo_mano_obra_asignada": np.round(costo_mano_obra_asignada, 2),
-        
-        # Grupo 4: Estadia
-        "duracion_estadia_dias": duracion_estadia_dias,
-        "costo_alimentacion_total": np.round(costo_alimentacion_total, 2),
-        "costo_sanitario_total": np.round(costo_sanitario_total, 2),
-        "merma_peso_transporte": np.round(merma_peso_transporte, 2),
-        "peso_salida_esperado": np.round(peso_salida_esperado, 2),
-        
-        # Grupo 5: Temporales
-        "mes_adquisicion": mes_adquisicion,
-        "dia_semana_llegada": dia_semana_llegada,
-        "es_feriado_proximo": es_feriado_proximo,
-        "dias_para_festividad": dias_para_festividad,
-        
-        # Grupo 6: Compuestas
-        "costo_operativo_por_cabeza": np.round(costo_operativo_por_cabeza, 2),
-        "ratio_alimento_precio_compra": np.round(ratio_alimento_precio_compra, 4),
-        "indicador_eficiencia_estadia": np.round(indicador_eficiencia_estadia, 2),
-        
-        # TARGET
-        "precio_venta_kg": np.round(precio_venta_kg, 2),
+        nombre: f[nombre] if nombre in FEATURES_ENTERAS else np.round(f[nombre], decimales.get(nombre, 2))
+        for nombre in FEATURES_24
     })
+    df["cantidad_animales"] = cantidad_animales
+    # TARGET
+    df["precio_venta_kg"] = np.round(precio_venta_kg, 2)
     
     return df
 
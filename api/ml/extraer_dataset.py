@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Extrae el dataset de entrenamiento desde la BD (lotes reales cerrados).
+
+Recorre los lotes con Produccion y precio de venta en orden de cierre
+(paginacion keyset por fecha_cierre e id_produccion,
+services/dataset_service.py), calcula las 24 features de cada pagina en
+bloque con el kernel y escribe Parquet particionado en shards de
+~--filas-por-shard filas:
+
+    <out>/parte-00000.parquet, parte-00001.parquet, ...
+    <out>/_checkpoint.json
+
+Columnas: id_lote, fecha_adquisicion, fecha_cierre, las 24 features,
+precio_venta_kg (target), peso_salida_total y mortalidad_unidades.
+
+Cada shard se escribe a un archivo oculto y se renombra al terminar; recien
+entonces se actualiza el checkpoint (cursor del ultimo lote escrito). Si la
+extraccion se corta, la siguiente corrida descarta lo que no llego al
+checkpoint y sigue desde ahi. Volver a correrla despues agrega los lotes
+que cerraron desde entonces; --reiniciar borra todo y empieza de cero.
+
+El directorio se entrena directamente:
+    python -m ml.train_xgboost --datos ../data/reales
+
+Uso (desde api/):
+    python -m ml.extraer_dataset --out ../data/reales --filas-por-shard 50000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from db import db
+from ml.core.features_kernel import FEATURES_24
+from services import dataset_service
+
+CHECKPOINT = "_checkpoint.json"
+COLUMNAS = ["id_lote", "fecha_adquisicion", "fecha_cierre", *FEATURES_24, dataset_service.TARGET,
+            "peso_salida_total", "mortalidad_unidades"]
+
+
+def nombre_shard(n: int) -> str:
+    return f"parte-{n:05d}.parquet"
+
+
+def leer_checkpoint(out: Path) -> dict:
+    path = out / CHECKPOINT
+    if path.exists():
+        return json.loads(path.read_text())
+    return {"cursor": None, "filas": 0, "shards": []}
+
+
+def guardar_checkpoint(out: Path, checkpoint: dict) -> None:
+    checkpoint["actualizado"] = datetime.now().isoformat()
+    temporal = out / f".{CHECKPOINT}.tmp"
+    temporal.write_text(json.dumps(checkpoint, indent=2))
+    os.replace(temporal, out / CHECKPOINT)
+
+
+def limpiar(out: Path, checkpoint: dict) -> None:
+    """Borra shards y temporales que no llegaron al checkpoint (corrida interrumpida)."""
+    validos = {s["archivo"] for s in checkpoint["shards"]}
+    for path in list(out.glob("parte-*.parquet")) + list(out.glob(".*.tmp")):
+        if path.name not in validos:
+            path.unlink()
+
+
+def escribir_shard(out: Path, checkpoint: dict, filas: list, cursor: dict) -> None:
+    df = pd.DataFrame(filas, columns=COLUMNAS)
+    for columna in ("fecha_adquisicion", "fecha_cierre"):
+        df[columna] = pd.to_datetime(df[columna], utc=True)
+    df["mortalidad_unidades"] = df["mortalidad_unidades"].astype("Int64")
+
+    archivo = nombre_shard(len(checkpoint["shards"]))
+    # Oculto mientras se escribe: pd.read_parquet(<out>) ignora los archivos con "." o "_"
+    temporal = out / f".{archivo}.tmp"
+    df.to_parquet(temporal, index=False, compression="zstd")
+    os.replace(temporal, out / archivo)
+
+    checkpoint["shards"].append({
+        "archivo": archivo,
+        "filas": len(df),
+        "fecha_cierre_min": df["fecha_cierre"].min().isoformat(),
+        "fecha_cierre_max": df["fecha_cierre"].max().isoformat(),
+    })
+    checkpoint["filas"] += len(df)
+    checkpoint["cursor"] = cursor
+    guardar_checkpoint(out, checkpoint)
+
+
+async def extraer(out: Path, checkpoint: dict, filas_por_shard: int, tamano: int) -> None:
+    await db.connect()
+    try:
+        cursor = checkpoint["cursor"]
+        total = checkpoint["filas"] + await dataset_service.contar_cerrados(db, cursor)
+        desde = f"cerrados despues de {cursor['fecha_cierre']}" if cursor else "desde el inicio"
+        print(f"Lotes cerrados: {total} ({checkpoint['filas']} ya extraidos, {desde})", flush=True)
+
+        pendientes = []
+        async for producciones in dataset_service.lotes_cerrados(db, cursor, tamano=tamano):
+            pendientes.extend(await dataset_service.filas_entrenamiento(producciones))
+            cursor = dataset_service.cursor_de(producciones[-1])
+            if len(pendientes) >= filas_por_shard:
+                escribir_shard(out, checkpoint, pendientes, cursor)
+                pendientes = []
+            print(f"Progreso: {checkpoint['filas'] + len(pendientes)}/{total}", flush=True)
+        if pendientes:
+            escribir_shard(out, checkpoint, pendientes, cursor)
+    finally:
+        await db.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dataset de entrenamiento desde los lotes cerrados de la BD")
+    parser.add_argument("--out", default="../data/reales", help="Directorio de los shards")
+    parser.add_argument("--filas-por-shard", type=int, default=50000)
+    parser.add_argument("--tamano-pagina", type=int, default=1000, help="Lotes por consulta")
+    parser.add_argument("--reiniciar", action="store_true", help="Descartar lo extraido y empezar de cero")
+    args = parser.parse_args()
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    if args.reiniciar:
+        for path in out.glob("parte-*.parquet"):
+            path.unlink()
+        (out / CHECKPOINT).unlink(missing_ok=True)
+
+    checkpoint = leer_checkpoint(out)
+    limpiar(out, checkpoint)
+    asyncio.run(extraer(out, checkpoint, args.filas_por_shard, args.tamano_pagina))
+
+    cursor = checkpoint["cursor"]
+    print(f"\nDataset en {out}: {checkpoint['filas']} filas, {len(checkpoint['shards'])} shards"
+          + (f" (cerrados hasta {cursor['fecha_cierre']})" if cursor else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Reentrenamiento incremental con los lotes cerrados de la BD.
+
+Toma los lotes con Produccion (precio de venta registrado) que el modelo
+actual todavia no vio y calcula sus 24 features con el mismo codigo de la
+API (services/dataset_service.py). Dos modos:
+
+- continuar: sigue el boosting del modelo actual (`xgb_model=`) con
+  `--rondas` arboles nuevos sobre los lotes nuevos. Solo entrena esos
+  arboles: mucho mas barato que regenerar el dataset y reentrenar todo.
+- ventana: reentrena desde cero, con los mismos hiperparametros, sobre los
+  lotes cerrados de los ultimos `--ventana-dias` dias.
+
+Antes de reemplazar el modelo se compara el MAE del modelo actual y del
+candidato sobre el ultimo 20% de los lotes (los que cerraron mas
+recientemente); si empeora no se
+guarda, salvo con --forzar. El candidato aceptado se reentrena con todos
+los lotes y se escribe de forma atomica (los workers lo recargan por
+mtime); el anterior queda en <modelo>.anterior.
+
+Cada corrida se agrega al `linaje` del modelo. `cierre_hasta` (fecha de
+cierre e id_produccion del ultimo lote usado) marca hasta donde llego: la
+siguiente corrida toma los lotes que cerraron despues, aunque se hayan
+comprado antes (la primera, los cerrados desde la fecha de entrenamiento
+del modelo).
+
+Uso (desde api/):
+    python -m ml.reentrenar_incremental --modo continuar --rondas 50
+    python -m ml.reentrenar_incremental --modo ventana --ventana-dias 365
+"""
+import argparse
+import asyncio
+import os
+import pickle
+import shutil
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import settings
+from db import db
+from ml.core.deriva import PREDICCION, perfil_referencia
+from ml.core.features_kernel import FEATURES_24
+from services import dataset_service
+
+MODOS = ("continuar", "ventana")
+FRACCION_VALIDACION = 0.2
+PASOS = 4
+
+
+def paso(n: int, mensaje: str) -> None:
+    print(f"\nPaso {n}/{PASOS}: {mensaje}", flush=True)
+
+
+def cargar_modelo(path: Path) -> dict:
+    with open(path, "rb") as f:
+        datos = pickle.load(f)
+    if not isinstance(datos, dict) or "modelo" not in datos:
+        raise ValueError(f"{path} no es un modelo guardado por train_xgboost")
+    return datos
+
+
+def guardar_modelo(path: Path, datos: dict) -> None:
+    """Escribe el modelo nuevo sin dejar un archivo a medias; el anterior queda de respaldo."""
+    temporal = path.with_name(path.name + ".tmp")
+    with open(temporal, "wb") as f:
+        pickle.dump(datos, f)
+    shutil.copy2(path, path.with_name(path.name + ".anterior"))
+    os.replace(temporal, path)
+
+
+async def extraer(cursor, desde_fecha, tamano: int):
+    """Filas de los lotes cerrados despues de `cursor`, en orden de cierre, y el cursor final."""
+    await db.connect()
+    try:
+        filas = []
+        async for producciones in dataset_service.lotes_cerrados(db, cursor, desde_fecha, tamano):
+            filas.extend(await dataset_service.filas_entrenamiento(producciones))
+            cursor = dataset_service.cursor_de(producciones[-1])
+            print(f"   {len(filas)} lotes extraidos (cerrados hasta {cursor['fecha_cierre']})", flush=True)
+    finally:
+        await db.disconnect()
+    return pd.DataFrame(filas), cursor
+
+
+def entrenar(modo: str, base, X: pd.DataFrame, y: pd.Series, rondas: int):
+    params = base.get_params()
+    if modo == "continuar":
+        candidato = xgb.XGBRegressor(**{**params, "n_estimators": rondas})
+        candidato.fit(X, y, xgb_model=base.get_booster())
+    else:
+        candidato = xgb.XGBRegressor(**params)
+        candidato.fit(X, y)
+    return candidato
+
+
+def metricas(modelo, X: pd.DataFrame, y: pd.Series) -> dict:
+    y_pred = modelo.predict(X)
+    return {
+        "mae": float(mean_absolute_error(y, y_pred)),
+        "rmse": float(np.sqrt(mean_squared_error(y, y_pred))),
+        "r2": float(r2_score(y, y_pred)) if len(y) > 1 else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reentrenamiento incremental con lotes cerrados")
+    parser.add_argument("--modo", choices=MODOS, default="continuar")
+    parser.add_argument("--rondas", type=int, default=50, help="Arboles nuevos en modo continuar")
+    parser.add_argument("--ventana-dias", type=int, default=365, help="Dias de lotes en modo ventana")
+    parser.add_argument("--min-lotes", type=int, default=20, help="Lotes nuevos minimos para entrenar")
+    parser.add_argument("--tamano-pagina", type=int, default=1000)
+    parser.add_argument("--forzar", action="store_true", help="Guardar aunque empeore el MAE")
+    parser.add_argument("--modelo", default=settings.MODEL_PATH)
+    args = parser.parse_args()
+
+    path = Path(args.modelo)
+    actual = cargar_modelo(path)
+    base = actual["modelo"]
+    linaje = list(actual.get("linaje", []))
+
+    # 1. Lotes nuevos
+    cierre_hasta = actual.get("cierre_hasta")
+    if args.modo == "continuar":
+        cursor, desde_fecha = cierre_hasta, None
+        if not cursor and actual.get("fecha_entrenamiento"):
+            # fecha_entrenamiento se guarda en hora local sin zona
+            desde_fecha = datetime.fromisoformat(actual["fecha_entrenamiento"]).astimezone()
+        criterio = (f"cerrados despues de {cursor['fecha_cierre']}" if cursor
+                    else f"cerrados desde {desde_fecha}")
+    else:
+        cursor = None
+        desde_fecha = (datetime.now() - timedelta(days=args.ventana_dias)).astimezone()
+        criterio = f"cerrados en los ultimos {args.ventana_dias} dias"
+    paso(1, f"extrayendo lotes ({criterio})")
+    df, cursor_final = asyncio.run(extraer(cursor, desde_fecha, args.tamano_pagina))
+    if len(df) < args.min_lotes:
+        print(f"Sin datos suficientes: {len(df)} lotes cerrados nuevos (minimo {args.min_lotes}). Modelo sin cambios.")
+        return
+
+    # Ya vienen en orden de cierre: la validacion son los que cerraron ultimo
+    X, y = df[list(FEATURES_24)], df[dataset_service.TARGET]
+    corte = len(df) - max(1, int(len(df) * FRACCION_VALIDACION))
+
+    # 2. Candidato contra el modelo actual, sobre los lotes mas recientes
+    paso(2, f"entrenando candidato ({args.modo}) con {corte} lotes, validando con {len(df) - corte}")
+    candidato = entrenar(args.modo, base, X.iloc[:corte], y.iloc[:corte], args.rondas)
+    antes = metricas(base, X.iloc[corte:], y.iloc[corte:])
+    despues = metricas(candidato, X.iloc[corte:], y.iloc[corte:])
+    print(f"   MAE actual:    {antes['mae']:.4f} Bs/kg")
+    print(f"   MAE candidato: {despues['mae']:.4f} Bs/kg")
+    if despues["mae"] > antes["mae"] and not args.forzar:
+        print("El candidato empeora el MAE en los lotes recientes. Modelo sin cambios (usar --forzar para guardarlo).")
+        return
+
+    # 3. Modelo final con todos los lotes
+    paso(3, f"entrenando con los {len(df)} lotes")
+    modelo = entrenar(args.modo, base, X, y, args.rondas)
+
+    # 4. Guardar con linaje
+    paso(4, "guardando modelo")
+    version_base = str(actual.get("version", "1.0")).split("+")[0]
+    datos = {
+        **actual,
+        "modelo": modelo,
+        "metricas_full": metricas(modelo, X, y),
+        "version": f"{version_base}+inc{len(linaje) + 1}",
+        "fecha_entrenamiento": pd.Timestamp.now().isoformat(),
+        "cierre_hasta": cursor_final,
+        "linaje": linaje + [{
+            "fecha": pd.Timestamp.now().isoformat(),
+            "modo": args.modo,
+            "version_padre": actual.get("version", "1.0"),
+            "fecha_padre": actual.get("fecha_entrenamiento"),
+            "n_lotes": len(df),
+            "cierre_desde": cursor,
+            "cierre_hasta": cursor_final,
+            "fecha_cierre_min": df["fecha_cierre"].min().isoformat(),
+            "fecha_cierre_max": df["fecha_cierre"].max().isoformat(),
+            "rondas": args.rondas if args.modo == "continuar" else int(base.get_params()["n_estimators"]),
+            "ventana_dias": args.ventana_dias if args.modo == "ventana" else None,
+            "validacion": {"n": len(df) - corte, "mae_padre": antes["mae"], "mae_candidato": despues["mae"]},
+        }],
+    }
+    if args.modo == "ventana":
+        # La referencia del monitor de deriva pasa a ser la ventana
+        columnas = {col: X[col].to_numpy() for col in X.columns}
+        columnas[PREDICCION] = modelo.predict(X)
+        datos["distribuciones"] = perfil_referencia(columnas)
+    guardar_modelo(path, datos)
+
+    print(f"\nModelo {datos['version']} guardado en {path} (anterior: {path.name}.anterior)")
+    print(f"   Lotes: {len(df)} (cerrados hasta {cursor_final['fecha_cierre']})")
+    print(f"   MAE validacion: {antes['mae']:.4f} -> {despues['mae']:.4f} Bs/kg")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 Script de entrenamiento del modelo XGBoost con 24 features.
 Incluye K-Fold Cross-Validation, Feature Importance y metricas de evaluacion.
 """
+import sys
 import pandas as pd
 import numpy as np
 import pickle
@@ -13,6 +14,11 @@ from sklearn.model_selection import cross_val_score, KFold
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import xgboost as xgb
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ml.core.deriva import PREDICCION, perfil_referencia
+from ml.core.features_kernel import FEATURES_24
+
 # Configuracion
 SEED = 42
 K_FOLDS = 5
@@ -24,14 +30,21 @@ FEATURE_IMPORTANCE_PATH = Path("ml/models/feature_importance.png")
 MODEL_OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 
-def cargar_datos():
-    """Carga el dataset y separa features del target."""
+def cargar_datos(path=DATA_PATH):
+    """
+    Carga el dataset y separa features del target. Acepta el CSV sintetico
+    o un directorio/archivo Parquet de ml/extraer_dataset.py (lotes reales).
+    """
     print("📂 Cargando dataset...")
-    df = pd.read_csv(DATA_PATH)
+    path = Path(path)
+    if path.is_dir() or path.suffix == ".parquet":
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
     
-    # Separar features y target
+    # Separar features y target (las demas columnas del Parquet no entran)
     target_col = "precio_venta_kg"
-    feature_cols = [col for col in df.columns if col != target_col]
+    feature_cols = list(FEATURES_24)
     
     X = df[feature_cols]
     y = df[target_col]
@@ -168,8 +181,15 @@ def graficar_feature_importance(modelo, feature_cols):
     return feature_importance_df
 
 
-def guardar_modelo(modelo, metricas):
-    """Serializa el modelo y sus metricas."""
+def distribuciones_entrenamiento(modelo, X):
+    """Histogramas de cada feature y de la prediccion sobre el dataset (monitor de deriva)."""
+    columnas = {col: X[col].to_numpy() for col in X.columns}
+    columnas[PREDICCION] = modelo.predict(X)
+    return perfil_referencia(columnas)
+
+
+def guardar_modelo(modelo, metricas, X=None):
+    """Serializa el modelo, sus metricas y, con X, la distribucion de entrenamiento."""
     print(f"\n💾 Guardando modelo...")
     
     modelo_data = {
@@ -180,6 +200,8 @@ def guardar_modelo(modelo, metricas):
         'fecha_entrenamiento': pd.Timestamp.now().isoformat(),
         'n_features': 24
     }
+    if X is not None:
+        modelo_data['distribuciones'] = distribuciones_entrenamiento(modelo, X)
     
     with open(MODEL_OUTPUT_PATH, 'wb') as f:
         pickle.dump(modelo_data, f)
@@ -187,13 +209,13 @@ def guardar_modelo(modelo, metricas):
     print(f"✅ Modelo guardado: {MODEL_OUTPUT_PATH}")
 
 
-def main():
+def main(datos=DATA_PATH):
     print("="*60)
     print("🚀 ENTRENAMIENTO MODELO XGBOOST - 24 FEATURES")
     print("="*60)
     
     # 1. Cargar datos
-    X, y, feature_cols = cargar_datos()
+    X, y, feature_cols = cargar_datos(datos)
     
     # 2. Entrenar modelo
     modelo = entrenar_modelo(X, y)
@@ -212,7 +234,7 @@ def main():
         'cv': metricas_cv,
         'full': metricas_full
     }
-    guardar_modelo(modelo, metricas)
+    guardar_modelo(modelo, metricas, X)
     
     print("\n" + "="*60)
     print("✅ ENTRENAMIENTO COMPLETADO EXITOSAMENTE")
@@ -229,4 +251,7 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Entrena el modelo XGBoost de 24 features")
+    parser.add_argument("--datos", default=DATA_PATH, help="CSV o directorio Parquet (ml/extraer_dataset.py)")
+    main(parser.parse_args().datos)
@@ -1,6 +1,7 @@
 # api/routes/features.py
 from flask import Blueprint, jsonify, request
 from utils.auth_guard import require_jwt
+from utils.http_cache import condicional
 from services.features_service import build_features_para_modelo
 from db import connect_db, disconnect_db
 import asyncio
@@ -14,6 +15,7 @@ logger = logging.getLogger(__name__)
 # -----------------------------
 @bp.get("/lotes/<int:id_lote>/features")
 @require_jwt
+@condicional("lotes", "costos", "tipos_costo", "gastos_mensuales", "feriados")
 def get_lote_features(id_lote: int):
     """
     Obtiene las features (variables) y extras (fijos) para un lote.
@@ -1,6 +1,8 @@
 from flask import Blueprint, jsonify, request
 from utils.auth_guard import require_jwt
+from utils.http_cache import condicional
 from db import db
+from services import ocupacion_service
 import asyncio
 from datetime import datetime
 import logging
@@ -13,6 +15,7 @@ logger = logging.getLogger("analytics_v1")
 # -----------------------------
 @bp.get("/dashboard/overview")
 @require_jwt
+@condicional("lotes", "costos", "tipos_costo")
 def dashboard_overview():
     """
     Devuelve la información consolidada del dashboard en una sola llamada.
@@ -57,6 +60,51 @@ def dashboard_overview():
 
     return jsonify(data), 200
 
+# -----------------------------
+# GET /dashboard/ocupacion
+# -----------------------------
+@bp.get("/dashboard/ocupacion")
+@require_jwt
+def dashboard_ocupacion():
+    """
+    Serie diaria de ocupacion de la granja: animales de los lotes adquiridos
+    en +/- 7 dias de cada fecha y su factor sobre la capacidad (la misma
+    cuenta que la feature factor_ocupacion_granja).
+
+    Query params:
+    - desde / hasta: rango de fechas (default: todo el historial de lotes)
+    """
+    desde = _parse_iso_date(request.args.get("desde"))
+    hasta = _parse_iso_date(request.args.get("hasta"))
+    if desde and hasta and desde > hasta:
+        return jsonify(error="rango_fechas_invalido"), 400
+
+    async def _run():
+        await db.connect()
+        try:
+            return await ocupacion_service.obtener_indice(db)
+        finally:
+            await db.disconnect()
+
+    try:
+        indice = asyncio.run(_run())
+    except Exception as exc:
+        logger.exception("Error construyendo ocupacion del dashboard: %s", exc)
+        return jsonify(error="dashboard_ocupacion_error"), 500
+
+    dias, animales = indice.serie(desde.date() if desde else None, hasta.date() if hasta else None)
+    factores = ocupacion_service.factor_ocupacion(animales)
+    serie = [
+        {"fecha": str(dia), "animales": int(n), "factor": round(float(f), 4)}
+        for dia, n, f in zip(dias, animales, factores)
+    ]
+    return jsonify(
+        capacidad=ocupacion_service.CAPACIDAD_GRANJA,
+        ventana_dias=ocupacion_service.VENTANA_OCUPACION_DIAS,
+        factor_promedio=round(float(factores.mean()), 4) if serie else None,
+        serie=serie,
+    ), 200
+
 # -----------------------------
 # Helpers
 # -----------------------------
@@ -1,24 +1,36 @@
 from flask import Blueprint, request, jsonify
-import jwt, time
+import asyncio, jwt, secrets, time
 from config import settings
-from services.auth_service import get_user_by_email, verify_password
+from services.auth_service import LoginSaturado, obtener_usuario, verificar_password
+from utils.auth_guard import (
+    AUDIENCIA_ACCESO, AUDIENCIA_REFRESH, EMISOR,
+    require_jwt, revocar_token, token_del_request, verificar_refresh_token,
+)
 
 bp = Blueprint("auth_v1", __name__)
 
-# Generar token JWT
-def make_token(sub: str, uid: int, role_id: int):
+def _firmar(sub: str, uid: int, role_id: int, audiencia: str, duracion: int):
     now = int(time.time())
     payload = {
         "sub": sub,
         "uid": uid,
         "role": role_id,
         "iat": now,
-        "exp": now + 3600,  # 1 hora
-        "iss": "granja-del-cerdo-api",
-        "aud": "granja-ui",
+        "exp": now + duracion,
+        "jti": secrets.token_urlsafe(8),  # Dos tokens del mismo segundo no son iguales (revocacion)
+        "iss": EMISOR,
+        "aud": audiencia,
     }
     return jwt.encode(payload, settings.JWT_SECRET, algorithm="HS256")
 
+# Generar token JWT de acceso (corto; se renueva con /refresh)
+def make_token(sub: str, uid: int, role_id: int):
+    return _firmar(sub, uid, role_id, AUDIENCIA_ACCESO, settings.ACCESS_TOKEN_TTL_SECONDS)
+
+# Generar refresh token (largo; solo sirve para pedir access tokens)
+def make_refresh_token(sub: str, uid: int, role_id: int):
+    return _firmar(sub, uid, role_id, AUDIENCIA_REFRESH, settings.REFRESH_TOKEN_TTL_SECONDS)
+
 # Endpoint: /api/v1/login
 @bp.post("/login")
 def login():
@@ -33,16 +45,19 @@ def login():
             if not email or not password:
                 return jsonify(error="email_and_password_required"), 400
 
-            # Buscar usuario con Prisma
-            user = await get_user_by_email(email)
-            if not user or not verify_password(password, user.password_hash):
+            # Buscar usuario (cacheado unos segundos) y verificar bcrypt en el pool
+            user = await obtener_usuario(email)
+            if not user or not await verificar_password(password, user.password_hash):
                 return jsonify(error="invalid_credentials"), 401
 
-            # Generar token JWT
+            # Generar tokens JWT
             token = make_token(user.email, user.id_usuario, user.id_rol or 0)
+            refresh = make_refresh_token(user.email, user.id_usuario, user.id_rol or 0)
 
             return jsonify(
                 access_token=token,
+                refresh_token=refresh,
+                expires_in=settings.ACCESS_TOKEN_TTL_SECONDS,
                 user={
                     "id": user.id_usuario,
                     "email": user.email,
@@ -50,6 +65,10 @@ def login():
                     "role": user.id_rol,
                 },
             )
+        except LoginSaturado:
+            resp = jsonify(error="login_saturado")
+            resp.headers["Retry-After"] = "1"
+            return resp, 503
         except Exception as e:
             print(f"Error en login: {e}")
             return jsonify(error=str(e)), 500
@@ -59,3 +78,51 @@ def login():
     except Exception as e:
         print(f"Error en asyncio.run: {e}")
         return jsonify(error="internal_server_error"), 500
+
+
+# Endpoint: /api/v1/refresh (access token nuevo sin contraseña: sin bcrypt; el
+# usuario se relee de la cache del login, asi uno borrado o con otro rol no
+# sigue recibiendo tokens con los datos viejos)
+@bp.post("/refresh")
+def refresh():
+    data = request.get_json(silent=True) or {}
+    refresh_token = data.get("refresh_token") or ""
+    if not refresh_token:
+        return jsonify(error="refresh_token_required"), 400
+    try:
+        payload = verificar_refresh_token(refresh_token)
+    except jwt.ExpiredSignatureError:
+        return jsonify(error="invalid_token", detail="Refresh token expired"), 401
+    except Exception as e:
+        return jsonify(error="invalid_token", detail=str(e)), 401
+
+    try:
+        user = asyncio.run(obtener_usuario(payload["sub"]))
+    except Exception as e:
+        print(f"Error en refresh: {e}")
+        return jsonify(error="internal_server_error"), 500
+    if user is None or user.id_usuario != payload["uid"]:
+        return jsonify(error="invalid_token", detail="User no longer exists"), 401
+
+    token = make_token(user.email, user.id_usuario, user.id_rol or 0)
+    return jsonify(access_token=token, expires_in=settings.ACCESS_TOKEN_TTL_SECONDS)
+
+
+# Endpoint: /api/v1/logout (revoca los tokens en todos los workers)
+@bp.post("/logout")
+@require_jwt
+def logout():
+    data = request.get_json(silent=True) or {}
+    try:
+        revocar_token(token_del_request(), exp=request.user.get("exp"))
+        if data.get("refresh_token"):
+            # Solo si es un refresh token valido de este mismo usuario
+            payload = verificar_refresh_token(data["refresh_token"])
+            if payload.get("uid") == request.user.get("uid"):
+                revocar_token(data["refresh_token"], exp=payload.get("exp"))
+    except jwt.InvalidTokenError:
+        pass  # Refresh token ya vencido o revocado: no hay nada que revocar
+    except Exception as e:
+        print(f"Error en logout: {e}")
+        return jsonify(error="internal_server_error"), 500
+    return jsonify(ok=True)
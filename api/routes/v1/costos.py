@@ -3,7 +3,9 @@ from flask_pydantic import validate
 from pydantic import BaseModel, Field
 from datetime import datetime
 from utils.auth_guard import require_jwt
+from utils.http_cache import condicional
 from db import db
+from services.bulk_service import TIMEOUT_TRANSACCION, reservar_ids
 import asyncio
 
 bp = Blueprint("costos_v1", __name__)
@@ -32,6 +34,12 @@ class CostoCreate(BaseModel):
     id_tipo_costo: int = Field(gt=0)
     descripcion: str | None = Field(default=None, max_length=200)
 
+class CostoBulkItem(CostoCreate):
+    id_lote: int | None = Field(default=None, gt=0)
+
+class CostosBulkCreate(BaseModel):
+    costos: list[CostoBulkItem] = Field(min_length=1, max_length=5000)
+
 class CostoUpdate(BaseModel):
     monto: float | None = Field(default=None, gt=0)
     fecha_gasto: str | None = Field(default=None)
@@ -40,6 +48,7 @@ class CostoUpdate(BaseModel):
 
 @bp.get("/lotes/<int:id_lote>/costos")
 @require_jwt
+@condicional("lotes", "costos", "tipos_costo")
 def listar_costos(id_lote: int):
     async def _listar_costos():
         await db.connect()
@@ -113,6 +122,91 @@ def crear_costo(id_lote: int, body: CostoCreate):
     
     return jsonify(costo_data), 201
 
+async def _crear_costos_bulk(items: list[CostoBulkItem]):
+    """
+    Valida e inserta varias líneas de costo (posiblemente de distintos lotes).
+    La existencia de lotes y tipos se valida con dos consultas de conjunto y
+    la inserción es un único create_many en una transacción: todo o nada.
+    """
+    errores = []
+    filas = []
+    for i, item in enumerate(items):
+        if item.id_lote is None:
+            errores.append({"indice": i, "campo": "id_lote", "mensaje": "id_lote es requerido"})
+            continue
+        try:
+            fecha = parse_iso(item.fecha_gasto)
+        except ValueError:
+            errores.append({"indice": i, "campo": "fecha_gasto", "mensaje": "Formato de fecha inválido"})
+            continue
+        filas.append((i, {
+            "id_lote": item.id_lote,
+            "monto": item.monto,
+            "fecha_gasto": fecha,
+            "descripcion": item.descripcion,
+            "id_tipo_costo": item.id_tipo_costo,
+        }))
+
+    await db.connect()
+    try:
+        ids_lote = list({f["id_lote"] for _, f in filas})
+        ids_tipo = list({f["id_tipo_costo"] for _, f in filas})
+        lotes = await db.lote.find_many(where={"id_lote": {"in": ids_lote}}) if ids_lote else []
+        tipos = await db.tipocosto.find_many(where={"id_tipo_costo": {"in": ids_tipo}}) if ids_tipo else []
+        lotes_ok = {l.id_lote for l in lotes}
+        tipos_ok = {t.id_tipo_costo for t in tipos}
+
+        for i, f in filas:
+            if f["id_lote"] not in lotes_ok:
+                errores.append({"indice": i, "campo": "id_lote", "mensaje": f"Lote {f['id_lote']} no encontrado"})
+            if f["id_tipo_costo"] not in tipos_ok:
+                errores.append({"indice": i, "campo": "id_tipo_costo",
+                                "mensaje": f"Tipo de costo {f['id_tipo_costo']} no encontrado"})
+        if errores:
+            errores.sort(key=lambda e: e["indice"])
+            return None, errores
+
+        ids = await reservar_ids(db, "Costo", "id_costo", len(filas))
+        data = [{"id_costo": id_costo, **f} for id_costo, (_, f) in zip(ids, filas)]
+        async with db.tx(timeout=TIMEOUT_TRANSACCION) as tx:
+            creados = await tx.costo.create_many(data=data)
+        return {"costos_creados": creados, "ids_creados": ids}, None
+    finally:
+        await db.disconnect()
+
+@bp.post("/costos/bulk")
+@require_jwt
+@validate()
+def crear_costos_bulk(body: CostosBulkCreate):
+    """
+    Registra muchas líneas de costo de una vez (p. ej. una factura completa),
+    pudiendo abarcar varios lotes. Cada línea requiere id_lote.
+    Si alguna línea es inválida no se inserta ninguna (422 con errores por índice).
+    """
+    result, errores = asyncio.run(_crear_costos_bulk(body.costos))
+    if errores:
+        return jsonify(error="costos_invalidos", errores=errores), 422
+    return jsonify(result), 201
+
+@bp.post("/lotes/<int:id_lote>/costos/bulk")
+@require_jwt
+@validate()
+def crear_costos_bulk_lote(id_lote: int, body: CostosBulkCreate):
+    """
+    Registra muchas líneas de costo para un mismo lote (id_lote de la ruta).
+    """
+    for item in body.costos:
+        if item.id_lote is not None and item.id_lote != id_lote:
+            return jsonify(error="id_lote_no_coincide"), 400
+        item.id_lote = id_lote
+
+    result, errores = asyncio.run(_crear_costos_bulk(body.costos))
+    if errores:
+        if any(e["campo"] == "id_lote" for e in errores):
+            return jsonify(error="Lote no encontrado"), 404
+        return jsonify(error="costos_invalidos", errores=errores), 422
+    return jsonify(result), 201
+
 @bp.patch("/lotes/<int:id_lote>/costos/<int:id_costo>")
 @require_jwt
 @validate()
@@ -0,0 +1,59 @@
+from flask import Blueprint, Response, jsonify, stream_with_context
+from flask_pydantic import validate
+from pydantic import BaseModel, Field
+from datetime import date
+from typing import Literal
+from utils.auth_guard import require_jwt
+from services import export_service
+
+bp = Blueprint("export_v1", __name__)
+
+# ---------------------------------------------------
+# 📦 MODELOS
+# ---------------------------------------------------
+class ExportQuery(BaseModel):
+    formato: Literal["arrow", "parquet"] = "arrow"
+    desde: date | None = Field(default=None, description="Fecha del dataset >= desde")
+    hasta: date | None = Field(default=None, description="Fecha del dataset <= hasta")
+    id_lote: int | None = Field(default=None, gt=0)
+
+# ---------------------------------------------------
+# 🔹 GET /export/<dataset>
+# ---------------------------------------------------
+@bp.get("/export/<string:dataset>")
+@require_jwt
+@validate()
+def exportar_dataset(dataset: str, query: ExportQuery):
+    """
+    Exporta lotes, costos (con tipo y categoria) o predicciones en formato
+    columnar, escrito por bloques a medida que se lee de la BD.
+
+    Path:
+    - dataset: lotes | costos | predicciones
+
+    Query params:
+    - formato: arrow (IPC stream, default) | parquet
+    - desde, hasta (YYYY-MM-DD): sobre fecha_adquisicion, fecha_gasto o
+      fecha_prediccion segun el dataset
+    - id_lote: solo las filas de ese lote
+
+    Lectura desde pandas:
+        pa.ipc.open_stream(resp.content).read_pandas()
+        pd.read_parquet(io.BytesIO(resp.content))
+    """
+    if dataset not in export_service.DATASETS:
+        return jsonify(error="dataset_invalido", disponibles=list(export_service.DATASETS)), 404
+    if query.desde and query.hasta and query.desde > query.hasta:
+        return jsonify(error="rango_fechas_invalido"), 400
+    if not export_service.pyarrow_disponible():
+        return jsonify(error="exportacion_no_disponible", detail="pyarrow no esta instalado"), 501
+
+    cuerpo = export_service.exportar(
+        dataset, query.formato, desde=query.desde, hasta=query.hasta, id_lote=query.id_lote,
+    )
+    extension = "arrows" if query.formato == "arrow" else "parquet"
+    return Response(
+        stream_with_context(cuerpo),
+        mimetype=export_service.FORMATOS[query.formato],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{extension}"'},
+    )
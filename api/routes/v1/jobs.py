@@ -0,0 +1,94 @@
+from flask import Blueprint, jsonify, request
+from flask_pydantic import validate
+from pydantic import BaseModel, Field
+from utils.auth_guard import require_jwt
+from services import jobs_service
+
+bp = Blueprint("jobs_v1", __name__)
+
+class TrabajoCreate(BaseModel):
+    tipo: str = Field(min_length=1, description="Tipo de trabajo (ver GET /trabajos/tipos)")
+    parametros: dict | None = Field(default=None, description="Parametros propios del tipo de trabajo")
+
+# ---------------------------------------------------
+# 🔹 GET /trabajos/tipos
+# ---------------------------------------------------
+@bp.get("/trabajos/tipos")
+@require_jwt
+def listar_tipos_trabajo():
+    """
+    Lista los tipos de trabajo disponibles y sus parametros por defecto.
+    """
+    tipos = [
+        {
+            "tipo": nombre,
+            "descripcion": spec["descripcion"],
+            "parametros": {p: default for p, (_, default) in spec["parametros"].items()},
+        }
+        for nombre, spec in jobs_service.TIPOS_TRABAJO.items()
+    ]
+    return jsonify(tipos), 200
+
+# ---------------------------------------------------
+# 🔹 POST /trabajos
+# ---------------------------------------------------
+@bp.post("/trabajos")
+@require_jwt
+@validate()
+def crear_trabajo(body: TrabajoCreate):
+    """
+    Encola un trabajo largo (reentrenamiento, generacion de dataset, poblado de BD).
+    Responde 202 de inmediato; el progreso se consulta en GET /trabajos/<id>.
+    """
+    payload = getattr(request, "user", {})
+    try:
+        trabajo = jobs_service.encolar(body.tipo, body.parametros, id_usuario=payload.get("uid"))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(trabajo), 202
+
+# ---------------------------------------------------
+# 🔹 GET /trabajos
+# ---------------------------------------------------
+@bp.get("/trabajos")
+@require_jwt
+def listar_trabajos():
+    """
+    Lista los trabajos mas recientes.
+
+    Query params:
+    - estado: PENDIENTE | EN_CURSO | COMPLETADO | FALLIDO | CANCELADO (opcional)
+    - limit: cantidad maxima (default 50)
+    """
+    estado = (request.args.get("estado") or "").upper() or None
+    if estado and estado not in jobs_service.ESTADOS:
+        return jsonify(error="estado_invalido"), 400
+    limit = min(request.args.get("limit", default=50, type=int) or 50, 500)
+
+    jobs_service.iniciar_despachador()
+    return jsonify(jobs_service.listar(estado=estado, limit=limit)), 200
+
+# ---------------------------------------------------
+# 🔹 GET /trabajos/<id>
+# ---------------------------------------------------
+@bp.get("/trabajos/<int:id_trabajo>")
+@require_jwt
+def obtener_trabajo(id_trabajo: int):
+    """
+    Devuelve estado, progreso (0-1), ultimas lineas de log y tiempos de un trabajo.
+    """
+    trabajo = jobs_service.obtener(id_trabajo)
+    if not trabajo:
+        return jsonify(error="Trabajo no encontrado"), 404
+    return jsonify(trabajo), 200
+
+# ---------------------------------------------------
+# 🔹 POST /trabajos/<id>/cancelar
+# ---------------------------------------------------
+@bp.post("/trabajos/<int:id_trabajo>/cancelar")
+@require_jwt
+def cancelar_trabajo(id_trabajo: int):
+    trabajo = jobs_service.cancelar(id_trabajo)
+    if not trabajo:
+        return jsonify(error="Trabajo no encontrado"), 404
+    return jsonify(trabajo), 200
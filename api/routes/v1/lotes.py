@@ -2,10 +2,22 @@ from flask import Blueprint, jsonify, request
 from flask_pydantic import validate
 from pydantic import BaseModel, Field
 from utils.auth_guard import require_jwt
+from utils.http_cache import condicional
 from db import db, connect_db, disconnect_db
+from config import settings
+from routes.v1.costos import CostoCreate, parse_iso
+from services.bulk_service import ReporteThroughput, insertar_grupos, reservar_ids
+from services import ocupacion_service
+from services.import_service import (
+    MAX_ERRORES_REPORTADOS, detectar_formato, formatear_errores_validacion, iterar_filas
+)
 import re
+import json
+import base64
+import binascii
 import asyncio
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from typing import Literal
 
 
 bp = Blueprint("lotes_v1", __name__)
@@ -17,6 +29,21 @@ class LoteCreate(BaseModel):
     duracion_estadia_dias: int | None = Field(default=None, ge=0, le=7)  
     precio_compra_kg: float | None = Field(default=None, gt=0)  
 
+def parse_fecha_lote(fecha_str: str) -> datetime:
+    """
+    Parsea la fecha de adquisición (ISO con o sin Z, o "YYYY-MM-DD")
+    y la normaliza a 00:00:00. Lanza ValueError si el formato no es válido.
+    """
+    try:
+        # ISO completo con Z o sin Z
+        clean_str = re.sub(r"Z$", "", fecha_str.strip())
+        fecha = datetime.fromisoformat(clean_str)
+    except ValueError:
+        # Formato solo fecha (YYYY-MM-DD)
+        fecha = datetime.strptime(fecha_str.strip(), "%Y-%m-%d")
+    # Asegurar que la hora sea 00:00:00 (solo fecha)
+    return fecha.replace(hour=0, minute=0, second=0, microsecond=0)
+
 @bp.post("/lotes")
 @require_jwt
 @validate()
@@ -28,23 +55,11 @@ def create_lote(body: LoteCreate):
         fecha_str = body.fecha_adquisicion
         print(f"🧭 Valor recibido en fecha_adquisicion: {fecha_str}")
 
-        # Intentar parsear fecha en distintos formatos
-        fecha = None
         try:
-            # ISO completo con Z o sin Z
-            clean_str = re.sub(r"Z$", "", fecha_str.strip())
-            fecha = datetime.fromisoformat(clean_str)
-            # Asegurar que la hora sea 00:00:00 (solo fecha)
-            fecha = fecha.replace(hour=0, minute=0, second=0, microsecond=0)
-        except Exception:
-            try:
-                # Formato solo fecha (YYYY-MM-DD)
-                fecha = datetime.strptime(fecha_str.strip(), "%Y-%m-%d")
-                # Asegurar que la hora sea 00:00:00 (solo fecha)
-                fecha = fecha.replace(hour=0, minute=0, second=0, microsecond=0)
-            except Exception as e:
-                print(f"⚠️ Error al convertir fecha: {e}")
-                return None, "invalid_fecha_adquisicion_format"
+            fecha = parse_fecha_lote(fecha_str)
+        except ValueError as e:
+            print(f"⚠️ Error al convertir fecha: {e}")
+            return None, "invalid_fecha_adquisicion_format"
 
         await connect_db()
         try:
@@ -58,6 +73,7 @@ def create_lote(body: LoteCreate):
                     "id_usuario_creador": id_usuario,
                 }
             )
+            ocupacion_service.registrar_cambios([(lote.fecha_adquisicion, lote.cantidad_animales, 1)])
             return lote.dict(), None
         finally:
             await disconnect_db()
@@ -67,63 +83,335 @@ def create_lote(body: LoteCreate):
         return jsonify(error=error), 400
     return jsonify(lote_data), 201
     
+# Una importación atómica mantiene una sola transacción abierta de principio a fin
+TIMEOUT_IMPORTACION_ATOMICA = timedelta(minutes=10)
+
+class _ImportacionAbortada(Exception):
+    """Se lanza dentro de la transacción para revertir una importación atómica."""
+
+class _ErrorFila(Exception):
+    """Error de validación de una fila de importación, ya formateado por campo."""
+    def __init__(self, detalle):
+        super().__init__("fila_invalida")
+        self.detalle = detalle
+
+@bp.post("/lotes/import")
+@require_jwt
+def import_lotes():
+    """
+    Importa lotes en bloque desde un archivo CSV o NDJSON, leído en streaming.
+
+    El archivo se envía como cuerpo crudo (Content-Type: text/csv o
+    application/x-ndjson) o como multipart en el campo "archivo". Cada fila
+    se valida con las reglas de LoteCreate. En NDJSON un lote puede traer
+    una lista "costos" con el formato de POST /lotes/<id>/costos.
+
+    Query params:
+    - formato: csv | ndjson (si no se deduce del Content-Type o la extensión)
+    - atomico: si true, todo o nada en una sola transacción. Por defecto
+      cada bloque se confirma por separado y las filas inválidas se reportan.
+    - chunk_size: lotes por bloque (default BULK_CHUNK_SIZE)
+    """
+    archivo = request.files.get("archivo")
+    if archivo:
+        stream, content_type, filename = archivo.stream, archivo.mimetype, archivo.filename
+    else:
+        stream, content_type, filename = request.stream, request.content_type, None
+
+    formato = detectar_formato(request.args.get("formato"), content_type, filename)
+    if not formato:
+        return jsonify(error="formato_no_soportado", detail="Use CSV o NDJSON"), 400
+
+    atomico = (request.args.get("atomico") or "").lower() in ("1", "true", "yes", "y")
+    chunk_size = request.args.get("chunk_size", type=int) or settings.BULK_CHUNK_SIZE
+    id_usuario = getattr(request, "user", {}).get("uid")
+
+    async def _import_lotes():
+        reporte = ReporteThroughput()
+        errores = []
+        resumen = {"filas_leidas": 0, "errores_total": 0}
+        ids_creados = []
+        altas_ocupacion = []
+
+        def registrar_error(filas, detalle):
+            resumen["errores_total"] += len(filas)
+            if len(errores) < MAX_ERRORES_REPORTADOS:
+                errores.append({"filas": filas, "errores": detalle})
+
+        def validar_fila(raw, tipos_validos):
+            if isinstance(raw, Exception):
+                raise raw
+            if not isinstance(raw, dict):
+                raise ValueError("La fila debe ser un objeto JSON")
+            costos_raw = raw.pop("costos", None) or []
+            body = LoteCreate.model_validate(raw)
+            try:
+                fecha = parse_fecha_lote(body.fecha_adquisicion)
+            except ValueError:
+                raise _ErrorFila([{"campo": "fecha_adquisicion", "mensaje": "invalid_fecha_adquisicion_format"}])
+
+            costos = []
+            for i, c in enumerate(costos_raw):
+                try:
+                    costo = CostoCreate.model_validate(c)
+                    if costo.id_tipo_costo not in tipos_validos:
+                        raise ValueError(f"Tipo de costo {costo.id_tipo_costo} no encontrado")
+                    costos.append({
+                        "monto": costo.monto,
+                        "fecha_gasto": parse_iso(costo.fecha_gasto),
+                        "descripcion": costo.descripcion,
+                        "id_tipo_costo": costo.id_tipo_costo,
+                    })
+                except Exception as e:
+                    raise _ErrorFila(formatear_errores_validacion(e, prefijo=f"costos[{i}]."))
+
+            lote_data = {
+                "fecha_adquisicion": fecha,
+                "cantidad_animales": body.cantidad_animales,
+                "peso_promedio_entrada": body.peso_promedio_entrada,
+                "duracion_estadia_dias": body.duracion_estadia_dias,
+                "precio_compra_kg": body.precio_compra_kg,
+                "id_usuario_creador": id_usuario,
+            }
+            return lote_data, costos
+
+        async def escribir(cliente, bloque):
+            ids = await reservar_ids(cliente, "Lote", "id_lote", len(bloque))
+            grupo = {"lote": [], "costo": []}
+            for id_lote, (_, lote_data, costos) in zip(ids, bloque):
+                grupo["lote"].append({"id_lote": id_lote, **lote_data})
+                grupo["costo"].extend({"id_lote": id_lote, **c} for c in costos)
+            await insertar_grupos(cliente, [grupo], reporte=reporte, transaccion=not atomico)
+            ids_creados.extend(ids)
+            altas_ocupacion.extend(
+                (lote_data["fecha_adquisicion"], lote_data["cantidad_animales"], 1) for _, lote_data, _ in bloque
+            )
+
+        async def escribir_seguro(cliente, bloque):
+            if atomico:
+                await escribir(cliente, bloque)
+                return
+            try:
+                await escribir(cliente, bloque)
+            except Exception as e:
+                registrar_error([n for n, _, _ in bloque], [{"campo": None, "mensaje": str(e)}])
+
+        async def procesar(cliente):
+            tipos_validos = {t.id_tipo_costo for t in await cliente.tipocosto.find_many()}
+            bloque = []
+            for numero, raw in iterar_filas(stream, formato):
+                resumen["filas_leidas"] += 1
+                try:
+                    lote_data, costos = validar_fila(raw, tipos_validos)
+                except _ErrorFila as e:
+                    registrar_error([numero], e.detalle)
+                    continue
+                except Exception as e:
+                    registrar_error([numero], formatear_errores_validacion(e))
+                    continue
+
+                # En modo atómico, tras el primer error solo se sigue validando
+                if atomico and resumen["errores_total"]:
+                    continue
+                bloque.append((numero, lote_data, costos))
+                if len(bloque) >= chunk_size:
+                    await escribir_seguro(cliente, bloque)
+                    bloque = []
+            if bloque and not (atomico and resumen["errores_total"]):
+                await escribir_seguro(cliente, bloque)
+
+        await connect_db()
+        try:
+            if atomico:
+                try:
+                    async with db.tx(timeout=TIMEOUT_IMPORTACION_ATOMICA) as tx:
+                        await procesar(tx)
+                        if resumen["errores_total"]:
+                            raise _ImportacionAbortada()
+                except _ImportacionAbortada:
+                    ids_creados.clear()
+                    altas_ocupacion.clear()
+                    reporte.filas.clear()
+            else:
+                await procesar(db)
+        finally:
+            await disconnect_db()
+        ocupacion_service.registrar_cambios(altas_ocupacion)
+
+        return {
+            "formato": formato,
+            "atomico": atomico,
+            "filas_leidas": resumen["filas_leidas"],
+            "lotes_creados": reporte.filas.get("lote", 0),
+            "costos_creados": reporte.filas.get("costo", 0),
+            "ids_creados": ids_creados,
+            "errores_total": resumen["errores_total"],
+            "errores": errores,
+            "throughput": reporte.resumen(),
+        }
+
+    try:
+        resultado = asyncio.run(_import_lotes())
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify(error=f"Error al importar lotes: {str(e)}"), 500
+
+    if resultado["errores_total"] == 0:
+        return jsonify(resultado), 201
+    if atomico:
+        return jsonify(resultado), 422
+    return jsonify(resultado), 200
+
+# Paginación por cursor (keyset): cada orden tiene un índice que lo respalda
+ORDENES_LOTES = {
+    "id_desc": [{"id_lote": "desc"}],
+    "id_asc": [{"id_lote": "asc"}],
+    "fecha_desc": [{"fecha_adquisicion": "desc"}, {"id_lote": "desc"}],
+    "fecha_asc": [{"fecha_adquisicion": "asc"}, {"id_lote": "asc"}],
+}
+MAX_LIMIT_LOTES = 500
+
+class LotesQuery(BaseModel):
+    limit: int = Field(default=50, gt=0, le=MAX_LIMIT_LOTES)
+    cursor: str | None = Field(default=None, description="Valor de X-Next-Cursor de la página anterior")
+    orden: Literal["id_desc", "id_asc", "fecha_desc", "fecha_asc"] = "id_desc"
+    id_lote: int | None = Field(default=None, gt=0)
+    desde: date | None = Field(default=None, description="fecha_adquisicion >= desde")
+    hasta: date | None = Field(default=None, description="fecha_adquisicion <= hasta")
+    ubicacion_origen: str | None = None
+    min_animales: int | None = Field(default=None, ge=0)
+    max_animales: int | None = Field(default=None, ge=0)
+    con_produccion: bool | None = None
+    incluir_total: bool = Field(default=False, description="Calcular X-Total-Count también en páginas siguientes")
+
+def _codificar_cursor(lote, orden: str) -> str:
+    valores = {"id": lote.id_lote}
+    if orden.startswith("fecha"):
+        valores["f"] = lote.fecha_adquisicion.isoformat()
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode().rstrip("=")
+
+def _decodificar_cursor(cursor: str, orden: str) -> dict:
+    """Lanza ValueError si el cursor no corresponde al orden pedido."""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        valores = {"id": int(valores["id"]), "f": valores.get("f")}
+        if orden.startswith("fecha"):
+            valores["f"] = datetime.fromisoformat(valores["f"])
+    except (ValueError, TypeError, KeyError, binascii.Error) as e:
+        raise ValueError("cursor_invalido") from e
+    return valores
+
+def _filtros_lotes(query: LotesQuery) -> dict:
+    where = {}
+    if query.id_lote is not None:
+        where["id_lote"] = query.id_lote
+    fecha = {}
+    if query.desde:
+        fecha["gte"] = datetime.combine(query.desde, datetime.min.time())
+    if query.hasta:
+        fecha["lt"] = datetime.combine(query.hasta + timedelta(days=1), datetime.min.time())
+    if fecha:
+        where["fecha_adquisicion"] = fecha
+    if query.ubicacion_origen:
+        where["ubicacion_origen"] = query.ubicacion_origen.strip()
+    animales = {}
+    if query.min_animales is not None:
+        animales["gte"] = query.min_animales
+    if query.max_animales is not None:
+        animales["lte"] = query.max_animales
+    if animales:
+        where["cantidad_animales"] = animales
+    if query.con_produccion is not None:
+        where["produccion"] = {"is_not": None} if query.con_produccion else {"is": None}
+    return where
+
+def _filtro_cursor(cursor: dict, orden: str) -> dict:
+    op = "lt" if orden.endswith("desc") else "gt"
+    if orden.startswith("id"):
+        return {"id_lote": {op: cursor["id"]}}
+    return {"OR": [
+        {"fecha_adquisicion": {op: cursor["f"]}},
+        {"fecha_adquisicion": cursor["f"], "id_lote": {op: cursor["id"]}},
+    ]}
+
 @bp.get("/lotes")
 @require_jwt
-def get_lotes():
+@condicional("lotes", "produccion")
+@validate()
+def get_lotes(query: LotesQuery):
+    """
+    Lista lotes con paginación por cursor y filtros en el servidor.
+
+    Query params:
+    - limit: lotes por página (default 50, máximo 500)
+    - cursor: valor de X-Next-Cursor de la respuesta anterior
+    - orden: id_desc (default) | id_asc | fecha_desc | fecha_asc
+    - id_lote, desde, hasta (YYYY-MM-DD), ubicacion_origen,
+      min_animales, max_animales, con_produccion (true/false)
+    - incluir_total: recalcular X-Total-Count en páginas con cursor
+
+    Headers de respuesta:
+    - X-Next-Cursor: presente si hay más resultados
+    - X-Total-Count: total de lotes que cumplen los filtros (solo en la
+      primera página, salvo incluir_total=true)
+    """
+    if query.desde and query.hasta and query.desde > query.hasta:
+        return jsonify(error="El rango de fechas es inválido (desde > hasta)"), 400
+    try:
+        cursor = _decodificar_cursor(query.cursor, query.orden) if query.cursor else None
+    except ValueError:
+        return jsonify(error="cursor_invalido"), 400
+
+    where = _filtros_lotes(query)
+    where_pagina = {"AND": [where, _filtro_cursor(cursor, query.orden)]} if cursor else where
+    calcular_total = cursor is None or query.incluir_total
+
     async def _get_lotes():
         try:
             await connect_db()
             
-            # Obtener parámetros de paginación (opcional)
-            limit = request.args.get("limit", type=int)
-            skip = request.args.get("skip", type=int)
-            
-            # Construir query base - Optimizado para evitar timeouts
-            # Limitar por defecto a 50 lotes para evitar problemas de rendimiento con muchos datos
-            query_limit = limit if limit else 50
-            query_skip = skip if skip else 0
+            # Se pide un lote de más para saber si existe una página siguiente
+            pagina = db.lote.find_many(
+                where=where_pagina,
+                order=ORDENES_LOTES[query.orden],
+                take=query.limit + 1,
+                select={
+                    "id_lote": True,
+                    "fecha_adquisicion": True,
+                    "cantidad_animales": True,
+                    "peso_promedio_entrada": True,
+                    "duracion_estadia_dias": True,
+                    "precio_compra_kg": True,
+                    "ubicacion_origen": True,
+                    "id_usuario_creador": True,
+                }
+            )
+            # El conteo solo se paga en la primera página y corre en paralelo
+            if calcular_total:
+                lotes, total = await asyncio.gather(pagina, db.lote.count(where=where))
+            else:
+                lotes, total = await pagina, None
             
-            # Usar select explícito para solo obtener campos necesarios
-            # Esto reduce significativamente el payload y evita timeouts
-            try:
-                lotes = await db.lote.find_many(
-                    order={"id_lote": "desc"},
-                    take=query_limit,
-                    skip=query_skip,
-                    select={
-                        "id_lote": True,
-                        "fecha_adquisicion": True,
-                        "cantidad_animales": True,
-                        "peso_promedio_entrada": True,
-                        "duracion_estadia_dias": True,
-                        "precio_compra_kg": True,
-                        "id_usuario_creador": True,
-                    }
-                )
-            except Exception as db_error:
-                # Si falla con select, intentar sin select pero con límite más pequeño
-                print(f"Warning: Error con select, usando método alternativo: {db_error}")
-                lotes = await db.lote.find_many(
-                    order={"id_lote": "desc"},
-                    take=min(query_limit, 50),  # Máximo 50 si falla select
-                    skip=query_skip
-                )
+            siguiente = None
+            if len(lotes) > query.limit:
+                lotes = lotes[:query.limit]
+                siguiente = _codificar_cursor(lotes[-1], query.orden)
             
-            # Convertir a dict manualmente (ya viene optimizado del select)
-            lotes_data = []
-            for lote in lotes:
-                lote_dict = {
+            lotes_data = [
+                {
                     "id_lote": lote.id_lote,
                     "fecha_adquisicion": lote.fecha_adquisicion.isoformat() if lote.fecha_adquisicion else None,
                     "cantidad_animales": lote.cantidad_animales,
                     "peso_promedio_entrada": lote.peso_promedio_entrada,
                     "duracion_estadia_dias": lote.duracion_estadia_dias,
                     "precio_compra_kg": lote.precio_compra_kg,
+                    "ubicacion_origen": lote.ubicacion_origen,
                     "id_usuario_creador": lote.id_usuario_creador,
                 }
-                lotes_data.append(lote_dict)
-            
-            return lotes_data
+                for lote in lotes
+            ]
+            return lotes_data, siguiente, total
         except Exception as e:
             print(f"Error en _get_lotes: {e}")
             raise
@@ -134,12 +422,18 @@ def get_lotes():
                 pass
     
     try:
-        lotes = asyncio.run(_get_lotes())
-        return jsonify(lotes), 200
+        lotes, siguiente, total = asyncio.run(_get_lotes())
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify(error=f"Error al obtener lotes: {str(e)}"), 500
+
+    headers = {}
+    if siguiente:
+        headers["X-Next-Cursor"] = siguiente
+    if total is not None:
+        headers["X-Total-Count"] = str(total)
+    return jsonify(lotes), 200, headers
     
 class LoteUpdate(BaseModel):
     # Campos que se pueden actualizar en un lote
@@ -162,23 +456,11 @@ def update_lote(id_lote: int, body: LoteUpdate):
             fecha_str = body.fecha_adquisicion
             print(f"🧭 Actualizando fecha_adquisicion: {fecha_str}")
             
-            # Intentar parsear fecha en distintos formatos
-            fecha = None
             try:
-                # ISO completo con Z o sin Z
-                clean_str = re.sub(r"Z$", "", fecha_str.strip())
-                fecha = datetime.fromisoformat(clean_str)
-                # Asegurar que la hora sea 00:00:00 (solo fecha)
-                fecha = fecha.replace(hour=0, minute=0, second=0, microsecond=0)
-            except Exception:
-                try:
-                    # Formato solo fecha (YYYY-MM-DD)
-                    fecha = datetime.strptime(fecha_str.strip(), "%Y-%m-%d")
-                    # Asegurar que la hora sea 00:00:00 (solo fecha)
-                    fecha = fecha.replace(hour=0, minute=0, second=0, microsecond=0)
-                except Exception as e:
-                    print(f"⚠️ Error al convertir fecha: {e}")
-                    return None, "invalid_fecha_adquisicion_format"
+                fecha = parse_fecha_lote(fecha_str)
+            except ValueError as e:
+                print(f"⚠️ Error al convertir fecha: {e}")
+                return None, "invalid_fecha_adquisicion_format"
             
             update_data["fecha_adquisicion"] = fecha
         
@@ -200,7 +482,16 @@ def update_lote(id_lote: int, body: LoteUpdate):
         
         await connect_db()
         try:
+            # Fecha o animales cambian la ocupacion: hace falta el valor anterior
+            anterior = None
+            if "fecha_adquisicion" in update_data or "cantidad_animales" in update_data:
+                anterior = await db.lote.find_unique(where={"id_lote": id_lote})
             lote = await db.lote.update(where={"id_lote": id_lote}, data=update_data)
+            if anterior is not None and lote is not None:
+                ocupacion_service.registrar_cambios([
+                    (anterior.fecha_adquisicion, -anterior.cantidad_animales, -1),
+                    (lote.fecha_adquisicion, lote.cantidad_animales, 1),
+                ])
             return lote.dict(), None
         finally:
             await disconnect_db()
@@ -222,7 +513,9 @@ def delete_lote(id_lote: int):
     async def _delete_lote():
         await connect_db()
         try:
-            await db.lote.delete(where={"id_lote": id_lote})
+            lote = await db.lote.delete(where={"id_lote": id_lote})
+            if lote is not None:
+                ocupacion_service.registrar_cambios([(lote.fecha_adquisicion, -lote.cantidad_animales, -1)])
             return {"message": f"Lote {id_lote} eliminado"}
         finally:
             await disconnect_db()
@@ -1,12 +1,15 @@
 from flask import Blueprint, jsonify, request
 from flask_pydantic import validate
 from pydantic import BaseModel, Field
+from datetime import date
 from utils.auth_guard import require_jwt
+from utils.http_cache import condicional
 from services.features_service import build_features_24_xgboost
+from services import deriva_service, modelo_service, precision_service
 from db import db
 from config import settings
-import asyncio, os, pickle
-import pandas as pd
+from utils import metrics
+import asyncio
 
 bp = Blueprint("prediccion_v1", __name__)
 
@@ -14,37 +17,6 @@ class PredictBody(BaseModel):
     id_lote: int = Field(gt=0)
     margen_rate: float | None = Field(default=None, ge=0.0, le=1.0, description="Margen de ganancia (0.0-1.0). Si no se especifica, usa el margen por defecto.")
 
-def load_xgboost_model():
-    """
-    Carga el modelo XGBoost con 24 features.
-    Retorna: (modelo, metricas_cv, metricas_full, metadata)
-    """
-    path = settings.MODEL_PATH
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"Modelo no encontrado en: {path}")
-    
-    try:
-        with open(path, 'rb') as f:
-            model_data = pickle.load(f)
-    except Exception as e:
-        raise ValueError(f"Error al cargar el modelo: {str(e)}")
-    
-    # El modelo XGBoost se guarda como diccionario
-    if isinstance(model_data, dict):
-        return (
-            model_data['modelo'],
-            model_data.get('metricas_cv', {}),
-            model_data.get('metricas_full', {}),
-            {
-                'version': model_data.get('version', '1.0'),
-                'fecha_entrenamiento': model_data.get('fecha_entrenamiento'),
-                'n_features': model_data.get('n_features', 24)
-            }
-        )
-    else:
-        # Fallback para modelos legacy
-        return model_data, {}, {}, {'version': 'legacy', 'n_features': 10}
-
 @bp.post("/lotes/predict")
 @require_jwt
 @validate()
@@ -58,53 +30,17 @@ def predict_lote(body: PredictBody):
         extras = bundle["extras"]
         detalle = bundle.get("detalle", {})
 
-        # Construir vector de features en el orden correcto (24 features)
-        X_dict = {
-            # Grupo 1: Adquisicion
-            "cantidad_animales": features_dict["cantidad_animales"],
-            "peso_promedio_entrada": features_dict["peso_promedio_entrada"],
-            "precio_compra_kg": features_dict["precio_compra_kg"],
-            "costo_adquisicion_total": features_dict["costo_adquisicion_total"],
-            
-            # Grupo 2: Logistica
-            "costo_combustible_viaje": features_dict["costo_combustible_viaje"],
-            "costo_peajes_lavado": features_dict["costo_peajes_lavado"],
-            "costo_flete_estimado": features_dict["costo_flete_estimado"],
-            "mantenimiento_camion_prorrateado": features_dict["mantenimiento_camion_prorrateado"],
-            
-            # Grupo 3: Costos Fijos Dinamicos
-            "costo_fijo_diario_lote": features_dict["costo_fijo_diario_lote"],
-            "factor_ocupacion_granja": features_dict["factor_ocupacion_granja"],
-            "tasa_consumo_energia_agua": features_dict["tasa_consumo_energia_agua"],
-            "costo_mano_obra_asignada": features_dict["costo_mano_obra_asignada"],
-            
-            # Grupo 4: Estadia
-            "duracion_estadia_dias": features_dict["duracion_estadia_dias"],
-            "costo_alimentacion_total": features_dict["costo_alimentacion_total"],
-            "costo_sanitario_total": features_dict["costo_sanitario_total"],
-            "merma_peso_transporte": features_dict["merma_peso_transporte"],
-            "peso_salida_esperado": features_dict["peso_salida_esperado"],
-            
-            # Grupo 5: Temporales
-            "mes_adquisicion": features_dict["mes_adquisicion"],
-            "dia_semana_llegada": features_dict["dia_semana_llegada"],
-            "es_feriado_proximo": features_dict["es_feriado_proximo"],
-            "dias_para_festividad": features_dict["dias_para_festividad"],
-            
-            # Grupo 6: Compuestas
-            "costo_operativo_por_cabeza": features_dict["costo_operativo_por_cabeza"],
-            "ratio_alimento_precio_compra": features_dict["ratio_alimento_precio_compra"],
-            "indicador_eficiencia_estadia": features_dict["indicador_eficiencia_estadia"],
-        }
-        
-        # Convertir a DataFrame (XGBoost espera DataFrame)
-        X = pd.DataFrame([X_dict])
+        # Vector de features en el orden del entrenamiento
+        X = modelo_service.matriz_features([features_dict])
 
         # CARGAR Y USAR EL MODELO XGBOOST
-        modelo, metricas_cv, metricas_full, metadata = load_xgboost_model()
+        modelo, metricas_cv, metricas_full, metadata = modelo_service.obtener_modelo()
         
         # Prediccion con XGBoost
-        precio_ml_predicho = float(modelo.predict(X)[0])
+        with metrics.medir(metrics.INFERENCIA_MODELO, f"XGBoost v{metadata['version']}"):
+            precio_ml_predicho = float(modelo.predict(X)[0])
+        # Distribucion servida vs entrenamiento (GET /modelo/deriva)
+        deriva_service.registrar(features_dict, precio_ml_predicho, metadata)
         
         # Aplicar margen adicional si el usuario lo especifica
         margen_rate = float(body.margen_rate) if body.margen_rate is not None else float(settings.DEFAULT_MARGIN_RATE)
@@ -134,8 +70,12 @@ def predict_lote(body: PredictBody):
                 "ganancia_neta_estimada": ganancia_neta_estimada,
                 "id_usuario_realiza": id_usuario if id_usuario else None,
                 "mae_error": mae_modelo,  # NUEVO: Guardar MAE del modelo
+                "precio_ml_kg": precio_ml_predicho,
+                "kilos_estimados": kilos_salida,
             }
         )
+        # Si el lote ya cerro, el error contra su Produccion queda calculado
+        await precision_service.actualizar_errores(db, body.id_lote, id_prediccion=pred.id_prediccion)
 
         await db.disconnect()
         
@@ -203,3 +143,104 @@ def predict_lote(body: PredictBody):
         return jsonify(error=str(e)), 500
     except Exception as e:
         return jsonify(error=str(e)), 500
+
+class PrecisionQuery(BaseModel):
+    meses_ventana: int = Field(default=3, ge=1, le=24, description="Meses del MAE movil")
+    modelo: str | None = Field(default=None, description="modelo_usado, ej. 'XGBoost v2.0'")
+    desde: date | None = Field(default=None, description="fecha_prediccion >= desde")
+    hasta: date | None = Field(default=None, description="fecha_prediccion <= hasta")
+
+# ---------------------------------------------------
+# 🔹 GET /predicciones/precision
+# ---------------------------------------------------
+@bp.get("/predicciones/precision")
+@require_jwt
+@condicional("predicciones", "produccion")
+@validate()
+def precision_predicciones(query: PrecisionQuery):
+    """
+    Error de las predicciones contra lo realizado (Produccion), por mes de
+    prediccion y version de modelo: MAE y sesgo de precio/kg y de kilos, MAE
+    movil de los ultimos `meses_ventana` meses y el MAE de validacion cruzada
+    que tenia el modelo (mae_cv). Solo cuentan los lotes con Produccion.
+    """
+    if query.desde and query.hasta and query.desde > query.hasta:
+        return jsonify(error="rango_fechas_invalido"), 400
+
+    async def _run():
+        await db.connect()
+        try:
+            return await precision_service.precision_por_mes(
+                db, query.meses_ventana, query.modelo, query.desde, query.hasta,
+            )
+        finally:
+            await db.disconnect()
+
+    try:
+        return jsonify(asyncio.run(_run())), 200
+    except Exception as e:
+        return jsonify(error=str(e)), 500
+
+# ---------------------------------------------------
+# 🔹 GET /lotes/<id_lote>/predicciones
+# ---------------------------------------------------
+@bp.get("/lotes/<int:id_lote>/predicciones")
+@require_jwt
+@condicional("predicciones", "produccion")
+def historial_predicciones(id_lote: int):
+    """
+    Predicciones de un lote (mas recientes primero) con lo realizado y el error.
+
+    Query params:
+    - limit: cantidad maxima (default 50, maximo 500)
+    """
+    limit = min(request.args.get("limit", default=50, type=int) or 50, 500)
+
+    async def _run():
+        await db.connect()
+        try:
+            if await db.lote.find_unique(where={"id_lote": id_lote}) is None:
+                return None
+            return await precision_service.historial_lote(db, id_lote, limit)
+        finally:
+            await db.disconnect()
+
+    try:
+        historial = asyncio.run(_run())
+    except Exception as e:
+        return jsonify(error=str(e)), 500
+    if historial is None:
+        return jsonify(error="Lote no encontrado"), 404
+    return jsonify(historial), 200
+
+# ---------------------------------------------------
+# 🔹 GET /modelo/deriva
+# ---------------------------------------------------
+@bp.get("/modelo/deriva")
+@require_jwt
+def deriva_modelo():
+    """
+    Deriva de las 24 features y del precio predicho servidos por la API
+    respecto de la distribucion de entrenamiento del modelo actual: PSI, KS
+    (por bins), medias y desvios, ordenado por PSI. `alertas` lista las
+    features con deriva moderada (PSI >= 0.1) o significativa (>= 0.25).
+
+    Query params:
+    - dias: ventana en dias, incluido hoy (default 7, maximo DERIVA_RETENCION_DIAS)
+    """
+    dias = request.args.get("dias", default=7, type=int) or 7
+    if not 1 <= dias <= settings.DERIVA_RETENCION_DIAS:
+        return jsonify(error="dias_invalido"), 400
+
+    try:
+        _, _, _, metadata = modelo_service.obtener_modelo()
+    except (FileNotFoundError, ValueError) as e:
+        return jsonify(error=str(e)), 500
+
+    resultado = deriva_service.reporte(metadata, dias)
+    if resultado is None:
+        return jsonify(
+            error="sin_referencia",
+            detail="El modelo no tiene distribuciones de entrenamiento; reentrenar con ml/train_xgboost.py",
+        ), 409
+    return jsonify(resultado), 200
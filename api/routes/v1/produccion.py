@@ -1,8 +1,9 @@
 from flask import Blueprint, jsonify
 from flask_pydantic import validate
 from pydantic import BaseModel, Field
-from datetime import datetime
+from datetime import datetime, timezone
 from utils.auth_guard import require_jwt
+from services import precision_service
 from db import db
 import asyncio
 
@@ -14,10 +15,12 @@ bp = Blueprint("produccion_v1", __name__)
 class ProduccionCreate(BaseModel):
     peso_salida_total: float = Field(gt=0, description="Cantidad total de kilos vendidos")
     mortalidad_unidades: int | None = Field(default=None, ge=0, description="Unidades de cerdos muertos")
+    precio_venta_kg: float | None = Field(default=None, gt=0, description="Precio de venta realizado por kg")
 
 class ProduccionUpdate(BaseModel):
     peso_salida_total: float | None = Field(default=None, gt=0)
     mortalidad_unidades: int | None = Field(default=None, ge=0)
+    precio_venta_kg: float | None = Field(default=None, gt=0)
 
 # ---------------------------------------------------
 # 🔹 Helper para parsear fechas ISO
@@ -43,6 +46,7 @@ def crear_produccion(id_lote: int, body: ProduccionCreate):
     Body:
     - peso_salida_total: Cantidad total de kilos vendidos
     - mortalidad_unidades: Número de cerdos muertos (opcional)
+    - precio_venta_kg: Precio de venta por kg (opcional; habilita el error de precio)
     """
     async def _crear():
         await db.connect()
@@ -61,8 +65,13 @@ def crear_produccion(id_lote: int, body: ProduccionCreate):
                 "id_lote": id_lote,
                 "peso_salida_total": body.peso_salida_total,
                 "mortalidad_unidades": body.mortalidad_unidades,
+                "precio_venta_kg": body.precio_venta_kg,
+                # Con precio de venta el lote queda cerrado (dato de entrenamiento)
+                "fecha_cierre": datetime.now(timezone.utc) if body.precio_venta_kg is not None else None,
             }
         )
+        # Error de las predicciones previas del lote contra lo realizado
+        await precision_service.actualizar_errores(db, id_lote)
         await db.disconnect()
         return prod.dict(), None
 
@@ -108,6 +117,7 @@ def update_produccion(id_lote: int, body: ProduccionUpdate):
     Body (opcional):
     - peso_salida_total: Cantidad total de kilos vendidos
     - mortalidad_unidades: Número de cerdos muertos
+    - precio_venta_kg: Precio de venta por kg
     """
     async def _update():
         await db.connect()
@@ -121,12 +131,19 @@ def update_produccion(id_lote: int, body: ProduccionUpdate):
             data["peso_salida_total"] = body.peso_salida_total
         if body.mortalidad_unidades is not None:
             data["mortalidad_unidades"] = body.mortalidad_unidades
+        if body.precio_venta_kg is not None:
+            data["precio_venta_kg"] = body.precio_venta_kg
+            if prod.precio_venta_kg is None:
+                # Primer precio: el lote cierra ahora (una correccion posterior no lo reabre)
+                data["fecha_cierre"] = datetime.now(timezone.utc)
 
         if not data:
             await db.disconnect()
             return None, "no_fields"
 
         updated = await db.produccion.update(where={"id_lote": id_lote}, data=data)
+        if "peso_salida_total" in data or "precio_venta_kg" in data:
+            await precision_service.actualizar_errores(db, id_lote)
         await db.disconnect()
         return updated.dict(), None
 
@@ -2,6 +2,7 @@ from flask import Blueprint, jsonify
 from flask_pydantic import validate
 from pydantic import BaseModel, Field
 from utils.auth_guard import require_jwt
+from utils.http_cache import condicional
 from db import db
 import asyncio
 
@@ -21,6 +22,7 @@ class TipoCostoUpdateCategoria(BaseModel):
 
 @bp.get("/tipos-costo")
 @require_jwt
+@condicional("tipos_costo")
 def listar_tipos_costo():
     async def _listar_tipos():
         await db.connect()
@@ -1,6 +1,59 @@
-from db import db
+# api/services/auth_service.py
+"""
+Usuarios y contraseñas para el login.
+
+El login es caro por dos motivos: buscar el usuario abre una conexion
+Prisma (con su motor de consultas) y bcrypt tarda ~100 ms a proposito.
+
+- Los datos que usa el login (id, email, nombre, rol, hash) se cachean por
+  email durante AUTH_USER_CACHE_TTL_SECONDS: un usuario que vuelve a entrar
+  (o una rafaga de logins al cambio de turno) no toca la BD.
+- bcrypt corre en un pool de hilos (AUTH_BCRYPT_WORKERS), fuera del event
+  loop del request. Con los workers sync de gunicorn el worker igual espera
+  a bcrypt: cada login ocupa un worker ~100 ms.
+- Por eso los logins simultaneos tienen un tope GLOBAL: cupos en memoria
+  compartida que gunicorn.conf.py crea en el master antes del fork
+  (`crear_cupos_login`), comunes a todos los workers. El tope
+  (AUTH_LOGIN_MAX_CONCURRENTES, por defecto workers - 1) queda por debajo
+  de la cantidad de workers, asi una rafaga de logins nunca los toma a
+  todos. El login que no consigue cupo espera hasta
+  AUTH_LOGIN_ESPERA_SECONDS (un cupo se libera cada ~100 ms) y recien
+  entonces responde 503 (`LoginSaturado`, con Retry-After; la UI
+  reintenta). Sin gunicorn (servidor de desarrollo) no hay tope.
+- Cada cupo guarda el pid del worker que lo tiene: si gunicorn mata un
+  worker a mitad de un login (timeout), el master libera sus cupos en
+  child_exit (`liberar_cupos_de`) en vez de perderlos para siempre.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
 from passlib.hash import bcrypt
 
+from config import settings
+from db import db
+from utils.metrics import registrar_cache
+
+
+@dataclass(frozen=True)
+class UsuarioAuth:
+    id_usuario: int
+    email: str
+    nombre_completo: Optional[str]
+    id_rol: Optional[int]
+    password_hash: str
+
+
+class LoginSaturado(Exception):
+    """Todos los cupos de login (entre todos los workers) estan ocupados."""
+
+
 # Buscar usuario por email en la tabla 'usuario'
 async def get_user_by_email(email: str):
     await db.connect()
@@ -8,6 +61,55 @@ async def get_user_by_email(email: str):
     await db.disconnect()
     return user
 
+
+# ---------------------------------------------------
+# Cache de usuarios (por worker)
+# ---------------------------------------------------
+_usuarios: "OrderedDict[str, tuple]" = OrderedDict()  # email -> (UsuarioAuth, vence_en)
+_usuarios_lock = threading.Lock()
+
+
+async def obtener_usuario(email: str) -> Optional[UsuarioAuth]:
+    """Usuario para el login, desde la cache si se leyo hace menos de AUTH_USER_CACHE_TTL_SECONDS."""
+    ahora = time.monotonic()
+    with _usuarios_lock:
+        cacheado = _usuarios.get(email)
+        if cacheado is not None and cacheado[1] > ahora:
+            _usuarios.move_to_end(email)
+            registrar_cache("usuario", True)
+            return cacheado[0]
+    registrar_cache("usuario", False)
+
+    user = await get_user_by_email(email)
+    if user is None:
+        return None  # No se cachea: un usuario recien creado debe poder entrar
+    usuario = UsuarioAuth(
+        id_usuario=user.id_usuario,
+        email=user.email,
+        nombre_completo=user.nombre_completo,
+        id_rol=user.id_rol,
+        password_hash=user.password_hash,
+    )
+    with _usuarios_lock:
+        _usuarios[email] = (usuario, ahora + settings.AUTH_USER_CACHE_TTL_SECONDS)
+        _usuarios.move_to_end(email)
+        while len(_usuarios) > settings.AUTH_USER_CACHE_MAX:
+            _usuarios.popitem(last=False)
+    return usuario
+
+
+def invalidar_usuario(email: Optional[str] = None) -> None:
+    """Olvida un usuario cacheado (o todos), p. ej. tras cambiar su contraseña o rol."""
+    with _usuarios_lock:
+        if email is None:
+            _usuarios.clear()
+        else:
+            _usuarios.pop(email, None)
+
+
+# ---------------------------------------------------
+# bcrypt
+# ---------------------------------------------------
 # Verificar password hash bcrypt
 def verify_password(plain: str, hashed: str) -> bool:
     try:
@@ -15,6 +117,105 @@ def verify_password(plain: str, hashed: str) -> bool:
     except Exception:
         return False
 
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+# Cupos compartidos por los workers: pid del worker que lo ocupa, 0 = libre.
+# None fuera de gunicorn
+_cupos_login = None
+_INTERVALO_ESPERA = 0.02  # Segundos entre intentos mientras se espera un cupo
+
+
+def crear_cupos_login(workers: int) -> int:
+    """
+    Crea los cupos globales de login. Se llama en el master de gunicorn
+    antes del fork para que todos los workers hereden los mismos. Devuelve el tope.
+    """
+    global _cupos_login
+    cupos = settings.AUTH_LOGIN_MAX_CONCURRENTES or max(1, workers - 1)
+    _cupos_login = multiprocessing.Array("i", cupos)
+    return cupos
+
+
+def _tomar_cupo(cupos) -> Optional[int]:
+    """Indice del cupo tomado por este proceso, o None si estan todos ocupados."""
+    pid = os.getpid()
+    with cupos.get_lock():
+        for i, ocupante in enumerate(cupos):
+            if ocupante == 0:
+                cupos[i] = pid
+                return i
+    return None
+
+
+def _esperar_cupo(cupos) -> int:
+    """Toma un cupo esperando hasta AUTH_LOGIN_ESPERA_SECONDS; si no hay, `LoginSaturado`."""
+    limite = time.monotonic() + settings.AUTH_LOGIN_ESPERA_SECONDS
+    while True:
+        cupo = _tomar_cupo(cupos)
+        if cupo is not None:
+            return cupo
+        if time.monotonic() >= limite:
+            raise LoginSaturado()
+        time.sleep(_INTERVALO_ESPERA)
+
+
+def _soltar_cupo(cupos, cupo: int) -> None:
+    with cupos.get_lock():
+        if cupos[cupo] == os.getpid():
+            cupos[cupo] = 0
+
+
+def liberar_cupos_de(pid: int) -> int:
+    """
+    Libera los cupos que tenia un worker que murio (lo llama el master en
+    child_exit). Devuelve la cantidad liberada.
+    """
+    cupos = _cupos_login
+    if cupos is None:
+        return 0
+    # Con timeout: si el worker murio justo dentro de la seccion critica, el
+    # master no se queda colgado (el cupo se pierde, como antes)
+    if not cupos.get_lock().acquire(timeout=1):
+        return 0
+    try:
+        liberados = 0
+        for i, ocupante in enumerate(cupos):
+            if ocupante == pid:
+                cupos[i] = 0
+                liberados += 1
+        return liberados
+    finally:
+        cupos.get_lock().release()
+
+
+def _obtener_pool() -> ThreadPoolExecutor:
+    """Pool del proceso; se vuelve a crear tras un fork (los hilos no sobreviven al fork de gunicorn)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(max_workers=settings.AUTH_BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+            _pool_pid = os.getpid()
+        return _pool
+
+
+async def verificar_password(plain: str, hashed: str) -> bool:
+    """
+    `verify_password` en el pool de bcrypt, con uno de los cupos globales de
+    login. Si no se libera ningun cupo en AUTH_LOGIN_ESPERA_SECONDS lanza
+    `LoginSaturado`.
+    """
+    cupos = _cupos_login
+    cupo = _esperar_cupo(cupos) if cupos is not None else None
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_obtener_pool(), verify_password, plain, hashed)
+    finally:
+        if cupo is not None:
+            _soltar_cupo(cupos, cupo)
+
+
 # Crear hash (por si luego hacemos registro)
 def hash_password(plain: str) -> str:
     return bcrypt.hash(plain)
@@ -0,0 +1,137 @@
+# api/services/bulk_service.py
+"""
+Utilidades para escrituras masivas con Prisma.
+
+En lugar de un `create` por fila (un viaje de ida y vuelta a Postgres por
+fila), las filas se construyen en memoria y se escriben con `create_many` en
+bloques de tamano configurable, cada bloque dentro de una transaccion.
+
+Como `create_many` no devuelve los registros creados, los IDs se reservan
+de antemano desde la secuencia de la tabla (`reservar_ids`). Asi las filas
+hijas (costos, produccion) pueden referenciar a sus lotes en el mismo bloque.
+"""
+from __future__ import annotations
+
+import time
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+from config import settings
+
+TIMEOUT_TRANSACCION = timedelta(seconds=60)
+
+
+def en_bloques(filas: Sequence[Any], chunk_size: int | None = None) -> Iterator[Sequence[Any]]:
+    """Divide una secuencia en bloques de `chunk_size` elementos."""
+    size = chunk_size or settings.BULK_CHUNK_SIZE
+    for i in range(0, len(filas), size):
+        yield filas[i:i + size]
+
+
+async def reservar_ids(cliente, tabla: str, columna: str, n: int) -> List[int]:
+    """
+    Reserva `n` IDs consecutivos de la secuencia autoincremental de una tabla.
+    Una sola consulta, sin importar `n`.
+    """
+    if n <= 0:
+        return []
+    rows = await cliente.query_raw(
+        f"SELECT nextval(pg_get_serial_sequence('\"{tabla}\"', '{columna}')) AS id "
+        "FROM generate_series(1, $1)",
+        n,
+    )
+    return [int(r["id"]) for r in rows]
+
+
+class ReporteThroughput:
+    """Acumula filas escritas por tabla y reporta filas/segundo."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.filas: Dict[str, int] = {}
+
+    def agregar(self, tabla: str, n: int) -> None:
+        self.filas[tabla] = self.filas.get(tabla, 0) + n
+
+    @property
+    def total(self) -> int:
+        return sum(self.filas.values())
+
+    @property
+    def segundos(self) -> float:
+        return time.perf_counter() - self.inicio
+
+    def resumen(self) -> Dict[str, Any]:
+        segundos = self.segundos
+        return {
+            "filas": dict(self.filas),
+            "total_filas": self.total,
+            "segundos": round(segundos, 3),
+            "filas_por_segundo": round(self.total / segundos, 1) if segundos > 0 else None,
+        }
+
+    def imprimir(self, titulo: str = "Escritura masiva") -> None:
+        r = self.resumen()
+        print(f"   ⏱️ {titulo}: {r['total_filas']} filas en {r['segundos']:.2f}s "
+              f"({r['filas_por_segundo'] or 0:.1f} filas/s)")
+        for tabla, n in r["filas"].items():
+            print(f"      - {tabla}: {n}")
+
+
+async def create_many_en_bloques(
+    cliente,
+    modelo: str,
+    filas: Sequence[Dict[str, Any]],
+    chunk_size: int | None = None,
+    skip_duplicates: bool = False,
+    reporte: ReporteThroughput | None = None,
+) -> int:
+    """
+    Inserta `filas` en el modelo Prisma indicado (ej: "lote", "costo") con
+    `create_many`, un bloque por transaccion. Devuelve las filas insertadas.
+    """
+    total = 0
+    for bloque in en_bloques(filas, chunk_size):
+        async with cliente.tx(timeout=TIMEOUT_TRANSACCION) as tx:
+            total += await getattr(tx, modelo).create_many(
+                data=list(bloque), skip_duplicates=skip_duplicates
+            )
+    if reporte is not None:
+        reporte.agregar(modelo, total)
+    return total
+
+
+async def _escribir_grupo(cliente, grupo: Dict[str, List[Dict[str, Any]]]) -> Dict[str, int]:
+    escritas = {}
+    for modelo, filas in grupo.items():
+        if filas:
+            escritas[modelo] = await getattr(cliente, modelo).create_many(data=filas)
+    return escritas
+
+
+async def insertar_grupos(
+    cliente,
+    grupos: Iterable[Dict[str, List[Dict[str, Any]]]],
+    reporte: ReporteThroughput | None = None,
+    transaccion: bool = True,
+) -> None:
+    """
+    Inserta grupos de filas relacionadas, un grupo por transaccion.
+
+    Cada grupo es un dict modelo -> filas, en orden de dependencia, p. ej.
+    {"lote": [...], "costo": [...], "produccion": [...]}. Si una insercion
+    del grupo falla, se revierte el grupo completo.
+
+    Con `transaccion=False` se escribe directamente sobre `cliente`, util
+    cuando `cliente` ya es una transaccion abierta por el llamador.
+    """
+    for grupo in grupos:
+        if transaccion:
+            async with cliente.tx(timeout=TIMEOUT_TRANSACCION) as tx:
+                escritas = await _escribir_grupo(tx, grupo)
+        else:
+            escritas = await _escribir_grupo(cliente, grupo)
+        # Solo se contabiliza lo que efectivamente se confirmo
+        if reporte is not None:
+            for modelo, n in escritas.items():
+                reporte.agregar(modelo, n)
@@ -0,0 +1,99 @@
+# api/services/dataset_service.py
+"""
+Datos de entrenamiento a partir de los lotes reales de la BD.
+
+Un lote "cerrado" tiene Produccion con precio de venta registrado: sus 24
+features (las mismas formulas que la API usa al predecir) mas el precio de
+venta realizado (`precio_venta_kg`, el target) forman una fila de
+entrenamiento. Se agregan los kilos realizados (`peso_salida_total`) y la
+mortalidad, que no entran al modelo.
+
+Los lotes se recorren en orden de cierre (`Produccion.fecha_cierre`, que se
+fija al registrar el precio de venta), con paginacion keyset por
+(fecha_cierre, id_produccion). El cursor de la ultima fila leida marca
+hasta donde se llego: un lote viejo que cierra tarde queda despues del
+cursor y se toma en la corrida siguiente. Las features de cada pagina se
+calculan de una vez (kernel vectorizado, un numero fijo de consultas de
+contexto por pagina). Lo usan ml/reentrenar_incremental.py y
+ml/extraer_dataset.py.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from ml.core.features_kernel import FEATURES_24
+from services.features_service import build_features_lotes
+
+TARGET = "precio_venta_kg"
+
+# Con precio de venta (el target existe) y fecha de cierre
+FILTRO_CERRADOS = {"precio_venta_kg": {"not": None}, "fecha_cierre": {"not": None}}
+ORDEN_CIERRE = [{"fecha_cierre": "asc"}, {"id_produccion": "asc"}]
+
+
+def cursor_de(produccion: Any) -> Dict[str, Any]:
+    """Posicion de una Produccion en el orden de cierre (serializable: pickle o JSON)."""
+    return {"fecha_cierre": produccion.fecha_cierre.isoformat(), "id_produccion": produccion.id_produccion}
+
+
+def _filtro(cursor: Optional[Dict[str, Any]], desde_fecha: Optional[datetime]) -> Dict[str, Any]:
+    where: Dict[str, Any] = {**FILTRO_CERRADOS}
+    if desde_fecha is not None:
+        where["fecha_cierre"] = {"gte": desde_fecha}
+    if cursor:
+        fecha = datetime.fromisoformat(cursor["fecha_cierre"])
+        where["OR"] = [
+            {"fecha_cierre": {"gt": fecha}},
+            {"fecha_cierre": fecha, "id_produccion": {"gt": cursor["id_produccion"]}},
+        ]
+    return where
+
+
+async def contar_cerrados(cliente, cursor: Optional[Dict[str, Any]] = None,
+                          desde_fecha: Optional[datetime] = None) -> int:
+    return await cliente.produccion.count(where=_filtro(cursor, desde_fecha))
+
+
+async def lotes_cerrados(cliente, cursor: Optional[Dict[str, Any]] = None,
+                         desde_fecha: Optional[datetime] = None,
+                         tamano: int = 1000) -> AsyncIterator[List[Any]]:
+    """
+    Paginas de Produccion (con su lote) cerradas despues de `cursor` (y
+    desde `desde_fecha`), en orden de cierre. `cursor_de(pagina[-1])` es el
+    cursor para seguir.
+    """
+    while True:
+        producciones = await cliente.produccion.find_many(
+            where=_filtro(cursor, desde_fecha),
+            include={"lote": True},
+            order=ORDEN_CIERRE,
+            take=tamano,
+        )
+        if not producciones:
+            return
+        yield producciones
+        if len(producciones) < tamano:
+            return
+        cursor = cursor_de(producciones[-1])
+
+
+async def filas_entrenamiento(producciones: List[Any]) -> List[Dict[str, Any]]:
+    """Una fila por lote: id_lote, fechas, las 24 features, el target y los kilos."""
+    features = await build_features_lotes([p.lote for p in producciones])
+    filas = []
+    for produccion in producciones:
+        calculado = features.get(produccion.id_lote)
+        if calculado is None:
+            continue
+        fila = {
+            "id_lote": produccion.id_lote,
+            "fecha_adquisicion": produccion.lote.fecha_adquisicion,
+            "fecha_cierre": produccion.fecha_cierre,
+        }
+        fila.update({nombre: calculado["features"][nombre] for nombre in FEATURES_24})
+        fila[TARGET] = produccion.precio_venta_kg
+        fila["peso_salida_total"] = produccion.peso_salida_total
+        fila["mortalidad_unidades"] = produccion.mortalidad_unidades
+        filas.append(fila)
+    return filas
@@ -0,0 +1,204 @@
+# api/services/deriva_service.py
+"""
+Monitor de deriva de las features servidas y de la prediccion.
+
+`registrar` corre en cada POST /lotes/predict: suma las 24 features y el
+precio predicho a resumenes en memoria del worker (ml/core/deriva.py), con
+los cortes de la distribucion de entrenamiento guardada en el modelo.
+Memoria constante y O(1) por prediccion.
+
+Cada DERIVA_FLUSH_SECONDS el worker vuelca lo acumulado a un SQLite
+compartido (un resumen por modelo, dia y feature, combinados sin perdida),
+asi el reporte ve las predicciones de todos los workers. Los dias mas
+viejos que DERIVA_RETENCION_DIAS se borran.
+
+`reporte` combina los ultimos `dias` y calcula PSI y KS por feature contra
+la referencia. Los modelos entrenados sin `distribuciones` no se siguen.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import structlog
+
+from config import settings
+from ml.core import deriva
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+log = structlog.get_logger("deriva")
+
+# Acumulado del worker desde el ultimo volcado
+_local: Dict[str, Any] = {"pid": None, "modelo": None, "dia": None, "resumenes": {}, "volcado_en": 0.0}
+_lock = threading.Lock()
+
+
+def clave_modelo(metadata: Dict[str, Any]) -> str:
+    return f"{metadata.get('version')}|{metadata.get('fecha_entrenamiento')}"
+
+
+# ---------------------------------------------------
+# Almacen compartido (SQLite)
+# ---------------------------------------------------
+def _path() -> Path:
+    path = Path(settings.DERIVA_PATH)
+    if not path.is_absolute():
+        path = API_DIR / path
+    return path
+
+
+def _conectar() -> sqlite3.Connection:
+    conn = sqlite3.connect(_path(), timeout=5.0, isolation_level=None)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS resumen ("
+        "modelo TEXT NOT NULL, dia TEXT NOT NULL, feature TEXT NOT NULL, datos TEXT NOT NULL, "
+        "PRIMARY KEY (modelo, dia, feature))"
+    )
+    return conn
+
+
+def _guardar(modelo: str, dia: str, resumenes: Dict[str, deriva.Resumen]) -> None:
+    conn = _conectar()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for feature, resumen in resumenes.items():
+            fila = conn.execute(
+                "SELECT datos FROM resumen WHERE modelo = ? AND dia = ? AND feature = ?",
+                (modelo, dia, feature),
+            ).fetchone()
+            if fila is not None:
+                anterior = deriva.Resumen.de_dict(json.loads(fila[0]))
+                anterior.combinar(resumen)
+                resumen = anterior
+            conn.execute(
+                "INSERT OR REPLACE INTO resumen (modelo, dia, feature, datos) VALUES (?, ?, ?, ?)",
+                (modelo, dia, feature, json.dumps(resumen.a_dict())),
+            )
+        limite = (date.today() - timedelta(days=settings.DERIVA_RETENCION_DIAS)).isoformat()
+        conn.execute("DELETE FROM resumen WHERE dia < ?", (limite,))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def _guardar_seguro(modelo: str, dia: str, resumenes: Dict[str, deriva.Resumen]) -> None:
+    try:
+        _guardar(modelo, dia, resumenes)
+    except sqlite3.Error as e:
+        # Se pierde este intervalo: el monitor no debe romper la prediccion
+        log.warning("deriva_volcado_error", error=str(e))
+
+
+def volcar() -> None:
+    """Escribe lo acumulado por el worker en el SQLite compartido."""
+    with _lock:
+        modelo, dia, resumenes = _local["modelo"], _local["dia"], _local["resumenes"]
+        _local["resumenes"] = {}
+        _local["volcado_en"] = time.monotonic()
+    if resumenes:
+        _guardar_seguro(modelo, dia, resumenes)
+
+
+# ---------------------------------------------------
+# Registro por prediccion
+# ---------------------------------------------------
+def registrar(features: Dict[str, Any], prediccion: float, metadata: Dict[str, Any]) -> None:
+    """Suma una prediccion servida a los resumenes del worker."""
+    referencia = metadata.get("distribuciones")
+    if not referencia:
+        return
+    modelo, dia = clave_modelo(metadata), date.today().isoformat()
+
+    anterior = None
+    with _lock:
+        if _local["pid"] != os.getpid():
+            # Tras el fork lo heredado del master no es de este worker
+            _local.update(pid=os.getpid(), modelo=modelo, dia=dia, resumenes={}, volcado_en=time.monotonic())
+        if (_local["modelo"], _local["dia"]) != (modelo, dia):
+            # Cambio de dia o de modelo: lo acumulado va a su propia fila
+            anterior = (_local["modelo"], _local["dia"], _local["resumenes"])
+            _local.update(modelo=modelo, dia=dia, resumenes={})
+
+        resumenes = _local["resumenes"]
+        for nombre, ref in referencia.items():
+            valor = prediccion if nombre == deriva.PREDICCION else features.get(nombre)
+            if valor is None:
+                continue
+            resumen = resumenes.get(nombre)
+            if resumen is None:
+                resumen = resumenes[nombre] = deriva.Resumen(len(ref["proporciones"]))
+            resumen.agregar(float(valor), ref["cortes"])
+        pendiente = time.monotonic() - _local["volcado_en"] >= settings.DERIVA_FLUSH_SECONDS
+
+    if anterior and anterior[2]:
+        _guardar_seguro(*anterior)
+    if pendiente:
+        volcar()
+
+
+# ---------------------------------------------------
+# Reporte
+# ---------------------------------------------------
+def reporte(metadata: Dict[str, Any], dias: int = 7) -> Optional[Dict[str, Any]]:
+    """PSI/KS por feature de los ultimos `dias` contra la referencia; None si el modelo no la tiene."""
+    referencia = metadata.get("distribuciones")
+    if not referencia:
+        return None
+    modelo = clave_modelo(metadata)
+    volcar()
+
+    desde = (date.today() - timedelta(days=dias - 1)).isoformat()
+    conn = _conectar()
+    try:
+        filas = conn.execute(
+            "SELECT feature, datos FROM resumen WHERE modelo = ? AND dia >= ?", (modelo, desde)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    servidos: Dict[str, deriva.Resumen] = {}
+    for feature, datos in filas:
+        resumen = deriva.Resumen.de_dict(json.loads(datos))
+        if feature in servidos:
+            servidos[feature].combinar(resumen)
+        else:
+            servidos[feature] = resumen
+
+    features = []
+    for nombre, ref in referencia.items():
+        servido = servidos.get(nombre)
+        if servido is None or servido.n == 0:
+            continue
+        valor_psi = deriva.psi(ref["proporciones"], servido.conteos)
+        features.append({
+            "feature": nombre,
+            "psi": round(valor_psi, 4),
+            "ks": round(deriva.ks(ref["proporciones"], servido.conteos), 4),
+            "deriva": deriva.clasificar(valor_psi),
+            "n": servido.n,
+            "media_entrenamiento": round(ref["media"], 4),
+            "media_servida": round(servido.media, 4),
+            "std_entrenamiento": round(ref["std"], 4),
+            "std_servida": round(servido.std, 4),
+        })
+    features.sort(key=lambda f: f["psi"], reverse=True)
+
+    prediccion = servidos.get(deriva.PREDICCION)
+    return {
+        "modelo": metadata.get("version"),
+        "fecha_entrenamiento": metadata.get("fecha_entrenamiento"),
+        "dias": dias,
+        "predicciones": prediccion.n if prediccion else 0,
+        "alertas": [f["feature"] for f in features if f["deriva"] != "estable"],
+        "features": features,
+    }
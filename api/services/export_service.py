@@ -0,0 +1,224 @@
+# api/services/export_service.py
+"""
+Exportacion columnar (Apache Arrow / Parquet) de lotes, costos y predicciones.
+
+Cada dataset se lee por bloques de EXPORT_CHUNK_ROWS filas con paginacion
+keyset sobre su id (una consulta SQL por bloque, sin instanciar modelos
+Prisma) y cada bloque se convierte en un RecordBatch que se escribe al
+cliente apenas esta listo: la memoria del worker no crece con el tamano de
+la tabla.
+
+Formatos:
+- `arrow`: IPC stream, se lee con
+  `pa.ipc.open_stream(resp.content).read_pandas()` (o por batches).
+- `parquet`: un row group por bloque, comprimido con zstd; se lee con
+  `pd.read_parquet(io.BytesIO(resp.content))`.
+
+Las fechas salen como timestamp[ms, UTC]; `nombre_tipo` y `categoria` como
+diccionarios (categoricas en pandas). pyarrow se importa al primer uso.
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from config import settings
+from db import db, connect_db, disconnect_db
+
+FORMATOS = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _ts(columna: str) -> str:
+    """DateTime de Prisma -> milisegundos desde epoch (bigint)."""
+    return f"(EXTRACT(EPOCH FROM {columna}) * 1000)::bigint"
+
+
+# Dataset -> consulta por bloque, columna de id (keyset), columna de fecha (filtros) y esquema
+DATASETS: Dict[str, Dict[str, Any]] = {
+    "lotes": {
+        "select": (
+            'SELECT l."id_lote", ' + _ts('l."fecha_adquisicion"') + ' AS "fecha_adquisicion", '
+            'l."cantidad_animales", l."peso_promedio_entrada", l."duracion_estadia_dias", '
+            'l."precio_compra_kg", l."costo_flete", l."costo_combustible", l."costo_peajes_lavado", '
+            'l."merma_peso_transporte", l."ubicacion_origen", l."id_usuario_creador", '
+            'p."peso_salida_total", p."mortalidad_unidades" '
+            'FROM "Lote" l LEFT JOIN "Produccion" p ON p."id_lote" = l."id_lote"'
+        ),
+        "id": 'l."id_lote"',
+        "fecha": 'l."fecha_adquisicion"',
+        "lote": 'l."id_lote"',
+        "columnas": [
+            ("id_lote", "int32"), ("fecha_adquisicion", "timestamp"), ("cantidad_animales", "int32"),
+            ("peso_promedio_entrada", "float64"), ("duracion_estadia_dias", "int32"),
+            ("precio_compra_kg", "float64"), ("costo_flete", "float64"), ("costo_combustible", "float64"),
+            ("costo_peajes_lavado", "float64"), ("merma_peso_transporte", "float64"),
+            ("ubicacion_origen", "categoria"), ("id_usuario_creador", "int32"),
+            ("peso_salida_total", "float64"), ("mortalidad_unidades", "int32"),
+        ],
+    },
+    "costos": {
+        "select": (
+            'SELECT c."id_costo", c."id_lote", c."id_tipo_costo", t."nombre_tipo", '
+            't."categoria"::text AS "categoria", c."monto", '
+            + _ts('c."fecha_gasto"') + ' AS "fecha_gasto", c."descripcion" '
+            'FROM "Costo" c JOIN "TipoCosto" t ON t."id_tipo_costo" = c."id_tipo_costo"'
+        ),
+        "id": 'c."id_costo"',
+        "fecha": 'c."fecha_gasto"',
+        "lote": 'c."id_lote"',
+        "columnas": [
+            ("id_costo", "int32"), ("id_lote", "int32"), ("id_tipo_costo", "int32"),
+            ("nombre_tipo", "categoria"), ("categoria", "categoria"), ("monto", "float64"),
+            ("fecha_gasto", "timestamp"), ("descripcion", "string"),
+        ],
+    },
+    "predicciones": {
+        "select": (
+            'SELECT r."id_prediccion", r."id_lote", r."precio_sugerido_kg", r."ganancia_neta_estimada", '
+            'r."modelo_usado", r."mae_error", ' + _ts('r."fecha_prediccion"') + ' AS "fecha_prediccion", '
+            'r."id_usuario_realiza" '
+            'FROM "Prediccion" r'
+        ),
+        "id": 'r."id_prediccion"',
+        "fecha": 'r."fecha_prediccion"',
+        "lote": 'r."id_lote"',
+        "columnas": [
+            ("id_prediccion", "int32"), ("id_lote", "int32"), ("precio_sugerido_kg", "float64"),
+            ("ganancia_neta_estimada", "float64"), ("modelo_usado", "categoria"), ("mae_error", "float64"),
+            ("fecha_prediccion", "timestamp"), ("id_usuario_realiza", "int32"),
+        ],
+    },
+}
+
+
+def pyarrow_disponible() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def esquema(dataset: str):
+    import pyarrow as pa
+
+    tipos = {
+        "int32": pa.int32(),
+        "float64": pa.float64(),
+        "string": pa.string(),
+        "categoria": pa.dictionary(pa.int32(), pa.string()),
+        "timestamp": pa.timestamp("ms", tz="UTC"),
+    }
+    return pa.schema([(nombre, tipos[tipo]) for nombre, tipo in DATASETS[dataset]["columnas"]])
+
+
+def _consulta(dataset: str, desde: Optional[date], hasta: Optional[date],
+              id_lote: Optional[int]) -> tuple:
+    """SQL de un bloque con sus parametros; $1 = ultimo id leido, $2 = tamano del bloque."""
+    spec = DATASETS[dataset]
+    condiciones = [f"{spec['id']} > $1"]
+    params: List[Any] = []
+    if desde:
+        params.append(datetime.combine(desde, datetime.min.time()).isoformat())
+        condiciones.append(f"{spec['fecha']} >= ${len(params) + 2}::timestamp")
+    if hasta:
+        params.append(datetime.combine(hasta + timedelta(days=1), datetime.min.time()).isoformat())
+        condiciones.append(f"{spec['fecha']} < ${len(params) + 2}::timestamp")
+    if id_lote is not None:
+        params.append(id_lote)
+        condiciones.append(f"{spec['lote']} = ${len(params) + 2}")
+    sql = f"{spec['select']} WHERE {' AND '.join(condiciones)} ORDER BY {spec['id']} LIMIT $2"
+    return sql, params
+
+
+async def bloques(dataset: str, desde: Optional[date] = None, hasta: Optional[date] = None,
+                  id_lote: Optional[int] = None, tamano: Optional[int] = None) -> AsyncIterator[List[dict]]:
+    """Filas del dataset en bloques, ordenadas por id (requiere `db` conectado)."""
+    tamano = tamano or settings.EXPORT_CHUNK_ROWS
+    sql, params = _consulta(dataset, desde, hasta, id_lote)
+    columna_id = DATASETS[dataset]["columnas"][0][0]
+    ultimo = 0
+    while True:
+        filas = await db.query_raw(sql, ultimo, tamano, *params)
+        if not filas:
+            return
+        yield filas
+        if len(filas) < tamano:
+            return
+        ultimo = filas[-1][columna_id]
+
+
+def a_record_batch(filas: List[dict], schema):
+    import pyarrow as pa
+
+    columnas = {campo.name: [f.get(campo.name) for f in filas] for campo in schema}
+    return pa.RecordBatch.from_pydict(columnas, schema=schema)
+
+
+class _Sumidero(io.RawIOBase):
+    """Destino de los writers de pyarrow que entrega lo escrito por partes."""
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+        self._posicion = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, datos) -> int:
+        datos = bytes(datos)
+        self._partes.append(datos)
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self) -> int:
+        return self._posicion
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def exportar(dataset: str, formato: str, desde: Optional[date] = None, hasta: Optional[date] = None,
+             id_lote: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Cuerpo de la respuesta: un generador sincrono (para un Response de
+    Flask) que conecta a la BD, escribe cada bloque en `formato` y lo entrega.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = esquema(dataset)
+    sumidero = _Sumidero()
+    destino = pa.PythonFile(sumidero, mode="w")
+    if formato == "parquet":
+        writer = pq.ParquetWriter(destino, schema, compression="zstd")
+        escribir = lambda lote: writer.write_batch(lote, row_group_size=lote.num_rows)  # noqa: E731
+    else:
+        writer = pa.ipc.new_stream(destino, schema)
+        escribir = writer.write_batch
+
+    # Un event loop propio: el generador se consume despues de que la vista retorno
+    loop = asyncio.new_event_loop()
+    filas = bloques(dataset, desde, hasta, id_lote)
+    try:
+        loop.run_until_complete(connect_db())
+        while True:
+            try:
+                bloque = loop.run_until_complete(filas.__anext__())
+            except StopAsyncIteration:
+                break
+            escribir(a_record_batch(bloque, schema))
+            yield sumidero.vaciar()
+        writer.close()
+        yield sumidero.vaciar()
+    finally:
+        loop.run_until_complete(filas.aclose())
+        loop.run_until_complete(disconnect_db())
+        loop.close()
@@ -4,167 +4,155 @@ Servicio de Features para Modelo XGBoost con 24 Variables.
 Este es el CEREBRO del sistema ML - calcula todas las features en tiempo real.
 """
 from __future__ import annotations
-from typing import Dict, Any, Optional
+import asyncio
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
+import numpy as np
 from db import db
+from utils.metrics import medir_paso
+from services import ocupacion_service
+from ml.core import features_kernel as kernel
+from ml.core.features_kernel import (  # noqa: F401 (constantes reexportadas)
+    CAPACIDAD_GRANJA, DISTANCIAS_KM, SUELDOS_MENSUALES, GASTOS_OPERATIVOS_MENSUALES,
+    MANTENIMIENTO_CAMION_MENSUAL, FEATURES_24,
+)
 
-# Constantes de negocio
-CAPACIDAD_GRANJA = 1000  # Capacidad maxima de animales
-DISTANCIAS_KM = {
-    "Santa Cruz": 350,
-    "Beni": 520,
-    "Pando": 680,
-    "La Paz": 400,
-    "Cochabamba": 300,
+# Desglose de /lotes/predict: grupo -> features (en el orden de FEATURES_24)
+GRUPOS_DETALLE = {
+    "grupo_1_adquisicion": FEATURES_24[0:4],
+    "grupo_2_logistica": FEATURES_24[4:8],
+    "grupo_3_costos_fijos": FEATURES_24[8:12],
+    "grupo_4_estadia": FEATURES_24[12:17],
+    "grupo_5_temporales": FEATURES_24[17:21],
+    "grupo_6_compuestas": FEATURES_24[21:24],
 }
 
-# Costos fijos mensuales (para prorrateo)
-SUELDOS_MENSUALES = 11000.0
-GASTOS_OPERATIVOS_MENSUALES = 3250.0
-MANTENIMIENTO_CAMION_MENSUAL = 3000.0
 
+def _a_datetime(dia: np.datetime64) -> datetime:
+    d = dia.astype("datetime64[D]").astype(object)
+    return datetime(d.year, d.month, d.day)
 
-async def _calcular_feriado_proximo(fecha_lote: datetime) -> tuple[bool, int]:
+
+@medir_paso("feriado_proximo")
+async def _calcular_dias_feriado(dias: np.ndarray) -> np.ndarray:
     """
-    Calcula si hay un feriado en los proximos 7 dias.
-    Returns: (es_feriado_proximo, dias_para_festividad)
+    Dias al proximo feriado (dentro de 7 dias) de cada fecha.
+    Una sola consulta para todo el rango de fechas.
     """
-    fecha_limite = fecha_lote + timedelta(days=7)
-    
-    feriados_proximos = await db.feriado.find_many(
+    feriados = await db.feriado.find_many(
         where={
             "fecha": {
-                "gte": fecha_lote,
-                "lte": fecha_limite
+                "gte": _a_datetime(dias.min()),
+                "lte": _a_datetime(dias.max()) + timedelta(days=kernel.VENTANA_FERIADO_DIAS)
             }
         },
         order={"fecha": "asc"}
     )
-    
-    if feriados_proximos:
-        feriado_cercano = feriados_proximos[0]
-        dias = (feriado_cercano.fecha - fecha_lote).days
-        return (True, dias)
-    else:
-        return (False, 999)
+    return kernel.dias_para_feriado(dias, [f.fecha for f in feriados])
 
 
-async def _calcular_prorrateo_gastos_mensuales(
-    fecha_lote: datetime,
-    cantidad_animales: int
-) -> Dict[str, float]:
+@medir_paso("prorrateo_gastos_mensuales")
+async def _calcular_gastos_mes(meses: np.ndarray) -> Dict[str, np.ndarray]:
     """
-    Calcula el prorrateo de gastos mensuales para el lote.
-    Returns: dict con costos prorrateados
+    Gastos mensuales del mes de cada lote, separados por tipo.
+    Returns: dict con arrays servicios_basicos, mano_obra y gasto_total
     """
-    mes = fecha_lote.month
-    anio = fecha_lote.year
-    
-    # Obtener gastos del mes
-    gastos_mes = await db.gastomensual.find_many(
-        where={"mes": mes, "anio": anio},
-        include={"tipo_costo": True}
-    )
-    
-    if not gastos_mes:
-        # Si no hay gastos registrados, usar valores por defecto
-        return {
-            "tasa_consumo_energia_agua": 0.0,
-            "costo_mano_obra_asignada": 0.0,
-            "gasto_total_mes": 0.0
-        }
-    
-    # Calcular total de animales vendidos en el mes
-    inicio_mes = datetime(anio, mes, 1)
-    if mes == 12:
-        fin_mes = datetime(anio + 1, 1, 1)
-    else:
-        fin_mes = datetime(anio, mes + 1, 1)
-    
-    lotes_del_mes = await db.lote.find_many(
+    claves = [(m.year, m.month) for m in meses.astype(object)]
+    unicos = sorted(set(claves))
+    gastos = await db.gastomensual.find_many(
         where={
-            "fecha_adquisicion": {
-                "gte": inicio_mes,
-                "lt": fin_mes
-            }
-        }
-    )
-    
-    total_animales_mes = sum(l.cantidad_animales for l in lotes_del_mes)
-    
-    if total_animales_mes == 0:
-        total_animales_mes = cantidad_animales  # Evitar division por cero
-    
-    # Calcular prorrateo
-    gasto_total_mes = sum(g.monto for g in gastos_mes)
-    
-    # Separar por tipo
-    servicios_basicos = sum(
-        g.monto for g in gastos_mes 
-        if "servicio" in g.tipo_costo.nombre_tipo.lower() or "energia" in g.tipo_costo.nombre_tipo.lower()
-    )
-    mano_obra = sum(
-        g.monto for g in gastos_mes 
-        if "mano" in g.tipo_costo.nombre_tipo.lower() or "sueldo" in g.tipo_costo.nombre_tipo.lower()
+            "anio": {"in": sorted({anio for anio, _ in unicos})},
+            "mes": {"in": sorted({mes for _, mes in unicos})},
+        },
+        include={"tipo_costo": True}
     )
-    
-    # Prorrateo proporcional
-    proporcion = cantidad_animales / total_animales_mes
-    
-    return {
-        "tasa_consumo_energia_agua": servicios_basicos * proporcion,
-        "costo_mano_obra_asignada": mano_obra * proporcion,
-        "gasto_total_mes": gasto_total_mes * proporcion
-    }
 
+    por_mes: Dict[tuple, List[float]] = {clave: [0.0, 0.0, 0.0] for clave in unicos}
+    for g in gastos:
+        totales = por_mes.get((g.anio, g.mes))
+        if totales is None:
+            continue  # combinacion anio/mes que ningun lote necesita
+        tipo = g.tipo_costo.nombre_tipo.lower()
+        monto = float(g.monto)
+        totales[2] += monto
+        if "servicio" in tipo or "energia" in tipo:
+            totales[0] += monto
+        if "mano" in tipo or "sueldo" in tipo:
+            totales[1] += monto
 
-async def _calcular_viajes_mes(fecha_lote: datetime) -> int:
-    """Calcula cuantos viajes se hicieron en el mes del lote."""
-    mes = fecha_lote.month
-    anio = fecha_lote.year
-    
-    inicio_mes = datetime(anio, mes, 1)
-    if mes == 12:
-        fin_mes = datetime(anio + 1, 1, 1)
-    else:
-        fin_mes = datetime(anio, mes + 1, 1)
-    
-    lotes_mes = await db.lote.count(
-        where={
-            "fecha_adquisicion": {
-                "gte": inicio_mes,
-                "lt": fin_mes
-            }
-        }
-    )
-    
-    return max(lotes_mes, 1)  # Minimo 1 para evitar division por cero
+    filas = np.array([por_mes[clave] for clave in claves]).reshape(-1, 3)
+    return {
+        "servicios_basicos": filas[:, 0],
+        "mano_obra": filas[:, 1],
+        "gasto_total": filas[:, 2],
+    }
 
 
-async def _calcular_ocupacion_granja(fecha_lote: datetime) -> float:
+@medir_paso("ocupacion_granja")
+async def _calcular_contexto_lotes(dias: np.ndarray) -> Dict[str, np.ndarray]:
     """
-    Calcula el factor de ocupacion de la granja en la fecha del lote.
-    Simula ocupacion basada en lotes activos.
+    Viajes y animales del mes de cada lote, y animales en granja en
+    +/- 7 dias (lotes activos), desde el indice de ocupacion: sin consultas
+    mientras el indice este vigente.
     """
-    # Buscar lotes activos en un rango de +/- 7 dias
-    fecha_inicio = fecha_lote - timedelta(days=7)
-    fecha_fin = fecha_lote + timedelta(days=7)
-    
-    lotes_activos = await db.lote.find_many(
-        where={
-            "fecha_adquisicion": {
-                "gte": fecha_inicio,
-                "lte": fecha_fin
-            }
-        }
+    indice = await ocupacion_service.obtener_indice(db)
+    animales_mes, lotes_mes = indice.del_mes(dias)
+    return {
+        "viajes_mes": np.maximum(lotes_mes, 1),  # Minimo 1 para evitar division por cero
+        "animales_mes": animales_mes,
+        "animales_en_granja": indice.en_granja(dias),
+    }
+
+
+async def _features_de_lotes(lotes: List[Any]) -> List[Dict[str, Any]]:
+    """Contexto (gastos y feriados, concurrentes; ocupacion desde el indice) + kernel."""
+    dias = kernel.a_dias([l.fecha_adquisicion for l in lotes])
+    ubicaciones = [l.ubicacion_origen or "Santa Cruz" for l in lotes]
+    distancias = kernel.distancias_km(ubicaciones)
+
+    contexto, gastos, dias_feriado = await asyncio.gather(
+        _calcular_contexto_lotes(dias),
+        _calcular_gastos_mes(dias.astype("datetime64[M]")),
+        _calcular_dias_feriado(dias),
     )
-    
-    total_animales = sum(l.cantidad_animales for l in lotes_activos)
-    factor_ocupacion = min(total_animales / CAPACIDAD_GRANJA, 1.0)
-    
-    return factor_ocupacion
+
+    features, extras = kernel.calcular_features(
+        cantidad_animales=[l.cantidad_animales for l in lotes],
+        peso_promedio_entrada=[l.peso_promedio_entrada for l in lotes],
+        precio_compra_kg=[l.precio_compra_kg for l in lotes],
+        duracion_estadia_dias=[l.duracion_estadia_dias for l in lotes],
+        fechas=dias,
+        distancia_km=distancias,
+        viajes_mes=contexto["viajes_mes"],
+        animales_en_granja=contexto["animales_en_granja"],
+        animales_mes=contexto["animales_mes"],
+        servicios_basicos_mes=gastos["servicios_basicos"],
+        mano_obra_mes=gastos["mano_obra"],
+        gasto_total_mes=gastos["gasto_total"],
+        dias_festividad=dias_feriado,
+        costo_combustible=[l.costo_combustible for l in lotes],
+        costo_peajes_lavado=[l.costo_peajes_lavado for l in lotes],
+        costo_flete=[l.costo_flete for l in lotes],
+        merma_peso_transporte=[l.merma_peso_transporte for l in lotes],
+    )
+
+    resultados = []
+    for i, lote in enumerate(lotes):
+        fila_extras = kernel.fila(extras, i)
+        fila_extras.update({
+            "ubicacion_origen": ubicaciones[i],
+            "distancia_km": int(distancias[i]),
+            "viajes_mes": int(contexto["viajes_mes"][i]),
+        })
+        resultados.append({
+            "lote_id": lote.id_lote,
+            "features": kernel.fila(features, i),
+            "extras": fila_extras,
+        })
+    return resultados
 
 
+@medir_paso("total")
 async def build_features_24_xgboost(
     id_lote: int,
     with_detalle: bool = False
@@ -180,216 +168,56 @@ async def build_features_24_xgboost(
     Returns:
         Dict con features, extras y opcionalmente detalle
     """
-    # 1. Obtener lote
     lote = await db.lote.find_unique(where={"id_lote": id_lote})
     if lote is None:
         raise ValueError("lote_not_found")
-    
-    # ========================================
-    # GRUPO 1: Variables de Adquisicion
-    # ========================================
-    cantidad_animales = float(lote.cantidad_animales)
-    peso_promedio_entrada = float(lote.peso_promedio_entrada)
-    precio_compra_kg = float(lote.precio_compra_kg or 0.0)
-    costo_adquisicion_total = cantidad_animales * peso_promedio_entrada * precio_compra_kg
-    
-    # ========================================
-    # GRUPO 2: Logistica y Transporte
-    # ========================================
-    # Obtener distancia (si no esta en BD, usar default)
-    ubicacion = lote.ubicacion_origen or "Santa Cruz"
-    distancia_km = DISTANCIAS_KM.get(ubicacion, 350)
-    
-    # Costos logisticos desde BD o calcular
-    costo_combustible_viaje = float(lote.costo_combustible or 0.0)
-    if costo_combustible_viaje == 0:
-        # Calcular: Diesel ~3.7 Bs/litro, consumo ~25 km/litro
-        litros_diesel = distancia_km / 25.0
-        costo_combustible_viaje = litros_diesel * 3.7
-    
-    costo_peajes_lavado = float(lote.costo_peajes_lavado or 0.0)
-    if costo_peajes_lavado == 0:
-        # Estimar: 3 peajes * 40 Bs + lavado 100 Bs
-        costo_peajes_lavado = (3 * 40) + 100
-    
-    costo_flete_estimado = float(lote.costo_flete or 0.0)
-    if costo_flete_estimado == 0:
-        # Estimar: base + por km + por animal
-        costo_flete_estimado = 300 + (distancia_km * 1.0) + (cantidad_animales * 10)
-    
-    # Mantenimiento camion prorrateado
-    viajes_mes = await _calcular_viajes_mes(lote.fecha_adquisicion)
-    mantenimiento_camion_prorrateado = MANTENIMIENTO_CAMION_MENSUAL / viajes_mes
-    
-    # ========================================
-    # GRUPO 3: Costos Fijos Dinamicos
-    # ========================================
-    duracion_estadia_dias = int(lote.duracion_estadia_dias or 0)
-    
-    # Costo fijo diario del lote
-    costo_fijo_diario = (SUELDOS_MENSUALES + GASTOS_OPERATIVOS_MENSUALES) / 30
-    costo_fijo_diario_lote = costo_fijo_diario * duracion_estadia_dias
-    
-    # Factor de ocupacion
-    factor_ocupacion_granja = await _calcular_ocupacion_granja(lote.fecha_adquisicion)
-    
-    # Prorrateo de gastos mensuales
-    prorrateo = await _calcular_prorrateo_gastos_mensuales(
-        lote.fecha_adquisicion,
-        int(cantidad_animales)
-    )
-    tasa_consumo_energia_agua = prorrateo["tasa_consumo_energia_agua"]
-    costo_mano_obra_asignada = prorrateo["costo_mano_obra_asignada"]
-    
-    # ========================================
-    # GRUPO 4: Estadia, Alimento y Sanidad
-    # ========================================
-    # Costo alimentacion
-    costo_alimentacion_total = cantidad_animales * duracion_estadia_dias * 1.5
-    
-    # Costo sanitario (vacunas + higiene)
-    costo_sanitario_total = cantidad_animales * 10.0  # Promedio 10 Bs/animal
-    
-    # Merma de peso en transporte
-    merma_peso_transporte = float(lote.merma_peso_transporte or 0.0)
-    if merma_peso_transporte == 0:
-        # Estimar: 0.5 kg por cerdo
-        merma_peso_transporte = cantidad_animales * 0.5
-    
-    # Peso de salida esperado
-    if duracion_estadia_dias > 0:
-        ganancia_por_dia = 1.15  # kg/dia/cerdo promedio
-        peso_ganado = ganancia_por_dia * duracion_estadia_dias
-        peso_salida_promedio = peso_promedio_entrada + peso_ganado - (merma_peso_transporte / cantidad_animales)
-        peso_salida_esperado = peso_salida_promedio * cantidad_animales
-    else:
-        peso_salida_esperado = cantidad_animales * peso_promedio_entrada
-    
-    # ========================================
-    # GRUPO 5: Variables Temporales y de Mercado
-    # ========================================
-    mes_adquisicion = lote.fecha_adquisicion.month
-    dia_semana_llegada = lote.fecha_adquisicion.weekday()
-    
-    # Calcular feriado proximo
-    es_feriado_proximo, dias_para_festividad = await _calcular_feriado_proximo(lote.fecha_adquisicion)
-    
-    # ========================================
-    # GRUPO 6: Variables Compuestas
-    # ========================================
-    costo_logistica = costo_flete_estimado + costo_combustible_viaje + costo_peajes_lavado
-    costo_operativo_por_cabeza = (costo_logistica + costo_fijo_diario_lote) / cantidad_animales
-    
-    ratio_alimento_precio_compra = costo_alimentacion_total / costo_adquisicion_total if costo_adquisicion_total > 0 else 0
-    
-    indicador_eficiencia_estadia = peso_promedio_entrada / duracion_estadia_dias if duracion_estadia_dias > 0 else 0
-    
-    # ========================================
-    # Construir vector de features (24 features)
-    # ========================================
-    features = {
-        # Grupo 1: Adquisicion
-        "cantidad_animales": cantidad_animales,
-        "peso_promedio_entrada": peso_promedio_entrada,
-        "precio_compra_kg": precio_compra_kg,
-        "costo_adquisicion_total": costo_adquisicion_total,
-        
-        # Grupo 2: Logistica
-        "costo_combustible_viaje": costo_combustible_viaje,
-        "costo_peajes_lavado": costo_peajes_lavado,
-        "costo_flete_estimado": costo_flete_estimado,
-        "mantenimiento_camion_prorrateado": mantenimiento_camion_prorrateado,
-        
-        # Grupo 3: Costos Fijos Dinamicos
-        "costo_fijo_diario_lote": costo_fijo_diario_lote,
-        "factor_ocupacion_granja": factor_ocupacion_granja,
-        "tasa_consumo_energia_agua": tasa_consumo_energia_agua,
-        "costo_mano_obra_asignada": costo_mano_obra_asignada,
-        
-        # Grupo 4: Estadia
-        "duracion_estadia_dias": duracion_estadia_dias,
-        "costo_alimentacion_total": costo_alimentacion_total,
-        "costo_sanitario_total": costo_sanitario_total,
-        "merma_peso_transporte": merma_peso_transporte,
-        "peso_salida_esperado": peso_salida_esperado,
-        
-        # Grupo 5: Temporales
-        "mes_adquisicion": mes_adquisicion,
-        "dia_semana_llegada": dia_semana_llegada,
-        "es_feriado_proximo": int(es_feriado_proximo),
-        "dias_para_festividad": dias_para_festividad,
-        
-        # Grupo 6: Compuestas
-        "costo_operativo_por_cabeza": costo_operativo_por_cabeza,
-        "ratio_alimento_precio_compra": ratio_alimento_precio_compra,
-        "indicador_eficiencia_estadia": indicador_eficiencia_estadia,
-    }
-    
-    # ========================================
-    # Extras para analisis
-    # ========================================
-    extras = {
-        "costo_logistica_total": costo_logistica,
-        "costo_fijo_total": costo_fijo_diario_lote + tasa_consumo_energia_agua + costo_mano_obra_asignada,
-        "costo_variable_total": costo_adquisicion_total + costo_logistica + costo_alimentacion_total + costo_sanitario_total,
-        "kilos_entrada": cantidad_animales * peso_promedio_entrada,
-        "peso_salida_total": peso_salida_esperado,
-        "ubicacion_origen": ubicacion,
-        "distancia_km": distancia_km,
-        "viajes_mes": viajes_mes,
-    }
-    
-    resultado = {
-        "lote_id": id_lote,
-        "features": features,
-        "extras": extras,
-    }
-    
+
+    resultado, = await _features_de_lotes([lote])
+    resultado["lote_id"] = id_lote
+    gasto_mes_prorrateado = resultado["extras"].pop("gasto_total_mes_prorrateado")
+
     # Desglose detallado si se solicita
     if with_detalle:
-        resultado["detalle"] = {
-            "grupo_1_adquisicion": {
-                "cantidad_animales": cantidad_animales,
-                "peso_promedio_entrada": peso_promedio_entrada,
-                "precio_compra_kg": precio_compra_kg,
-                "costo_adquisicion_total": costo_adquisicion_total,
-            },
-            "grupo_2_logistica": {
-                "costo_combustible_viaje": costo_combustible_viaje,
-                "costo_peajes_lavado": costo_peajes_lavado,
-                "costo_flete_estimado": costo_flete_estimado,
-                "mantenimiento_camion_prorrateado": mantenimiento_camion_prorrateado,
-            },
-            "grupo_3_costos_fijos": {
-                "costo_fijo_diario_lote": costo_fijo_diario_lote,
-                "factor_ocupacion_granja": factor_ocupacion_granja,
-                "tasa_consumo_energia_agua": tasa_consumo_energia_agua,
-                "costo_mano_obra_asignada": costo_mano_obra_asignada,
-                "gasto_total_mes_prorrateado": prorrateo["gasto_total_mes"],
-            },
-            "grupo_4_estadia": {
-                "duracion_estadia_dias": duracion_estadia_dias,
-                "costo_alimentacion_total": costo_alimentacion_total,
-                "costo_sanitario_total": costo_sanitario_total,
-                "merma_peso_transporte": merma_peso_transporte,
-                "peso_salida_esperado": peso_salida_esperado,
-            },
-            "grupo_5_temporales": {
-                "mes_adquisicion": mes_adquisicion,
-                "dia_semana_llegada": dia_semana_llegada,
-                "es_feriado_proximo": es_feriado_proximo,
-                "dias_para_festividad": dias_para_festividad,
-            },
-            "grupo_6_compuestas": {
-                "costo_operativo_por_cabeza": costo_operativo_por_cabeza,
-                "ratio_alimento_precio_compra": ratio_alimento_precio_compra,
-                "indicador_eficiencia_estadia": indicador_eficiencia_estadia,
-            },
+        features = resultado["features"]
+        detalle = {
+            grupo: {nombre: features[nombre] for nombre in nombres}
+            for grupo, nombres in GRUPOS_DETALLE.items()
         }
-    
+        detalle["grupo_3_costos_fijos"]["gasto_total_mes_prorrateado"] = gasto_mes_prorrateado
+        detalle["grupo_5_temporales"]["es_feriado_proximo"] = bool(features["es_feriado_proximo"])
+        resultado["detalle"] = detalle
+
     return resultado
 
 
+@medir_paso("batch")
+async def build_features_batch(ids_lote: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Features de muchos lotes con un numero fijo de consultas (lotes, gastos
+    y feriados), sin importar cuantos sean. Los ids inexistentes se omiten.
+
+    Returns:
+        {id_lote: {"lote_id", "features", "extras"}}
+    """
+    if not ids_lote:
+        return {}
+    lotes = await db.lote.find_many(where={"id_lote": {"in": list(ids_lote)}})
+    return await build_features_lotes(lotes)
+
+
+async def build_features_lotes(lotes: List[Any]) -> Dict[int, Dict[str, Any]]:
+    """
+    Como `build_features_batch`, con los lotes ya leidos (p. ej. paginas de
+    la extraccion del dataset de entrenamiento): no vuelve a buscarlos.
+    """
+    if not lotes:
+        return {}
+    resultados = await _features_de_lotes(lotes)
+    for r in resultados:
+        r["extras"].pop("gasto_total_mes_prorrateado")
+    return {r["lote_id"]: r for r in resultados}
+
+
 # Mantener funcion legacy para compatibilidad
 async def build_features_para_modelo(
     id_lote: int,
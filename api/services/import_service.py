@@ -0,0 +1,78 @@
+# api/services/import_service.py
+"""
+Lectura en streaming de archivos de importacion masiva (CSV y NDJSON).
+
+Las filas se leen una a una desde el stream de la peticion, sin cargar el
+archivo completo en memoria, y se entregan como dicts junto a su numero de
+fila (1 = primera fila de datos) para poder reportar errores por fila.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+
+FORMATOS = ("csv", "ndjson")
+MAX_ERRORES_REPORTADOS = 1000
+
+
+def detectar_formato(formato: Optional[str], content_type: Optional[str],
+                     filename: Optional[str]) -> Optional[str]:
+    """Determina el formato a partir del query param, el Content-Type o la extension."""
+    if formato:
+        formato = formato.lower()
+        return formato if formato in FORMATOS else None
+
+    content_type = (content_type or "").lower()
+    filename = (filename or "").lower()
+    if "csv" in content_type or filename.endswith(".csv"):
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type or filename.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+def _limpiar(valor: Any) -> Any:
+    """Celdas vacias de CSV -> None, para que los campos opcionales validen."""
+    if isinstance(valor, str):
+        valor = valor.strip()
+        return valor or None
+    return valor
+
+
+def iterar_filas(stream: IO[bytes], formato: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Itera las filas del stream. Para NDJSON, una linea que no es JSON valido
+    se entrega como excepcion ValueError en lugar del dict, para que el
+    llamador la reporte como error de esa fila sin abortar la importacion.
+    """
+    texto = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+    if formato == "csv":
+        reader = csv.DictReader(texto)
+        for numero, fila in enumerate(reader, start=1):
+            yield numero, {k.strip(): _limpiar(v) for k, v in fila.items() if k}
+        return
+
+    numero = 0
+    for linea in texto:
+        linea = linea.strip()
+        if not linea:
+            continue
+        numero += 1
+        try:
+            yield numero, json.loads(linea)
+        except json.JSONDecodeError as e:
+            yield numero, ValueError(f"JSON invalido: {e.msg}")
+
+
+def formatear_errores_validacion(exc: Exception, prefijo: str = "") -> List[Dict[str, Any]]:
+    """Convierte un ValidationError de pydantic (o cualquier error) a una lista serializable."""
+    errores_fn = getattr(exc, "errors", None)
+    if callable(errores_fn):
+        return [
+            {"campo": prefijo + ".".join(str(p) for p in err.get("loc", ())), "mensaje": err.get("msg")}
+            for err in errores_fn()
+        ]
+    return [{"campo": prefijo.rstrip(".") or None, "mensaje": str(exc)}]
@@ -0,0 +1,572 @@
+# api/services/jobs_service.py
+"""
+Cola de trabajos en segundo plano para tareas largas (ML y datos).
+
+Los trabajos se guardan en una tabla SQLite, de modo que sobreviven a
+reinicios y son visibles para todos los workers de gunicorn. Cada proceso
+levanta un despachador que reclama trabajos pendientes respetando un limite
+GLOBAL de concurrencia (JOBS_MAX_CONCURRENT) y los ejecuta como subprocesos
+con prioridad baja (nice) e hilos limitados, para que un entrenamiento nunca
+deje sin CPU a los workers que sirven la API.
+
+El progreso se obtiene de la salida estandar de los scripts existentes:
+lineas del estilo "Paso 1/2" o "Progreso: 10/100" actualizan el porcentaje.
+
+Cada subproceso corre en su propia sesion (grupo de procesos) y su pid se
+guarda en la fila: la cancelacion se revisa cada segundo aunque el script
+no escriba nada (SIGTERM al grupo y, si no termina en
+JOBS_KILL_GRACE_SECONDS, SIGKILL), y si el worker que lo lanzo muere, el
+siguiente despachador mata al grupo huerfano antes de marcar el trabajo
+FALLIDO, asi nunca hay mas de JOBS_MAX_CONCURRENT corriendo.
+"""
+from __future__ import annotations
+
+import json
+import os
+import queue
+import re
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from config import settings
+
+API_DIR = Path(__file__).resolve().parent.parent
+ROOT_DIR = API_DIR.parent
+
+# Estados posibles de un trabajo
+PENDIENTE = "PENDIENTE"
+EN_CURSO = "EN_CURSO"
+COMPLETADO = "COMPLETADO"
+FALLIDO = "FALLIDO"
+CANCELADO = "CANCELADO"
+ESTADOS = (PENDIENTE, EN_CURSO, COMPLETADO, FALLIDO, CANCELADO)
+
+_RE_PROGRESO = re.compile(r"(?:Paso|Progreso:?)\s*(\d+)\s*/\s*(\d+)", re.IGNORECASE)
+_SIGKILL = getattr(signal, "SIGKILL", signal.SIGTERM)  # Windows no tiene SIGKILL
+_LINEAS_LOG = 50           # Lineas de salida que se conservan por trabajo
+_INTERVALO_FLUSH = 1.0     # Segundos minimos entre escrituras de progreso
+
+
+# ---------------------------------------------------
+# Catalogo de tipos de trabajo
+# ---------------------------------------------------
+# Cada tipo define sus parametros (nombre -> (tipo, default)) y como construir
+# el comando a ejecutar. Los comandos corren con cwd=api/.
+def _modo_incremental(valor: Any) -> str:
+    if valor not in ("continuar", "ventana"):
+        raise ValueError(valor)
+    return valor
+
+
+TIPOS_TRABAJO: Dict[str, Dict[str, Any]] = {
+    "reentrenar": {
+        "descripcion": "Regenera el dataset sintetico y reentrena el modelo XGBoost",
+        "parametros": {"n_samples": (int, 2000)},
+        "comando": lambda p: [sys.executable, "-m", "ml.ml_system", "train",
+                              "--n-samples", str(p["n_samples"])],
+    },
+    "reentrenar_incremental": {
+        "descripcion": "Actualiza el modelo con los lotes cerrados nuevos de la BD (warm start o ventana)",
+        "parametros": {
+            "modo": (_modo_incremental, "continuar"),
+            "rondas": (int, 50),
+            "ventana_dias": (int, 365),
+            "min_lotes": (int, 20),
+        },
+        "comando": lambda p: [sys.executable, "-m", "ml.reentrenar_incremental",
+                              "--modo", p["modo"], "--rondas", str(p["rondas"]),
+                              "--ventana-dias", str(p["ventana_dias"]),
+                              "--min-lotes", str(p["min_lotes"])],
+    },
+    "extraer_dataset": {
+        "descripcion": "Extrae el dataset de entrenamiento de los lotes cerrados de la BD (Parquet, reanudable)",
+        "parametros": {"filas_por_shard": (int, 50000), "tamano_pagina": (int, 1000)},
+        "comando": lambda p: [sys.executable, "-m", "ml.extraer_dataset",
+                              "--out", str(ROOT_DIR / "data" / "reales"),
+                              "--filas-por-shard", str(p["filas_por_shard"]),
+                              "--tamano-pagina", str(p["tamano_pagina"])],
+    },
+    "generar_dataset": {
+        "descripcion": "Genera el dataset sintetico de 24 features",
+        "parametros": {"n": (int, 2000)},
+        "comando": lambda p: [sys.executable, "-m", "ml.data.generate_data",
+                              "--n", str(p["n"]), "--out", str(ROOT_DIR / "data")],
+    },
+    "poblar_datos": {
+        "descripcion": "Pobla la BD con lotes, costos y produccion de ejemplo",
+        "parametros": {},
+        "comando": lambda p: [sys.executable, "generar_datos_completos.py"],
+    },
+    "poblar_feriados": {
+        "descripcion": "Carga los feriados nacionales (features #20 y #21)",
+        "parametros": {},
+        "comando": lambda p: [sys.executable, str(ROOT_DIR / "scripts" / "database" / "poblar_feriados.py")],
+    },
+    "poblar_gastos_mensuales": {
+        "descripcion": "Carga gastos mensuales de ejemplo para el prorrateo",
+        "parametros": {},
+        "comando": lambda p: [sys.executable, str(ROOT_DIR / "scripts" / "database" / "poblar_gastos_mensuales.py")],
+    },
+}
+
+
+def validar_parametros(tipo: str, parametros: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Valida y completa los parametros de un trabajo segun su tipo.
+    Lanza ValueError con un codigo de error si algo no es valido.
+    """
+    if tipo not in TIPOS_TRABAJO:
+        raise ValueError("tipo_trabajo_invalido")
+
+    especificacion = TIPOS_TRABAJO[tipo]["parametros"]
+    parametros = parametros or {}
+
+    desconocidos = set(parametros) - set(especificacion)
+    if desconocidos:
+        raise ValueError(f"parametros_desconocidos: {', '.join(sorted(desconocidos))}")
+
+    resultado = {}
+    for nombre, (tipo_param, default) in especificacion.items():
+        valor = parametros.get(nombre, default)
+        try:
+            valor = tipo_param(valor)
+        except (TypeError, ValueError):
+            raise ValueError(f"parametro_invalido: {nombre}")
+        if isinstance(valor, int) and valor <= 0:
+            raise ValueError(f"parametro_invalido: {nombre}")
+        resultado[nombre] = valor
+    return resultado
+
+
+# ---------------------------------------------------
+# Almacen SQLite
+# ---------------------------------------------------
+def _db_path() -> Path:
+    path = Path(settings.JOBS_DB_PATH)
+    if not path.is_absolute():
+        path = API_DIR / path
+    return path
+
+
+def _conectar() -> sqlite3.Connection:
+    conn = sqlite3.connect(_db_path(), timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS trabajo (
+            id_trabajo      INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo            TEXT    NOT NULL,
+            parametros      TEXT    NOT NULL,
+            estado          TEXT    NOT NULL,
+            progreso        REAL,
+            mensaje         TEXT,
+            log             TEXT,
+            codigo_salida   INTEGER,
+            cancelar        INTEGER NOT NULL DEFAULT 0,
+            pid_worker      INTEGER,
+            pid_proceso     INTEGER,
+            id_usuario      INTEGER,
+            fecha_creacion  REAL    NOT NULL,
+            fecha_inicio    REAL,
+            fecha_fin       REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS trabajo_estado_idx ON trabajo (estado, id_trabajo)")
+    _migrar(conn)
+    return conn
+
+
+_columnas_ok = False
+
+
+def _migrar(conn: sqlite3.Connection) -> None:
+    """Agrega a una tabla creada por una version anterior las columnas nuevas (una vez por proceso)."""
+    global _columnas_ok
+    if _columnas_ok:
+        return
+    columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(trabajo)")}
+    if "pid_proceso" not in columnas:
+        try:
+            conn.execute("ALTER TABLE trabajo ADD COLUMN pid_proceso INTEGER")
+        except sqlite3.OperationalError as e:
+            if "duplicate column" not in str(e):  # Otro worker la agrego al mismo tiempo
+                raise
+    _columnas_ok = True
+
+
+def _serializar(row: sqlite3.Row) -> Dict[str, Any]:
+    ahora = time.time()
+    inicio, fin = row["fecha_inicio"], row["fecha_fin"]
+    espera = (inicio or ahora) - row["fecha_creacion"]
+    duracion = ((fin or ahora) - inicio) if inicio else None
+
+    def _iso(ts):
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ts)) if ts else None
+
+    return {
+        "id_trabajo": row["id_trabajo"],
+        "tipo": row["tipo"],
+        "parametros": json.loads(row["parametros"]),
+        "estado": row["estado"],
+        "progreso": row["progreso"],
+        "mensaje": row["mensaje"],
+        "log": (row["log"] or "").splitlines(),
+        "codigo_salida": row["codigo_salida"],
+        "id_usuario": row["id_usuario"],
+        "fecha_creacion": _iso(row["fecha_creacion"]),
+        "fecha_inicio": _iso(inicio),
+        "fecha_fin": _iso(fin),
+        "tiempos": {
+            "espera_segundos": round(espera, 2),
+            "duracion_segundos": round(duracion, 2) if duracion is not None else None,
+        },
+    }
+
+
+def encolar(tipo: str, parametros: Optional[Dict[str, Any]] = None,
+            id_usuario: Optional[int] = None) -> Dict[str, Any]:
+    """Registra un trabajo nuevo en estado PENDIENTE y despierta al despachador."""
+    parametros = validar_parametros(tipo, parametros)
+    conn = _conectar()
+    try:
+        cur = conn.execute(
+            "INSERT INTO trabajo (tipo, parametros, estado, id_usuario, fecha_creacion) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (tipo, json.dumps(parametros), PENDIENTE, id_usuario, time.time()),
+        )
+        row = conn.execute("SELECT * FROM trabajo WHERE id_trabajo = ?", (cur.lastrowid,)).fetchone()
+    finally:
+        conn.close()
+
+    iniciar_despachador()
+    _despertar.set()
+    return _serializar(row)
+
+
+def obtener(id_trabajo: int) -> Optional[Dict[str, Any]]:
+    conn = _conectar()
+    try:
+        row = conn.execute("SELECT * FROM trabajo WHERE id_trabajo = ?", (id_trabajo,)).fetchone()
+    finally:
+        conn.close()
+    return _serializar(row) if row else None
+
+
+def listar(estado: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    conn = _conectar()
+    try:
+        if estado:
+            rows = conn.execute(
+                "SELECT * FROM trabajo WHERE estado = ? ORDER BY id_trabajo DESC LIMIT ?",
+                (estado, limit),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT * FROM trabajo ORDER BY id_trabajo DESC LIMIT ?", (limit,)
+            ).fetchall()
+    finally:
+        conn.close()
+    return [_serializar(r) for r in rows]
+
+
+def cancelar(id_trabajo: int) -> Optional[Dict[str, Any]]:
+    """
+    Cancela un trabajo. Si esta pendiente se marca CANCELADO de inmediato;
+    si esta en curso se marca para que el worker que lo ejecuta lo termine.
+    """
+    conn = _conectar()
+    try:
+        conn.execute(
+            "UPDATE trabajo SET estado = ?, fecha_fin = ?, mensaje = 'Cancelado antes de iniciar' "
+            "WHERE id_trabajo = ? AND estado = ?",
+            (CANCELADO, time.time(), id_trabajo, PENDIENTE),
+        )
+        conn.execute(
+            "UPDATE trabajo SET cancelar = 1 WHERE id_trabajo = ? AND estado = ?",
+            (id_trabajo, EN_CURSO),
+        )
+        row = conn.execute("SELECT * FROM trabajo WHERE id_trabajo = ?", (id_trabajo,)).fetchone()
+    finally:
+        conn.close()
+    return _serializar(row) if row else None
+
+
+# ---------------------------------------------------
+# Despachador (uno por proceso)
+# ---------------------------------------------------
+_lock = threading.Lock()
+_despertar = threading.Event()
+_despachador_pid: Optional[int] = None
+_pool: Optional[ThreadPoolExecutor] = None
+_slots: Optional[threading.BoundedSemaphore] = None
+
+
+def _proceso_vivo(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _senal_grupo(pid: int, senal: int) -> None:
+    """Envia `senal` al grupo del subproceso (lider: `pid`, por start_new_session)."""
+    if os.name != "posix":
+        os.kill(pid, signal.SIGTERM)  # TerminateProcess: ya es forzado
+        return
+    try:
+        # Solo si `pid` sigue siendo el lider de su propio grupo (no un pid reutilizado)
+        if os.getpgid(pid) == pid:
+            os.killpg(pid, senal)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _recuperar_huerfanos(conn: sqlite3.Connection) -> None:
+    """
+    Marca como FALLIDO los trabajos cuyo worker murio a mitad de ejecucion y
+    mata su subproceso, que sigue vivo (adoptado por init) y contaria contra
+    el limite global sin que nadie lo siga.
+    """
+    filas = conn.execute(
+        "SELECT id_trabajo, pid_worker, pid_proceso FROM trabajo WHERE estado = ?", (EN_CURSO,)
+    ).fetchall()
+    for row in filas:
+        if _proceso_vivo(row["pid_worker"]):
+            continue
+        mensaje = "El worker que lo ejecutaba se detuvo"
+        if _proceso_vivo(row["pid_proceso"]):
+            _senal_grupo(row["pid_proceso"], _SIGKILL)
+            mensaje += "; se termino su subproceso"
+        conn.execute(
+            "UPDATE trabajo SET estado = ?, fecha_fin = ?, mensaje = ? WHERE id_trabajo = ? AND estado = ?",
+            (FALLIDO, time.time(), mensaje, row["id_trabajo"], EN_CURSO),
+        )
+
+
+def _reclamar() -> Optional[sqlite3.Row]:
+    """
+    Reclama atomicamente el siguiente trabajo pendiente si no se supero el
+    limite global de trabajos en curso (compartido entre procesos).
+    """
+    conn = _conectar()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _recuperar_huerfanos(conn)
+            en_curso = conn.execute(
+                "SELECT COUNT(*) FROM trabajo WHERE estado = ?", (EN_CURSO,)
+            ).fetchone()[0]
+            if en_curso >= settings.JOBS_MAX_CONCURRENT:
+                conn.execute("COMMIT")
+                return None
+
+            row = conn.execute(
+                "SELECT * FROM trabajo WHERE estado = ? ORDER BY id_trabajo LIMIT 1", (PENDIENTE,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                "UPDATE trabajo SET estado = ?, fecha_inicio = ?, pid_worker = ?, progreso = 0 "
+                "WHERE id_trabajo = ?",
+                (EN_CURSO, time.time(), os.getpid(), row["id_trabajo"]),
+            )
+            conn.execute("COMMIT")
+            return row
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+
+def _baja_prioridad() -> None:
+    """Se ejecuta en el hijo antes del exec: baja su prioridad de CPU."""
+    try:
+        os.nice(settings.JOBS_NICE)
+    except OSError:
+        pass
+
+
+def _ejecutar(row: sqlite3.Row) -> None:
+    id_trabajo = row["id_trabajo"]
+    parametros = json.loads(row["parametros"])
+    comando: Callable[[Dict[str, Any]], List[str]] = TIPOS_TRABAJO[row["tipo"]]["comando"]
+
+    env = dict(os.environ)
+    hilos = str(settings.JOBS_THREADS)
+    env.update({
+        "PYTHONUNBUFFERED": "1",
+        "PYTHONIOENCODING": "utf-8",
+        "OMP_NUM_THREADS": hilos,
+        "OPENBLAS_NUM_THREADS": hilos,
+        "MKL_NUM_THREADS": hilos,
+    })
+
+    log = deque(maxlen=_LINEAS_LOG)
+    progreso = 0.0
+    estado, mensaje, codigo = FALLIDO, None, None
+    conn = _conectar()
+    try:
+        proc = subprocess.Popen(
+            comando(parametros),
+            cwd=API_DIR,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+            preexec_fn=_baja_prioridad if os.name == "posix" else None,
+            # Grupo propio: se puede terminar entero, y sobrevive sin el worker
+            start_new_session=os.name == "posix",
+        )
+        conn.execute("UPDATE trabajo SET pid_proceso = ? WHERE id_trabajo = ?", (proc.pid, id_trabajo))
+
+        # La salida se lee en otro hilo: el bucle revisa la cancelacion y el
+        # proceso cada _INTERVALO_FLUSH aunque el script no escriba nada
+        lineas: "queue.Queue[str]" = queue.Queue()
+
+        def _leer_salida() -> None:
+            for linea in proc.stdout:
+                lineas.put(linea)
+
+        lector = threading.Thread(target=_leer_salida, name=f"trabajo-{id_trabajo}-salida", daemon=True)
+        lector.start()
+
+        ultimo_flush = 0.0
+        cancelado_en: Optional[float] = None
+        ultima = None
+        while True:
+            terminado = proc.poll() is not None
+            if terminado:
+                lector.join(timeout=_INTERVALO_FLUSH)
+            pendientes = []
+            try:
+                pendientes.append(lineas.get(timeout=0 if terminado else _INTERVALO_FLUSH))
+                while True:
+                    pendientes.append(lineas.get_nowait())
+            except queue.Empty:
+                pass
+            for linea in pendientes:
+                linea = linea.rstrip()
+                if not linea:
+                    continue
+                log.append(linea)
+                ultima = linea
+                match = _RE_PROGRESO.search(linea)
+                if match and int(match.group(2)) > 0:
+                    progreso = min(int(match.group(1)) / int(match.group(2)), 1.0)
+            if terminado:
+                break
+
+            ahora = time.monotonic()
+            if ahora - ultimo_flush >= _INTERVALO_FLUSH:
+                ultimo_flush = ahora
+                conn.execute(
+                    "UPDATE trabajo SET progreso = ?, mensaje = COALESCE(?, mensaje), log = ? WHERE id_trabajo = ?",
+                    (progreso, ultima, "\n".join(log), id_trabajo),
+                )
+                flag = conn.execute(
+                    "SELECT cancelar FROM trabajo WHERE id_trabajo = ?", (id_trabajo,)
+                ).fetchone()[0]
+                if flag and cancelado_en is None:
+                    cancelado_en = ahora
+                    _senal_grupo(proc.pid, signal.SIGTERM)
+            if cancelado_en is not None and ahora - cancelado_en >= settings.JOBS_KILL_GRACE_SECONDS:
+                # No respondio a SIGTERM (o se colgo): se fuerza
+                _senal_grupo(proc.pid, _SIGKILL)
+
+        codigo = proc.wait()
+        if cancelado_en is not None:
+            estado, mensaje = CANCELADO, "Cancelado durante la ejecucion"
+        elif codigo == 0:
+            estado, progreso = COMPLETADO, 1.0
+            mensaje = log[-1] if log else "Completado"
+        else:
+            mensaje = log[-1] if log else f"El proceso termino con codigo {codigo}"
+    except Exception as e:
+        log.append(f"Error al ejecutar el trabajo: {e}")
+        mensaje = str(e)
+    finally:
+        conn.execute(
+            "UPDATE trabajo SET estado = ?, progreso = ?, mensaje = ?, log = ?, codigo_salida = ?, "
+            "fecha_fin = ? WHERE id_trabajo = ?",
+            (estado, progreso, mensaje, "\n".join(log), codigo, time.time(), id_trabajo),
+        )
+        conn.close()
+
+
+def _marcar_fallido(id_trabajo: int, mensaje: str) -> None:
+    try:
+        conn = _conectar()
+        try:
+            conn.execute(
+                "UPDATE trabajo SET estado = ?, mensaje = ?, fecha_fin = ? WHERE id_trabajo = ? AND estado = ?",
+                (FALLIDO, mensaje, time.time(), id_trabajo, EN_CURSO),
+            )
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️ No se pudo marcar el trabajo {id_trabajo} como fallido: {e}")
+
+
+def _bucle_despachador() -> None:
+    while True:
+        _despertar.wait(timeout=settings.JOBS_POLL_SECONDS)
+        _despertar.clear()
+        try:
+            while _slots.acquire(blocking=False):
+                try:
+                    row = _reclamar()
+                except Exception:
+                    _slots.release()
+                    raise
+                if row is None:
+                    _slots.release()
+                    break
+                try:
+                    future = _pool.submit(_ejecutar, row)
+                except Exception as e:
+                    _slots.release()
+                    _marcar_fallido(row["id_trabajo"], f"No se pudo iniciar: {e}")
+                    raise
+                future.add_done_callback(lambda _f: (_slots.release(), _despertar.set()))
+        except Exception as e:
+            print(f"⚠️ Error en despachador de trabajos: {e}")
+
+
+def iniciar_despachador() -> None:
+    """
+    Arranca el despachador de este proceso (idempotente). Se vuelve a crear
+    tras un fork, ya que los hilos no sobreviven al fork de gunicorn.
+    """
+    global _despachador_pid, _pool, _slots
+    if _despachador_pid == os.getpid():
+        return
+    with _lock:
+        if _despachador_pid == os.getpid():
+            return
+        _pool = ThreadPoolExecutor(
+            max_workers=settings.JOBS_MAX_CONCURRENT, thread_name_prefix="trabajo"
+        )
+        _slots = threading.BoundedSemaphore(settings.JOBS_MAX_CONCURRENT)
+        hilo = threading.Thread(target=_bucle_despachador, name="despachador-trabajos", daemon=True)
+        hilo.start()
+        _despachador_pid = os.getpid()
+        _despertar.set()
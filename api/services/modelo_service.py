@@ -0,0 +1,112 @@
+# api/services/modelo_service.py
+"""
+Registro del modelo XGBoost servido por la API.
+
+El modelo se carga una vez por proceso y se cachea por (ruta, mtime), de
+modo que un reentrenamiento que reemplaza el .pkl se toma solo.
+
+Con gunicorn en modo preload (gunicorn.conf.py) `precargar()` corre en el
+master antes del fork: el modelo, pandas/xgboost y el esquema de features
+quedan en memoria compartida copy-on-write y los workers arrancan sin
+cargar nada. Despues se congela el GC del master (gc.freeze) para que las
+recolecciones de los workers no toquen esos objetos y copien sus paginas.
+
+En el master no se llama a `predict`: XGBoost usa OpenMP y un pool de hilos
+creado antes del fork deja colgados a los hijos (libgomp no es fork-safe).
+"""
+from __future__ import annotations
+
+import os
+import pickle
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from config import settings
+from ml.core.features_kernel import FEATURES_24
+from utils import metrics
+
+# Modelo cargado en memoria: se recarga solo si cambia el archivo (reentrenamiento)
+_modelo_cache = {"clave": None, "valor": None}
+_modelo_lock = threading.Lock()
+
+
+def obtener_modelo() -> Tuple[Any, Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """
+    Modelo XGBoost con 24 features (cacheado por ruta y mtime).
+    Retorna: (modelo, metricas_cv, metricas_full, metadata)
+    """
+    path = settings.MODEL_PATH
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Modelo no encontrado en: {path}")
+
+    clave = (path, os.path.getmtime(path))
+    with _modelo_lock:
+        hit = _modelo_cache["clave"] == clave
+        metrics.registrar_cache("modelo", hit)
+        if not hit:
+            _modelo_cache["valor"] = leer_modelo(path)
+            _modelo_cache["clave"] = clave
+        return _modelo_cache["valor"]
+
+
+def leer_modelo(path: str):
+    try:
+        with open(path, 'rb') as f:
+            model_data = pickle.load(f)
+    except Exception as e:
+        raise ValueError(f"Error al cargar el modelo: {str(e)}")
+
+    # El modelo XGBoost se guarda como diccionario
+    if isinstance(model_data, dict):
+        modelo = model_data['modelo']
+        validar_esquema(modelo)
+        return (
+            modelo,
+            model_data.get('metricas_cv', {}),
+            model_data.get('metricas_full', {}),
+            {
+                'version': model_data.get('version', '1.0'),
+                'fecha_entrenamiento': model_data.get('fecha_entrenamiento'),
+                'n_features': model_data.get('n_features', 24),
+                # Referencia para el monitor de deriva (services/deriva_service.py)
+                'distribuciones': model_data.get('distribuciones'),
+            }
+        )
+    else:
+        # Fallback para modelos legacy
+        return model_data, {}, {}, {'version': 'legacy', 'n_features': 10}
+
+
+def validar_esquema(modelo) -> None:
+    """Falla si el modelo se entreno con otras columnas (o en otro orden) que FEATURES_24."""
+    columnas = getattr(modelo, "feature_names_in_", None)
+    if columnas is not None and list(columnas) != list(FEATURES_24):
+        raise ValueError(
+            "El modelo no coincide con el esquema de 24 features: "
+            f"{len(columnas)} columnas, primeras diferencias en "
+            f"{[c for c, e in zip(columnas, FEATURES_24) if c != e][:3]}"
+        )
+
+
+def matriz_features(filas: List[Dict[str, Any]]):
+    """Filas de features -> DataFrame en el orden del entrenamiento (XGBoost espera DataFrame)."""
+    import pandas as pd
+    return pd.DataFrame(filas, columns=list(FEATURES_24))
+
+
+def precargar() -> Dict[str, Any]:
+    """
+    Carga el modelo y las librerias que usa la inferencia, para llamarse en
+    el master de gunicorn antes del fork. Devuelve un resumen para el log.
+    """
+    t0 = time.perf_counter()
+    import pandas  # noqa: F401
+    import xgboost  # noqa: F401
+    _, _, _, metadata = obtener_modelo()
+    return {
+        "modelo": settings.MODEL_PATH,
+        "version": metadata.get("version"),
+        "n_features": len(FEATURES_24),
+        "segundos": round(time.perf_counter() - t0, 3),
+    }
@@ -0,0 +1,277 @@
+# api/services/ocupacion_service.py
+"""
+Indice de ocupacion de la granja: animales y lotes por dia, con sumas
+acumuladas.
+
+Responde "animales de los lotes adquiridos en [d - 7, d + 7]" (factor de
+ocupacion) y los totales del mes de una fecha en O(1), vectorizado para
+arrays de fechas, y arma la serie diaria completa para el dashboard.
+
+Cada worker tiene su copia en memoria, construida con una sola consulta
+agregada. Las escrituras de lotes de la API aplican el cambio al indice
+local (`registrar_cambios`) y suben una version compartida en SQLite,
+visible para todos los workers: un worker con otra version reconstruye el
+indice en la siguiente consulta. La version se lee con un SELECT de solo
+lectura a lo sumo cada OCUPACION_VERSION_POLL_SECONDS (la tabla se crea al
+escribirla); si el SQLite falla se sigue con el indice actual. Los scripts
+que escriben lotes por fuera de la API llaman a `invalidar()`; cualquier
+otro cambio se recoge al vencer OCUPACION_TTL_SECONDS.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable, Optional, Tuple
+
+import numpy as np
+import structlog
+
+from config import settings
+from ml.core.features_kernel import CAPACIDAD_GRANJA, VENTANA_OCUPACION_DIAS, a_dias
+from utils.metrics import registrar_cache
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+log = structlog.get_logger("ocupacion")
+
+_CONSULTA_POR_DIA = (
+    "SELECT to_char(\"fecha_adquisicion\", 'YYYY-MM-DD') AS dia, "
+    "SUM(\"cantidad_animales\")::bigint AS animales, COUNT(*)::bigint AS lotes "
+    "FROM \"Lote\" GROUP BY 1"
+)
+
+
+class IndiceOcupacion:
+    """Animales y lotes adquiridos por dia desde `inicio`, con sus sumas acumuladas."""
+
+    def __init__(self, dias: np.ndarray, animales: Iterable[int], lotes: Optional[Iterable[int]] = None):
+        dias = np.asarray(dias, dtype="datetime64[D]")
+        animales = np.asarray(animales, dtype=np.int64)
+        lotes = np.ones_like(animales) if lotes is None else np.asarray(lotes, dtype=np.int64)
+        self._lock = threading.Lock()
+
+        if dias.size == 0:
+            self.inicio = None
+            self.animales = np.zeros(0, dtype=np.int64)
+            self.lotes = np.zeros(0, dtype=np.int64)
+        else:
+            self.inicio = dias.min()
+            posiciones = (dias - self.inicio).astype(np.int64)
+            largo = int(posiciones.max()) + 1
+            self.animales = np.bincount(posiciones, weights=animales, minlength=largo).astype(np.int64)
+            self.lotes = np.bincount(posiciones, weights=lotes, minlength=largo).astype(np.int64)
+        self._acumular()
+
+    def _acumular(self) -> None:
+        self._acum_animales = np.concatenate(([0], np.cumsum(self.animales)))
+        self._acum_lotes = np.concatenate(([0], np.cumsum(self.lotes)))
+
+    @property
+    def fin(self) -> Optional[np.datetime64]:
+        return None if self.inicio is None else self.inicio + (self.animales.size - 1)
+
+    def sumar(self, desde: np.ndarray, hasta: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Animales y lotes adquiridos en [desde, hasta] (dias inclusive), por elemento."""
+        desde = np.asarray(desde, dtype="datetime64[D]")
+        hasta = np.asarray(hasta, dtype="datetime64[D]")
+        with self._lock:
+            if self.inicio is None:
+                ceros = np.zeros(np.broadcast(desde, hasta).shape, dtype=np.int64)
+                return ceros, ceros.copy()
+            n = self.animales.size
+            a = np.clip((desde - self.inicio).astype(np.int64), 0, n)
+            b = np.clip((hasta - self.inicio).astype(np.int64) + 1, 0, n)
+            return (self._acum_animales[b] - self._acum_animales[a],
+                    self._acum_lotes[b] - self._acum_lotes[a])
+
+    def en_granja(self, dias: np.ndarray, radio: int = VENTANA_OCUPACION_DIAS) -> np.ndarray:
+        """Animales de los lotes adquiridos en [dia - radio, dia + radio]."""
+        dias = np.asarray(dias, dtype="datetime64[D]")
+        return self.sumar(dias - radio, dias + radio)[0]
+
+    def del_mes(self, dias: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Animales y lotes adquiridos en el mes calendario de cada dia."""
+        meses = np.asarray(dias, dtype="datetime64[D]").astype("datetime64[M]")
+        return self.sumar(meses.astype("datetime64[D]"), (meses + 1).astype("datetime64[D]") - 1)
+
+    def serie(self, desde=None, hasta=None, radio: int = VENTANA_OCUPACION_DIAS) -> Tuple[np.ndarray, np.ndarray]:
+        """Dias de [desde, hasta] (default: todo el historial) y animales en granja de cada uno."""
+        desde = self.inicio if desde is None else np.datetime64(desde, "D")
+        hasta = self.fin if hasta is None else np.datetime64(hasta, "D")
+        if desde is None or hasta is None or hasta < desde:
+            return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.int64)
+        dias = np.arange(desde, hasta + 1, dtype="datetime64[D]")
+        return dias, self.en_granja(dias, radio)
+
+    def aplicar(self, dia: np.datetime64, animales: int, lotes: int) -> None:
+        """Suma (o resta, con valores negativos) un lote sin reconstruir el indice."""
+        dia = np.datetime64(dia, "D")
+        with self._lock:
+            if self.inicio is None:
+                self.inicio = dia
+                self.animales = np.zeros(1, dtype=np.int64)
+                self.lotes = np.zeros(1, dtype=np.int64)
+            elif dia < self.inicio:
+                extra = int((self.inicio - dia).astype(np.int64))
+                self.animales = np.concatenate((np.zeros(extra, dtype=np.int64), self.animales))
+                self.lotes = np.concatenate((np.zeros(extra, dtype=np.int64), self.lotes))
+                self.inicio = dia
+            elif dia > self.fin:
+                extra = int((dia - self.fin).astype(np.int64))
+                self.animales = np.concatenate((self.animales, np.zeros(extra, dtype=np.int64)))
+                self.lotes = np.concatenate((self.lotes, np.zeros(extra, dtype=np.int64)))
+            else:
+                # Dentro del rango: basta con desplazar las sumas desde ese dia
+                i = int((dia - self.inicio).astype(np.int64))
+                self.animales[i] += animales
+                self.lotes[i] += lotes
+                self._acum_animales[i + 1:] += animales
+                self._acum_lotes[i + 1:] += lotes
+                return
+            i = int((dia - self.inicio).astype(np.int64))
+            self.animales[i] += animales
+            self.lotes[i] += lotes
+            self._acumular()
+
+
+def factor_ocupacion(animales: np.ndarray) -> np.ndarray:
+    return np.minimum(np.asarray(animales) / CAPACIDAD_GRANJA, 1.0)
+
+
+# ---------------------------------------------------
+# Version compartida entre workers (SQLite)
+# ---------------------------------------------------
+def _version_path() -> Path:
+    path = Path(settings.OCUPACION_VERSION_PATH)
+    if not path.is_absolute():
+        path = API_DIR / path
+    return path
+
+
+def _leer_version() -> int:
+    """Version compartida; 0 si todavia nadie la escribio. Solo lectura: no toma el lock de escritura."""
+    path = _version_path()
+    if not path.exists():
+        return 0
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=5.0, isolation_level=None)
+    try:
+        fila = conn.execute("SELECT valor FROM version WHERE id = 1").fetchone()
+    except sqlite3.OperationalError as e:
+        if "no such table" in str(e):
+            return 0
+        raise
+    finally:
+        conn.close()
+    return fila[0] if fila else 0
+
+
+def _subir_version() -> Tuple[int, int]:
+    """Incrementa la version compartida. Devuelve (anterior, nueva)."""
+    conn = sqlite3.connect(_version_path(), timeout=5.0, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("CREATE TABLE IF NOT EXISTS version (id INTEGER PRIMARY KEY CHECK (id = 1), valor INTEGER NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO version (id, valor) VALUES (1, 0)")
+        anterior = conn.execute("SELECT valor FROM version WHERE id = 1").fetchone()[0]
+        conn.execute("UPDATE version SET valor = ? WHERE id = 1", (anterior + 1,))
+        conn.execute("COMMIT")
+        return anterior, anterior + 1
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------
+# Indice del proceso
+# ---------------------------------------------------
+# version: la del indice; compartida: la ultima leida del SQLite (y cuando)
+_estado = {"indice": None, "version": None, "cargado_en": 0.0, "compartida": None, "leida_en": float("-inf")}
+_estado_lock = threading.Lock()
+
+
+def _version_compartida() -> Optional[int]:
+    """Version compartida, releida a lo sumo cada OCUPACION_VERSION_POLL_SECONDS."""
+    ahora = time.monotonic()
+    with _estado_lock:
+        if ahora - _estado["leida_en"] < settings.OCUPACION_VERSION_POLL_SECONDS:
+            return _estado["compartida"]
+        _estado["leida_en"] = ahora
+    try:
+        version = _leer_version()
+    except sqlite3.Error as e:
+        # Sin la version se sigue con el indice actual (lo renueva el TTL)
+        log.warning("ocupacion_version_error", error=str(e))
+        with _estado_lock:
+            return _estado["compartida"]
+    with _estado_lock:
+        _estado["compartida"] = version
+    return version
+
+
+async def _construir(cliente) -> IndiceOcupacion:
+    filas = await cliente.query_raw(_CONSULTA_POR_DIA)
+    return IndiceOcupacion(
+        np.array([f["dia"] for f in filas], dtype="datetime64[D]"),
+        [int(f["animales"]) for f in filas],
+        [int(f["lotes"]) for f in filas],
+    )
+
+
+async def obtener_indice(cliente) -> IndiceOcupacion:
+    """Indice vigente del proceso; lo (re)construye si otro worker escribio lotes o vencio el TTL."""
+    version = _version_compartida()
+    with _estado_lock:
+        indice = _estado["indice"]
+        vigente = (
+            indice is not None
+            and _estado["version"] == version
+            and time.monotonic() - _estado["cargado_en"] < settings.OCUPACION_TTL_SECONDS
+        )
+    registrar_cache("ocupacion", vigente)
+    if vigente:
+        return indice
+
+    indice = await _construir(cliente)
+    with _estado_lock:
+        _estado.update(indice=indice, version=version, cargado_en=time.monotonic())
+    return indice
+
+
+def registrar_cambios(cambios: Iterable[Tuple[Any, int, int]]) -> None:
+    """
+    Aplica al indice altas y bajas de lotes ya confirmadas en la BD, como
+    (fecha_adquisicion, animales, lotes) con signo negativo para las bajas,
+    y avisa al resto de los workers.
+    """
+    cambios = list(cambios)
+    if not cambios:
+        return
+    try:
+        anterior, nueva = _subir_version()
+    except sqlite3.Error as e:
+        log.warning("ocupacion_version_error", error=str(e))
+        with _estado_lock:
+            _estado["indice"] = None  # Se reconstruye en la proxima consulta
+        return
+
+    with _estado_lock:
+        _estado["compartida"] = nueva
+        indice = _estado["indice"]
+        # Si el indice local ya estaba desactualizado, se reconstruye al consultarlo
+        if indice is None or _estado["version"] != anterior:
+            return
+        for fecha, animales, lotes in cambios:
+            indice.aplicar(a_dias([fecha])[0], int(animales), int(lotes))
+        _estado["version"] = nueva
+
+
+def invalidar() -> None:
+    """Fuerza la reconstruccion del indice en todos los workers (escrituras fuera de la API)."""
+    _, nueva = _subir_version()
+    with _estado_lock:
+        _estado.update(indice=None, compartida=nueva)
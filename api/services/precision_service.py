@@ -0,0 +1,157 @@
+# api/services/precision_service.py
+"""
+Precision de las predicciones contra lo realizado.
+
+Cada Prediccion guarda lo que predijo el modelo (`precio_ml_kg`, sin
+margen) y los kilos que asumio (`kilos_estimados`). Cuando se registra o
+corrige la Produccion del lote (routes/v1/produccion.py), o cuando se
+predice un lote que ya cerro, `actualizar_errores` escribe en esas filas
+`error_precio_kg` y `error_kilos` (prediccion - realizado): un UPDATE de
+las predicciones de un lote, no un recalculo de todo.
+
+Los reportes agregan esos errores en SQL; no se trae nada fila por fila.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+_ACTUALIZAR_ERRORES = (
+    'UPDATE "Prediccion" p SET '
+    '"error_precio_kg" = p."precio_ml_kg" - pr."precio_venta_kg", '
+    '"error_kilos" = p."kilos_estimados" - pr."peso_salida_total" '
+    'FROM "Produccion" pr WHERE pr."id_lote" = p."id_lote"'
+)
+
+_HISTORIAL_LOTE = (
+    'SELECT p."id_prediccion", p."fecha_prediccion", p."modelo_usado", p."mae_error", '
+    'p."precio_sugerido_kg", p."precio_ml_kg", p."kilos_estimados", '
+    'pr."precio_venta_kg", pr."peso_salida_total", p."error_precio_kg", p."error_kilos" '
+    'FROM "Prediccion" p LEFT JOIN "Produccion" pr ON pr."id_lote" = p."id_lote" '
+    'WHERE p."id_lote" = $1 ORDER BY p."fecha_prediccion" DESC LIMIT $2'
+)
+
+# $1 = ventana del promedio movil (intervalo); el resto, filtros opcionales
+_PRECISION_POR_MES = '''
+WITH mensual AS (
+    SELECT date_trunc('month', "fecha_prediccion") AS mes,
+           COALESCE("modelo_usado", 'desconocido') AS modelo,
+           COUNT("error_precio_kg")::bigint AS n_precio,
+           SUM(ABS("error_precio_kg")) AS abs_precio,
+           SUM("error_precio_kg") AS suma_precio,
+           COUNT("error_kilos")::bigint AS n_kilos,
+           SUM(ABS("error_kilos")) AS abs_kilos,
+           SUM("error_kilos") AS suma_kilos,
+           AVG("mae_error") AS mae_cv
+    FROM "Prediccion"
+    WHERE ("error_precio_kg" IS NOT NULL OR "error_kilos" IS NOT NULL){filtros}
+    GROUP BY 1, 2
+)
+SELECT to_char(mes, 'YYYY-MM') AS mes, modelo, n_precio, n_kilos, mae_cv,
+       abs_precio / NULLIF(n_precio, 0) AS mae_precio_kg,
+       suma_precio / NULLIF(n_precio, 0) AS sesgo_precio_kg,
+       abs_kilos / NULLIF(n_kilos, 0) AS mae_kilos,
+       suma_kilos / NULLIF(n_kilos, 0) AS sesgo_kilos,
+       SUM(abs_precio) OVER w / NULLIF(SUM(n_precio) OVER w, 0) AS mae_precio_kg_movil,
+       SUM(abs_kilos) OVER w / NULLIF(SUM(n_kilos) OVER w, 0) AS mae_kilos_movil
+FROM mensual
+WINDOW w AS (PARTITION BY modelo ORDER BY mes RANGE BETWEEN $1::interval PRECEDING AND CURRENT ROW)
+ORDER BY modelo, mes
+'''
+
+
+def _redondear(valor: Any, digitos: int = 4) -> Any:
+    return round(float(valor), digitos) if valor is not None else None
+
+
+async def actualizar_errores(cliente, id_lote: Optional[int] = None,
+                             id_prediccion: Optional[int] = None) -> int:
+    """
+    Recalcula los errores de las predicciones de un lote (o de una sola, o de
+    todas si no se indica nada) contra su Produccion. Devuelve las filas tocadas.
+    """
+    sql, params = _ACTUALIZAR_ERRORES, []
+    if id_lote is not None:
+        params.append(id_lote)
+        sql += f' AND p."id_lote" = ${len(params)}'
+    if id_prediccion is not None:
+        params.append(id_prediccion)
+        sql += f' AND p."id_prediccion" = ${len(params)}'
+    return await cliente.execute_raw(sql, *params)
+
+
+async def historial_lote(cliente, id_lote: int, limit: int = 50) -> List[Dict[str, Any]]:
+    """Predicciones de un lote (mas recientes primero) junto a lo realizado."""
+    filas = await cliente.query_raw(_HISTORIAL_LOTE, id_lote, limit)
+    return [
+        {
+            "id_prediccion": f["id_prediccion"],
+            "fecha_prediccion": f["fecha_prediccion"],
+            "modelo_usado": f["modelo_usado"],
+            "mae_cv": _redondear(f["mae_error"]),
+            "precio_sugerido_kg": _redondear(f["precio_sugerido_kg"], 2),
+            "precio_ml_kg": _redondear(f["precio_ml_kg"], 2),
+            "precio_venta_kg": _redondear(f["precio_venta_kg"], 2),
+            "error_precio_kg": _redondear(f["error_precio_kg"]),
+            "kilos_estimados": _redondear(f["kilos_estimados"], 2),
+            "kilos_reales": _redondear(f["peso_salida_total"], 2),
+            "error_kilos": _redondear(f["error_kilos"], 2),
+        }
+        for f in filas
+    ]
+
+
+async def precision_por_mes(cliente, meses_ventana: int = 3, modelo: Optional[str] = None,
+                            desde: Optional[date] = None, hasta: Optional[date] = None) -> Dict[str, Any]:
+    """
+    MAE y sesgo (prediccion - realizado) por mes de prediccion y version de
+    modelo, con el MAE movil de los ultimos `meses_ventana` meses, y el
+    total por modelo.
+    """
+    params: List[Any] = [f"{meses_ventana - 1} months"]
+    filtros = ""
+    if modelo:
+        params.append(modelo)
+        filtros += f' AND "modelo_usado" = ${len(params)}'
+    if desde:
+        params.append(datetime.combine(desde, datetime.min.time()).isoformat())
+        filtros += f' AND "fecha_prediccion" >= ${len(params)}::timestamp'
+    if hasta:
+        params.append(datetime.combine(hasta + timedelta(days=1), datetime.min.time()).isoformat())
+        filtros += f' AND "fecha_prediccion" < ${len(params)}::timestamp'
+
+    filas = await cliente.query_raw(_PRECISION_POR_MES.format(filtros=filtros), *params)
+
+    por_mes, modelos = [], {}
+    for f in filas:
+        por_mes.append({
+            "mes": f["mes"],
+            "modelo": f["modelo"],
+            "n_precio": int(f["n_precio"]),
+            "n_kilos": int(f["n_kilos"]),
+            "mae_precio_kg": _redondear(f["mae_precio_kg"]),
+            "sesgo_precio_kg": _redondear(f["sesgo_precio_kg"]),
+            "mae_precio_kg_movil": _redondear(f["mae_precio_kg_movil"]),
+            "mae_kilos": _redondear(f["mae_kilos"], 2),
+            "sesgo_kilos": _redondear(f["sesgo_kilos"], 2),
+            "mae_kilos_movil": _redondear(f["mae_kilos_movil"], 2),
+            "mae_cv": _redondear(f["mae_cv"]),
+        })
+        # Total por modelo: promedio de los meses ponderado por cantidad
+        total = modelos.setdefault(f["modelo"], {"n_precio": 0, "abs_precio": 0.0, "n_kilos": 0, "abs_kilos": 0.0})
+        total["n_precio"] += int(f["n_precio"])
+        total["abs_precio"] += (f["mae_precio_kg"] or 0.0) * int(f["n_precio"])
+        total["n_kilos"] += int(f["n_kilos"])
+        total["abs_kilos"] += (f["mae_kilos"] or 0.0) * int(f["n_kilos"])
+
+    resumen = [
+        {
+            "modelo": nombre,
+            "n_precio": t["n_precio"],
+            "mae_precio_kg": _redondear(t["abs_precio"] / t["n_precio"]) if t["n_precio"] else None,
+            "n_kilos": t["n_kilos"],
+            "mae_kilos": _redondear(t["abs_kilos"] / t["n_kilos"], 2) if t["n_kilos"] else None,
+        }
+        for nombre, t in modelos.items()
+    ]
+    return {"meses_ventana": meses_ventana, "por_mes": por_mes, "por_modelo": resumen}
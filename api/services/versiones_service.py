@@ -0,0 +1,72 @@
+# api/services/versiones_service.py
+"""
+Contadores de cambios por recurso, compartidos por los workers en SQLite.
+
+Cada escritura confirmada de la API sube el contador de los recursos que
+toca (utils/http_cache.py lo hace por endpoint); las lecturas con ETag
+arman su etiqueta con estos contadores, sin consultar la BD. Los scripts
+que escriben por fuera de la API llaman a `invalidar()`.
+"""
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable
+
+from config import settings
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+# Recursos versionados (tablas o grupos de tablas que leen los GET cacheables)
+RECURSOS = ("lotes", "costos", "tipos_costo", "gastos_mensuales", "feriados", "produccion", "predicciones")
+
+
+def _path() -> Path:
+    path = Path(settings.VERSIONES_PATH)
+    if not path.is_absolute():
+        path = API_DIR / path
+    return path
+
+
+def _conectar() -> sqlite3.Connection:
+    conn = sqlite3.connect(_path(), timeout=5.0, isolation_level=None)
+    conn.execute("CREATE TABLE IF NOT EXISTS version (recurso TEXT PRIMARY KEY, valor INTEGER NOT NULL)")
+    return conn
+
+
+def leer(recursos: Iterable[str]) -> Dict[str, int]:
+    """Version actual de cada recurso (0 si nunca cambio)."""
+    recursos = list(recursos)
+    conn = _conectar()
+    try:
+        filas = conn.execute(
+            f"SELECT recurso, valor FROM version WHERE recurso IN ({','.join('?' * len(recursos))})",
+            recursos,
+        ).fetchall()
+    finally:
+        conn.close()
+    valores = dict(filas)
+    return {r: valores.get(r, 0) for r in recursos}
+
+
+def subir(recursos: Iterable[str]) -> None:
+    """Incrementa la version de los recursos (llamar despues de confirmar la escritura)."""
+    recursos = list(recursos)
+    if not recursos:
+        return
+    conn = _conectar()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT INTO version (recurso, valor) VALUES (?, 1) "
+            "ON CONFLICT (recurso) DO UPDATE SET valor = valor + 1",
+            [(r,) for r in recursos],
+        )
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def invalidar(recursos: Iterable[str] = RECURSOS) -> None:
+    """Para escrituras fuera de la API (scripts de poblado): todas las etiquetas cambian."""
+    subir(recursos)
@@ -1,27 +1,191 @@
 # api/utils/auth_guard.py
-import jwt
+"""
+Guard JWT de las rutas protegidas.
+
+Los tokens ya verificados se cachean en el worker (clave: SHA-256 del token,
+hasta su `exp`), asi los requests que repiten el mismo token se saltean la
+firma y la validacion de claims. La cache es acotada (JWT_CACHE_MAX_TOKENS,
+se descarta el menos usado) y solo guarda tokens validos.
+
+Los refresh tokens (POST /refresh) tienen otra audiencia y no pasan por la
+cache; se verifican con `verificar_refresh_token`.
+
+`revocar_token` invalida un token antes de su vencimiento (logout): lo anota
+en un SQLite compartido por los workers, que cada worker relee como mucho
+cada JWT_REVOCADOS_POLL_SECONDS.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
+from pathlib import Path
+
+import jwt
+import structlog
 from flask import request, jsonify
 from config import settings
+from utils.metrics import registrar_cache
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+log = structlog.get_logger("auth")
+
+EMISOR = "granja-del-cerdo-api"
+AUDIENCIA_ACCESO = "granja-ui"
+# Los refresh tokens llevan otra audiencia: require_jwt no los acepta como acceso
+AUDIENCIA_REFRESH = "granja-ui-refresh"
+
+# digest -> (payload, exp)
+_verificados: "OrderedDict[bytes, tuple]" = OrderedDict()
+# digest -> exp de los tokens revocados que aun no vencieron
+_revocados: dict = {}
+_revocados_estado = {"ultimo_id": 0, "leido_en": float("-inf")}
+_lock = threading.Lock()
+
+
+def _digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def decodificar(token: str, audiencia: str = AUDIENCIA_ACCESO) -> dict:
+    """Verificacion completa (firma, exp, issuer, audience), sin cache."""
+    return jwt.decode(
+        token,
+        settings.JWT_SECRET,
+        algorithms=["HS256"],
+        issuer=EMISOR,
+        audience=audiencia,
+    )
+
+
+def verificar_token(token: str) -> dict:
+    """
+    Payload del token, desde la cache si ya se verifico y sigue vigente.
+    Lanza las excepciones de PyJWT si es invalido o esta revocado.
+    """
+    _sincronizar_revocados()
+    clave = _digest(token)
+    ahora = time.time()
+    with _lock:
+        if clave in _revocados:
+            raise jwt.InvalidTokenError("Token revoked")
+        cacheado = _verificados.get(clave)
+        if cacheado is not None and cacheado[1] > ahora:
+            _verificados.move_to_end(clave)
+            registrar_cache("jwt", True)
+            return dict(cacheado[0])
+        if cacheado is not None:
+            del _verificados[clave]
+    registrar_cache("jwt", False)
+
+    payload = decodificar(token)
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        with _lock:
+            if clave not in _revocados:
+                _verificados[clave] = (payload, exp)
+                while len(_verificados) > settings.JWT_CACHE_MAX_TOKENS:
+                    _verificados.popitem(last=False)
+    return dict(payload)
+
+
+def verificar_refresh_token(token: str) -> dict:
+    """Payload de un refresh token valido y no revocado (sin cache: se usa una vez por access token)."""
+    _sincronizar_revocados()
+    with _lock:
+        if _digest(token) in _revocados:
+            raise jwt.InvalidTokenError("Token revoked")
+    return decodificar(token, AUDIENCIA_REFRESH)
+
+
+# ---------------------------------------------------
+# Revocacion (compartida entre workers en SQLite)
+# ---------------------------------------------------
+def _revocados_path() -> Path:
+    path = Path(settings.JWT_REVOCADOS_PATH)
+    if not path.is_absolute():
+        path = API_DIR / path
+    return path
+
+
+def _conectar() -> sqlite3.Connection:
+    conn = sqlite3.connect(_revocados_path(), timeout=5.0, isolation_level=None)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS revocados ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, digest BLOB NOT NULL UNIQUE, exp REAL NOT NULL)"
+    )
+    return conn
+
+
+def _sincronizar_revocados(forzar: bool = False) -> None:
+    """Trae las revocaciones nuevas de otros workers (a lo sumo cada JWT_REVOCADOS_POLL_SECONDS)."""
+    ahora = time.monotonic()
+    with _lock:
+        if not forzar and ahora - _revocados_estado["leido_en"] < settings.JWT_REVOCADOS_POLL_SECONDS:
+            return
+        _revocados_estado["leido_en"] = ahora
+        desde = _revocados_estado["ultimo_id"]
+    try:
+        conn = _conectar()
+        try:
+            filas = conn.execute(
+                "SELECT id, digest, exp FROM revocados WHERE id > ? ORDER BY id", (desde,)
+            ).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        log.warning("jwt_revocados_error", error=str(e))
+        return
+
+    vencido = time.time()
+    with _lock:
+        for id_fila, digest, exp in filas:
+            _revocados[bytes(digest)] = exp
+            _verificados.pop(bytes(digest), None)
+            _revocados_estado["ultimo_id"] = max(_revocados_estado["ultimo_id"], id_fila)
+        for digest in [d for d, exp in _revocados.items() if exp <= vencido]:
+            del _revocados[digest]
+
+
+def revocar_token(token: str, exp: float | None = None) -> None:
+    """Invalida `token` en todos los workers hasta su `exp` (por defecto, el del token)."""
+    clave = _digest(token)
+    if exp is None:
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp", time.time() + 86400)
+    with _lock:
+        _revocados[clave] = exp
+        _verificados.pop(clave, None)
+
+    conn = _conectar()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT OR IGNORE INTO revocados (digest, exp) VALUES (?, ?)", (clave, exp))
+        # Los tokens vencidos ya no pasan la verificacion: no hace falta recordarlos
+        conn.execute("DELETE FROM revocados WHERE exp <= ?", (time.time(),))
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def token_del_request() -> str | None:
+    auth_header = request.headers.get("Authorization", "")
+    if not auth_header.startswith("Bearer "):
+        return None
+    return auth_header.split(" ", 1)[1]
+
 
 def require_jwt(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
-        auth_header = request.headers.get("Authorization", "")
-        if not auth_header.startswith("Bearer "):
+        token = token_del_request()
+        if token is None:
             return jsonify(error="missing_token"), 401
 
-        token = auth_header.split(" ", 1)[1]
         try:
-            # 🔹 VALIDACIÓN JWT
-            payload = jwt.decode(
-                token,
-                settings.JWT_SECRET,
-                algorithms=["HS256"],
-                issuer="granja-del-cerdo-api",
-                audience="granja-ui",  # <--- debe coincidir con auth.py
-            )
-            request.user = payload  # opcional: guarda el usuario decodificado
+            # 🔹 VALIDACIÓN JWT (cacheada por token)
+            request.user = verificar_token(token)  # opcional: guarda el usuario decodificado
         except jwt.ExpiredSignatureError:
             return jsonify(error="invalid_token", detail="Token expired"), 401
         except jwt.InvalidAudienceError:
@@ -0,0 +1,101 @@
+# api/utils/http_cache.py
+"""
+ETags y GET condicional para las lecturas.
+
+`@condicional(*recursos)` calcula un ETag fuerte con la ruta, los query
+params y las versiones de los recursos que lee el endpoint
+(services/versiones_service.py). Si el cliente manda un If-None-Match que
+coincide, responde 304 sin ejecutar la vista: ni consultas ni
+serializacion. Las versiones se suben en `after_request` para cada
+escritura exitosa, segun ESCRITURAS.
+
+Como respaldo ante escrituras que no pasan por la API ni llaman a
+`versiones_service.invalidar()`, la etiqueta tambien cambia cada
+ETAG_MAX_AGE_SECONDS.
+
+Las respuestas comprimidas llevan la etiqueta con sufijo (`"<etag>-gzip"`,
+ver utils/respuestas.py); If-None-Match acepta cualquiera de las variantes.
+"""
+import hashlib
+import time
+from functools import wraps
+
+import structlog
+from flask import Response, make_response, request
+
+from config import settings
+from services import versiones_service
+from utils.respuestas import CODIFICACIONES
+from utils.metrics import registrar_cache
+
+log = structlog.get_logger("http_cache")
+
+# Sufijos que agrega utils/respuestas.py segun la codificacion
+_SUFIJOS = ("",) + tuple(f"-{c}" for c in CODIFICACIONES)
+
+# Endpoint de escritura -> recursos cuya version cambia al responder 2xx
+ESCRITURAS = {
+    "lotes_v1.create_lote": ("lotes",),
+    "lotes_v1.import_lotes": ("lotes", "costos"),
+    "lotes_v1.update_lote": ("lotes",),
+    "lotes_v1.delete_lote": ("lotes", "costos", "produccion", "predicciones"),
+    "costos_v1.crear_costo": ("costos",),
+    "costos_v1.crear_costos_bulk": ("costos",),
+    "costos_v1.crear_costos_bulk_lote": ("costos",),
+    "costos_v1.actualizar_costo": ("costos",),
+    "costos_v1.eliminar_costo": ("costos",),
+    "tipos_costo_v1.crear_tipo_costo": ("tipos_costo",),
+    "tipos_costo_v1.actualizar_tipo_costo": ("tipos_costo",),
+    "tipos_costo_v1.actualizar_categoria_tipo_costo": ("tipos_costo",),
+    "tipos_costo_v1.eliminar_tipo_costo": ("tipos_costo",),
+    "produccion_v1.crear_produccion": ("produccion",),
+    "produccion_v1.update_produccion": ("produccion",),
+    "prediccion_v1.predict_lote": ("predicciones",),
+}
+
+
+def calcular_etag(recursos) -> str:
+    versiones = versiones_service.leer(recursos)
+    args = sorted(request.args.items(multi=True))
+    ventana = int(time.time() // settings.ETAG_MAX_AGE_SECONDS)
+    base = f"{request.path}|{args}|{sorted(versiones.items())}|{ventana}"
+    return hashlib.blake2b(base.encode(), digest_size=16).hexdigest()
+
+
+def condicional(*recursos: str):
+    """Decorador de GET: ETag por versiones de `recursos` y 304 si If-None-Match coincide."""
+    def decorador(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            try:
+                etag = calcular_etag(recursos)
+            except Exception as e:
+                # Sin versiones no hay ETag: se responde completo
+                log.warning("etag_error", error=str(e))
+                return f(*args, **kwargs)
+
+            cabeceras = {"ETag": f'"{etag}"', "Cache-Control": "private, no-cache"}
+            for sufijo in _SUFIJOS:
+                if request.if_none_match.contains_weak(etag + sufijo):
+                    registrar_cache("etag", True)
+                    # El 304 repite la variante que tiene el cliente
+                    return Response(status=304, headers={**cabeceras, "ETag": f'"{etag}{sufijo}"'})
+            registrar_cache("etag", False)
+
+            resp = make_response(f(*args, **kwargs))
+            if resp.status_code == 200:
+                resp.headers.update(cabeceras)
+            return resp
+        return wrapper
+    return decorador
+
+
+def registrar_escritura(resp):
+    """after_request: sube las versiones de lo que escribio el endpoint."""
+    recursos = ESCRITURAS.get(request.endpoint or "")
+    if recursos and 200 <= resp.status_code < 300:
+        try:
+            versiones_service.subir(recursos)
+        except Exception as e:
+            log.warning("versiones_error", endpoint=request.endpoint, error=str(e))
+    return resp
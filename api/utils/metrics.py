@@ -0,0 +1,172 @@
+# api/utils/metrics.py
+"""
+Metricas estilo Prometheus expuestas en GET /metrics.
+
+Con gunicorn (varios workers) cada proceso escribe sus metricas en
+PROMETHEUS_MULTIPROC_DIR y /metrics agrega las de todos los workers, sin
+importar que worker atienda el scrape (ver gunicorn.conf.py). Sin esa
+variable (servidor de desarrollo) se usa el registro del proceso.
+"""
+from __future__ import annotations
+
+import functools
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest,
+)
+from prometheus_client import multiprocess
+
+MULTIPROCESO = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+# Buckets pensados para la API: de 5 ms a 10 s
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_RAPIDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+REQUESTS = Counter(
+    "http_requests_total", "Requests atendidos", ["metodo", "ruta", "status"],
+)
+LATENCIA_REQUEST = Histogram(
+    "http_request_duration_seconds", "Latencia de los requests", ["metodo", "ruta"],
+    buckets=BUCKETS_LATENCIA,
+)
+TIEMPO_DB_REQUEST = Histogram(
+    "http_request_db_seconds", "Tiempo en consultas Prisma por request", ["metodo", "ruta"],
+    buckets=BUCKETS_LATENCIA,
+)
+CONSULTAS_REQUEST = Histogram(
+    "http_request_db_queries", "Consultas Prisma por request", ["metodo", "ruta"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 500),
+)
+INFERENCIA_MODELO = Histogram(
+    "modelo_inferencia_seconds", "Latencia de modelo.predict", ["modelo"],
+    buckets=BUCKETS_RAPIDOS,
+)
+FEATURES_PASO = Histogram(
+    "features_paso_seconds", "Latencia de construccion de features por paso", ["paso"],
+    buckets=BUCKETS_RAPIDOS,
+)
+CONEXION_DB = Histogram(
+    "db_connect_seconds", "Tiempo de conexion del cliente Prisma",
+    buckets=BUCKETS_LATENCIA,
+)
+COMPRESION_BYTES = Counter(
+    "http_compresion_bytes_total", "Bytes de las respuestas comprimidas, antes y despues",
+    ["codificacion", "etapa"],
+)
+CACHE = Counter(
+    "cache_consultas_total", "Consultas a caches en memoria", ["cache", "resultado"],
+)
+MEMORIA_WORKER = Gauge(
+    "worker_memoria_rss_bytes", "Memoria residente del worker", multiprocess_mode="all",
+)
+# PSS reparte las paginas compartidas (modelo precargado) entre los procesos que las usan
+MEMORIA_PSS_WORKER = Gauge(
+    "worker_memoria_pss_bytes", "Memoria proporcional (PSS) del worker", multiprocess_mode="all",
+)
+
+
+def medir_request(metodo: str, ruta: str, status: int, segundos: float) -> None:
+    REQUESTS.labels(metodo, ruta, str(status)).inc()
+    LATENCIA_REQUEST.labels(metodo, ruta).observe(segundos)
+
+
+def medir_db_request(metodo: str, ruta: str, consultas: int, segundos: float) -> None:
+    CONSULTAS_REQUEST.labels(metodo, ruta).observe(consultas)
+    TIEMPO_DB_REQUEST.labels(metodo, ruta).observe(segundos)
+
+
+def medir_compresion(codificacion: str, original: int, comprimido: int) -> None:
+    COMPRESION_BYTES.labels(codificacion, "original").inc(original)
+    COMPRESION_BYTES.labels(codificacion, "comprimido").inc(comprimido)
+
+
+def registrar_cache(cache: str, hit: bool) -> None:
+    CACHE.labels(cache, "hit" if hit else "miss").inc()
+
+
+@contextmanager
+def medir(histograma, *labels):
+    """Mide la duracion del bloque en el histograma indicado."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrica = histograma.labels(*labels) if labels else histograma
+        metrica.observe(time.perf_counter() - t0)
+
+
+def medir_paso(paso: str):
+    """Decorador para helpers async de features: observa FEATURES_PASO{paso}."""
+    def decorador(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with medir(FEATURES_PASO, paso):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorador
+
+
+def instrumentar_conexion(cliente) -> None:
+    """Envuelve `connect` de la clase del cliente Prisma para observar CONEXION_DB."""
+    clase = type(cliente)
+    if getattr(clase.connect, "_medido", False):
+        return
+    original = clase.connect
+
+    @functools.wraps(original)
+    async def connect(self, *args, **kwargs):
+        with medir(CONEXION_DB):
+            return await original(self, *args, **kwargs)
+
+    connect._medido = True
+    clase.connect = connect
+
+
+def _memoria_rss() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss: pico (KB en Linux), aproximacion donde no hay /proc
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _memoria_pss() -> int | None:
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for linea in f:
+                if linea.startswith("Pss:"):
+                    return int(linea.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+_INTERVALO_PSS = 10.0  # smaps_rollup recorre las tablas de paginas: no en cada request
+_pss_medido_en = 0.0
+
+
+def actualizar_memoria() -> None:
+    global _pss_medido_en
+    MEMORIA_WORKER.set(_memoria_rss())
+    ahora = time.monotonic()
+    if ahora - _pss_medido_en >= _INTERVALO_PSS:
+        _pss_medido_en = ahora
+        pss = _memoria_pss()
+        if pss is not None:
+            MEMORIA_PSS_WORKER.set(pss)
+
+
+def exportar() -> tuple[bytes, str]:
+    """Texto de exposicion de Prometheus y su Content-Type."""
+    actualizar_memoria()
+    if MULTIPROCESO:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,216 @@
+# api/utils/query_profiler.py
+"""
+Perfilado de consultas Prisma por request.
+
+`instrumentar_prisma()` envuelve `_execute` de la clase del cliente Prisma
+(el punto por el que pasan find_many, create, query_raw, etc., tambien
+dentro de `db.tx()`), y acumula en el perfil del request actual:
+cantidad de consultas, tiempo total en BD y la consulta mas lenta.
+
+El perfil vive en un ContextVar. `asyncio.run` copia el contexto del hilo
+del request, y como el valor es un objeto mutable, las consultas hechas
+dentro del event loop quedan registradas en el mismo perfil.
+
+Deteccion de N+1:
+- Por request: la misma consulta (modelo.metodo) repetida al menos
+  PROFILER_N1_THRESHOLD veces.
+- Por ruta: se guarda (tamano del resultado, consultas) de los ultimos
+  requests y se marca la ruta si las consultas crecen con el tamano. El
+  tamano es la lista mas larga que devolvio una consulta del request (p. ej.
+  los lotes de un find_many): se mide en `_execute`, donde ya esta el
+  resultado, sin volver a leer el JSON de la respuesta.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import structlog
+
+from config import settings
+
+log = structlog.get_logger("query_profiler")
+
+_perfil_actual: ContextVar[Optional["PerfilConsultas"]] = ContextVar("perfil_consultas", default=None)
+
+# Muestras por ruta para detectar consultas que escalan con el resultado
+MUESTRAS_POR_RUTA = 100
+MIN_MUESTRAS_TENDENCIA = 10
+PENDIENTE_SOSPECHOSA = 0.5  # consultas extra por elemento devuelto
+
+_muestras: Dict[str, Deque[Tuple[int, int]]] = {}
+_rutas_sospechosas: Dict[str, float] = {}
+_lock = threading.Lock()
+_instrumentado = False
+
+
+class PerfilConsultas:
+    """Estadisticas de consultas de un request."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.mas_lenta: Tuple[float, Optional[str]] = (0.0, None)
+        self.por_firma: Counter = Counter()
+        self.tamano_resultado: Optional[int] = None  # Lista mas larga devuelta por una consulta
+
+    def registrar(self, firma: str, segundos: float, resultado: Any = None) -> None:
+        self.consultas += 1
+        if isinstance(resultado, list) and len(resultado) > (self.tamano_resultado or 0):
+            self.tamano_resultado = len(resultado)
+        self.tiempo_db += segundos
+        self.por_firma[firma] += 1
+        if segundos > self.mas_lenta[0]:
+            self.mas_lenta = (segundos, firma)
+
+    def repetidas(self, umbral: int) -> Dict[str, int]:
+        return {firma: n for firma, n in self.por_firma.items() if n >= umbral}
+
+
+def _firma(kwargs: Dict[str, Any]) -> str:
+    modelo = kwargs.get("model")
+    metodo = kwargs.get("method", "?")
+    return f"{modelo.__name__}.{metodo}" if modelo is not None else str(metodo)
+
+
+def instrumentar_prisma(cliente) -> bool:
+    """
+    Envuelve `_execute` de la clase de `cliente`. Idempotente. Devuelve False
+    si la version de prisma-client-py no expone `_execute`.
+    """
+    global _instrumentado
+    if _instrumentado:
+        return True
+
+    clase = type(cliente)
+    original = getattr(clase, "_execute", None)
+    if original is None:
+        log.warning("query_profiler_no_disponible", motivo="Prisma._execute no existe")
+        return False
+
+    async def _execute_perfilado(self, *args, **kwargs):
+        perfil = _perfil_actual.get()
+        if perfil is None:
+            return await original(self, *args, **kwargs)
+        t0 = time.perf_counter()
+        resultado = None
+        try:
+            resultado = await original(self, *args, **kwargs)
+            return resultado
+        finally:
+            perfil.registrar(_firma(kwargs), time.perf_counter() - t0, resultado)
+
+    clase._execute = _execute_perfilado
+    _instrumentado = True
+    return True
+
+
+def iniciar_perfil():
+    """Activa un perfil nuevo para el request actual. Devuelve el token para `descartar_perfil`."""
+    return _perfil_actual.set(PerfilConsultas())
+
+
+def perfil_actual() -> Optional[PerfilConsultas]:
+    return _perfil_actual.get()
+
+
+def descartar_perfil(token) -> None:
+    _perfil_actual.reset(token)
+
+
+def _pendiente(muestras: List[Tuple[int, int]]) -> Optional[float]:
+    """Pendiente de minimos cuadrados de consultas vs tamano del resultado."""
+    n = len(muestras)
+    sx = sum(x for x, _ in muestras)
+    sy = sum(y for _, y in muestras)
+    sxx = sum(x * x for x, _ in muestras)
+    sxy = sum(x * y for x, y in muestras)
+    den = n * sxx - sx * sx
+    if den == 0:
+        return None  # todos los resultados del mismo tamano: no hay tendencia
+    return (n * sxy - sx * sy) / den
+
+
+def registrar_muestra_ruta(ruta: str, tamano: int, consultas: int) -> Optional[float]:
+    """
+    Agrega una muestra a la ruta y devuelve la pendiente si la ruta queda
+    marcada como sospechosa de N+1 (consultas que escalan con el resultado).
+    """
+    with _lock:
+        muestras = _muestras.setdefault(ruta, deque(maxlen=MUESTRAS_POR_RUTA))
+        muestras.append((tamano, consultas))
+        if len(muestras) < MIN_MUESTRAS_TENDENCIA:
+            return None
+        pendiente = _pendiente(list(muestras))
+        if pendiente is not None and pendiente >= PENDIENTE_SOSPECHOSA:
+            nueva = ruta not in _rutas_sospechosas
+            _rutas_sospechosas[ruta] = pendiente
+            if nueva:
+                log.warning("n_mas_1_ruta", ruta=ruta, consultas_por_elemento=round(pendiente, 2),
+                            muestras=len(muestras))
+            return pendiente
+        _rutas_sospechosas.pop(ruta, None)
+        return None
+
+
+def rutas_sospechosas() -> Dict[str, float]:
+    """Rutas marcadas como N+1 -> consultas extra por elemento devuelto."""
+    with _lock:
+        return dict(_rutas_sospechosas)
+
+
+def server_timing(perfil: PerfilConsultas) -> str:
+    """Valor del header Server-Timing (duraciones en ms)."""
+    total_ms = (time.perf_counter() - perfil.inicio) * 1000
+    partes = [
+        f'db;dur={perfil.tiempo_db * 1000:.1f};desc="{perfil.consultas} consultas"',
+        f"app;dur={total_ms:.1f}",
+    ]
+    lenta_s, lenta_firma = perfil.mas_lenta
+    if lenta_firma:
+        partes.append(f'db-max;dur={lenta_s * 1000:.1f};desc="{lenta_firma}"')
+    return ", ".join(partes)
+
+
+def cerrar_perfil(ruta: str, metodo: str, status: int) -> Dict[str, Any]:
+    """
+    Cierra el perfil del request: emite el log estructurado, alimenta la
+    deteccion de N+1 por ruta y devuelve los datos registrados.
+    """
+    perfil = _perfil_actual.get()
+    if perfil is None:
+        return {}
+
+    datos = {
+        "ruta": ruta,
+        "metodo": metodo,
+        "status": status,
+        "consultas": perfil.consultas,
+        "tiempo_db_ms": round(perfil.tiempo_db * 1000, 2),
+        "duracion_ms": round((time.perf_counter() - perfil.inicio) * 1000, 2),
+        "consulta_mas_lenta": perfil.mas_lenta[1],
+        "consulta_mas_lenta_ms": round(perfil.mas_lenta[0] * 1000, 2),
+    }
+
+    repetidas = perfil.repetidas(settings.PROFILER_N1_THRESHOLD)
+    if repetidas:
+        datos["consultas_repetidas"] = repetidas
+
+    tamano = perfil.tamano_resultado
+    if tamano is not None and status < 400:
+        datos["tamano_resultado"] = tamano
+        pendiente = registrar_muestra_ruta(ruta, tamano, perfil.consultas)
+        if pendiente is not None:
+            datos["n_mas_1_consultas_por_elemento"] = round(pendiente, 2)
+
+    if repetidas or "n_mas_1_consultas_por_elemento" in datos:
+        log.warning("request_db_perfil", **datos)
+    elif perfil.consultas and (
+        settings.PROFILER_LOG_ALL or perfil.mas_lenta[0] * 1000 >= settings.PROFILER_SLOW_QUERY_MS
+    ):
+        log.info("request_db_perfil", **datos)
+    return datos
@@ -0,0 +1,173 @@
+# api/utils/rate_limit.py
+"""
+Rate limiting compartido entre workers, con presupuesto ponderado por costo.
+
+El almacen se elige con RATE_LIMIT_STORAGE_URI (cualquier URI de la
+libreria `limits`):
+
+- `sqlite:///ratelimit.sqlite3` (default): contadores en un SQLite local,
+  compartido por los workers de gunicorn del mismo host. Es el sustituto
+  local de un almacen de red; la ruta relativa es relativa a api/.
+- `redis://host:6379` o `memcached://...` con varias instancias (requiere
+  el cliente correspondiente instalado).
+- `memory://`: por worker, como antes (solo para desarrollo).
+
+Limites:
+
+- RATE_LIMIT se aplica a cada ruta por separado (1 unidad por request).
+- Las rutas de COSTOS_RUTA ademas gastan su costo de un presupuesto comun
+  por cliente, RATE_LIMIT_COSTOSO: predecir o armar el dashboard consume
+  mucho mas que listar lotes, y agotar ese presupuesto no frena las rutas
+  baratas.
+"""
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+
+from flask import Flask
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from limits.storage import Storage
+
+from config import settings
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+# Unidades del presupuesto RATE_LIMIT_COSTOSO por request (endpoint de Flask -> costo)
+COSTOS_RUTA: Dict[str, int] = {
+    "prediccion_v1.predict_lote": 10,     # features + modelo + escritura de Prediccion
+    "lotes_v1.import_lotes": 20,          # validacion y escritura masiva
+    "auth_v1.login": 5,                   # bcrypt
+    "analytics_v1.dashboard_overview": 5,  # agregados sobre todos los lotes
+    "jobs_v1.crear_trabajo": 5,           # encola entrenamiento/datasets
+    "export_v1.exportar_dataset": 20,     # recorre tablas completas
+    "features_v1.get_lote_features": 3,
+    "analytics_v1.dashboard_ocupacion": 2,
+    "analytics_v1.costos_aggregates": 2,
+    "prediccion_v1.precision_predicciones": 2,
+}
+
+
+class AlmacenSQLite(Storage):
+    """
+    Contadores de ventana fija en SQLite (`sqlite:///ruta`), para la
+    estrategia por defecto de flask-limiter. Una conexion por proceso, en
+    modo WAL: cada incremento es una transaccion corta sin fsync.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    # Cada cuanto se borran los contadores vencidos
+    _PODA_SEGUNDOS = 60.0
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        # sqlite:///relativa (a api/) o sqlite:////absoluta, como en SQLAlchemy
+        ruta = uri.split("://", 1)[1]
+        path = Path(ruta[1:] if ruta.startswith("/") else ruta)
+        self.path = path if path.is_absolute() else API_DIR / path
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._podado_en = 0.0
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _conexion(self) -> sqlite3.Connection:
+        # Tras el fork de gunicorn cada worker abre la suya
+        if self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS contador ("
+                "clave TEXT PRIMARY KEY, valor INTEGER NOT NULL, expira REAL NOT NULL)"
+            )
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
+        ahora = time.time()
+        with self._lock:
+            conn = self._conexion()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Ventana vencida: el contador vuelve a empezar
+                conn.execute(
+                    "INSERT INTO contador (clave, valor, expira) VALUES (?, ?, ?) "
+                    "ON CONFLICT (clave) DO UPDATE SET "
+                    "valor = CASE WHEN expira <= ? THEN excluded.valor ELSE valor + excluded.valor END, "
+                    "expira = CASE WHEN expira <= ? OR ? THEN excluded.expira ELSE expira END",
+                    (key, amount, ahora + expiry, ahora, ahora, elastic_expiry),
+                )
+                valor = conn.execute("SELECT valor FROM contador WHERE clave = ?", (key,)).fetchone()[0]
+                if ahora - self._podado_en > self._PODA_SEGUNDOS:
+                    conn.execute("DELETE FROM contador WHERE expira <= ?", (ahora,))
+                    self._podado_en = ahora
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return valor
+
+    def _fila(self, key: str):
+        with self._lock:
+            fila = self._conexion().execute(
+                "SELECT valor, expira FROM contador WHERE clave = ?", (key,)
+            ).fetchone()
+        if fila is None or fila[1] <= time.time():
+            return None
+        return fila
+
+    def get(self, key: str) -> int:
+        fila = self._fila(key)
+        return fila[0] if fila else 0
+
+    def get_expiry(self, key: str) -> float:
+        fila = self._fila(key)
+        return fila[1] if fila else time.time()
+
+    def check(self) -> bool:
+        try:
+            with self._lock:
+                self._conexion().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        with self._lock:
+            return self._conexion().execute("DELETE FROM contador").rowcount
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._conexion().execute("DELETE FROM contador WHERE clave = ?", (key,))
+
+
+limiter = Limiter(
+    key_func=get_remote_address,
+    default_limits=[settings.RATE_LIMIT],
+    storage_uri=settings.RATE_LIMIT_STORAGE_URI,
+    # Si el almacen falla, se sigue con contadores en memoria en vez de responder 500
+    swallow_errors=True,
+    in_memory_fallback_enabled=True,
+)
+
+
+def aplicar_costos(app: Flask) -> None:
+    """
+    Agrega a las rutas de COSTOS_RUTA el presupuesto comun RATE_LIMIT_COSTOSO
+    (ademas de su limite por ruta). Llamar despues de registrar los blueprints.
+    """
+    for endpoint, costo in COSTOS_RUTA.items():
+        vista = app.view_functions.get(endpoint)
+        if vista is None:
+            continue
+        app.view_functions[endpoint] = limiter.shared_limit(
+            settings.RATE_LIMIT_COSTOSO, scope="costoso", cost=costo, override_defaults=False,
+        )(vista)
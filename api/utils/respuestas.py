@@ -0,0 +1,118 @@
+# api/utils/respuestas.py
+"""
+Serializacion JSON y compresion de las respuestas.
+
+- `ProveedorJSON` reemplaza al proveedor JSON de Flask (jsonify,
+  request.get_json) por orjson, si esta instalado. orjson serializa en C y
+  maneja datetime/date, enums, UUID y dataclasses sin pasar por `default`.
+  Las fechas salen en ISO 8601 (`2024-03-01T00:00:00+00:00`) en lugar del
+  formato HTTP que usa Flask (`Fri, 01 Mar 2024 00:00:00 GMT`), NaN sale
+  como null y las claves no se ordenan. Sin orjson queda el de Flask.
+- `comprimir` (after_request) comprime con brotli, si esta instalado, o
+  gzip, segun el Accept-Encoding del cliente, las respuestas 200 de JSON o
+  texto de al menos COMPRESION_MIN_BYTES. Con cuerpos mas chicos no se
+  ahorra casi nada y se paga la CPU.
+
+benchmarks/respuestas_api.py mide bytes y tiempo de serializacion de cada
+opcion con un payload como el del dashboard.
+"""
+import gzip
+
+from flask import Flask, request
+from flask.json.provider import DefaultJSONProvider
+
+from config import settings
+from utils.metrics import medir_compresion
+
+try:
+    import orjson
+except ImportError:  # Dependencia opcional: se usa el JSON de Flask
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Dependencia opcional: solo gzip
+    brotli = None
+
+# Preferencia del servidor si el cliente acepta ambas con la misma calidad
+CODIFICACIONES = ("br", "gzip") if brotli is not None else ("gzip",)
+
+MIMETYPES_COMPRIMIBLES = {"application/json", "application/javascript", "image/svg+xml"}
+
+
+class ProveedorJSON(DefaultJSONProvider):
+    """Proveedor JSON de Flask respaldado por orjson."""
+
+    _OPCIONES = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY if orjson is not None else 0
+
+    def _opciones(self) -> int:
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return self._OPCIONES | orjson.OPT_INDENT_2
+        return self._OPCIONES
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            # Argumentos propios de json.dumps (indent, sort_keys, ...): se respetan
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._opciones()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Bytes directo al Response, sin pasar por str
+        obj = self._prepare_response_obj(args, kwargs)
+        cuerpo = orjson.dumps(obj, default=self.default, option=self._opciones() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(cuerpo, mimetype=self.mimetype)
+
+
+def _comprimible(resp) -> bool:
+    mimetype = resp.mimetype or ""
+    return mimetype in MIMETYPES_COMPRIMIBLES or mimetype.startswith("text/")
+
+
+def comprimir_cuerpo(cuerpo: bytes, codificacion: str) -> bytes:
+    if codificacion == "br":
+        return brotli.compress(cuerpo, quality=settings.COMPRESION_BROTLI_CALIDAD)
+    # mtime=0: mismo cuerpo -> mismos bytes
+    return gzip.compress(cuerpo, compresslevel=settings.COMPRESION_GZIP_NIVEL, mtime=0)
+
+
+def comprimir(resp):
+    """after_request: Content-Encoding br/gzip negociado con Accept-Encoding."""
+    if resp.status_code != 200 or resp.direct_passthrough or resp.is_streamed \
+            or "Content-Encoding" in resp.headers or not _comprimible(resp):
+        return resp
+
+    # La respuesta depende del header aunque esta vez no se comprima
+    resp.vary.add("Accept-Encoding")
+    cuerpo = resp.get_data()
+    if len(cuerpo) < settings.COMPRESION_MIN_BYTES:
+        return resp
+    codificacion = request.accept_encodings.best_match(CODIFICACIONES)
+    if codificacion is None:
+        return resp
+
+    comprimido = comprimir_cuerpo(cuerpo, codificacion)
+    resp.set_data(comprimido)
+    resp.headers["Content-Encoding"] = codificacion
+    # Cada codificacion es otra representacion: otro ETag (http_cache acepta los sufijos)
+    etag, debil = resp.get_etag()
+    if etag:
+        resp.set_etag(f"{etag}-{codificacion}", weak=debil)
+    medir_compresion(codificacion, len(cuerpo), len(comprimido))
+    return resp
+
+
+def instalar(app: Flask) -> None:
+    """
+    Configura JSON y compresion en la app. Llamar antes de registrar otros
+    after_request: Flask los corre en orden inverso y asi la compresion
+    queda ultima, cuando los demas ya leyeron el cuerpo sin comprimir.
+    """
+    if orjson is not None:
+        app.json = ProveedorJSON(app)
+    if settings.COMPRESION_ENABLED:
+        app.after_request(comprimir)
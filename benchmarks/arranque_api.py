@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Perfil de arranque de la API.
+
+Importa `app` (lo que hace cada worker de gunicorn al arrancar) en un
+proceso nuevo con `python -X importtime`, `--repeticiones` veces, y reporta
+el tiempo total de import, los modulos mas lentos (tiempo acumulado, con sus
+dependencias) y el tiempo propio agregado por paquete. Con `--con-modelo`
+mide ademas `modelo_service.precargar()`, lo que corre el master de gunicorn
+en modo preload.
+
+Tambien lista las librerias pesadas (pandas, xgboost, sklearn, ...) que
+quedaron cargadas solo por importar la app: deberian cargarse al primer uso
+o en la precarga del modelo. Con `--estricto` eso termina con codigo 1.
+
+Uso:
+    python benchmarks/arranque_api.py
+    python benchmarks/arranque_api.py --repeticiones 10 --top 30 --con-modelo
+    python benchmarks/arranque_api.py --comparar benchmarks/resultados/arranque_antes.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from carga_api import API_DIR, RESULTADOS_DIR, entorno
+
+# Librerias que no deben cargarse al importar la app
+PESADAS = ("pandas", "xgboost", "sklearn", "scipy", "matplotlib", "plotly")
+
+_PREFIJO = "import time:"
+
+
+# ---------------------------------------------------------------------------
+# Medicion
+# ---------------------------------------------------------------------------
+
+def parsear_importtime(salida: str) -> list:
+    """Lineas de -X importtime -> [{"modulo", "propio_us", "acumulado_us"}]."""
+    modulos = []
+    for linea in salida.splitlines():
+        if not linea.startswith(_PREFIJO):
+            continue
+        partes = linea[len(_PREFIJO):].split("|")
+        if len(partes) != 3 or not partes[0].strip().isdigit():
+            continue  # Encabezado "self [us] | cumulative | imported package"
+        modulos.append({
+            "modulo": partes[2].strip(),
+            "propio_us": int(partes[0]),
+            "acumulado_us": int(partes[1]),
+        })
+    return modulos
+
+
+def medir_una(codigo: str) -> tuple:
+    """Corre `codigo` en api/ con -X importtime. Devuelve (segundos de pared, modulos)."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=API_DIR, env=env, capture_output=True, text=True,
+    )
+    segundos = time.perf_counter() - t0
+    if proc.returncode != 0:
+        ultimas = "\n".join(proc.stderr.strip().splitlines()[-5:])
+        raise RuntimeError(f"Falló `{codigo}`:\n{ultimas}")
+    return segundos, parsear_importtime(proc.stderr)
+
+
+def medir(codigo: str, repeticiones: int) -> dict:
+    """Medianas de `repeticiones` arranques (el primero calienta la cache de disco y no cuenta)."""
+    medir_una(codigo)
+    paredes, acumulados, propios = [], defaultdict(list), defaultdict(list)
+    cargados = set()
+    for _ in range(repeticiones):
+        segundos, modulos = medir_una(codigo)
+        paredes.append(segundos)
+        for m in modulos:
+            cargados.add(m["modulo"])
+            acumulados[m["modulo"]].append(m["acumulado_us"])
+            propios[m["modulo"]].append(m["propio_us"])
+
+    por_paquete = defaultdict(float)
+    for nombre, valores in propios.items():
+        por_paquete[nombre.split(".")[0]] += statistics.median(valores)
+
+    return {
+        "codigo": codigo,
+        "pared_ms": round(statistics.median(paredes) * 1000, 1),
+        "imports_ms": round(sum(por_paquete.values()) / 1000, 1),
+        "modulos": {n: round(statistics.median(v) / 1000, 2) for n, v in acumulados.items()},
+        "paquetes": {n: round(v / 1000, 2) for n, v in por_paquete.items()},
+        "pesadas": sorted(p for p in PESADAS if p in cargados),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Reporte
+# ---------------------------------------------------------------------------
+
+def _delta(actual, anterior) -> str:
+    if actual is None or not anterior:
+        return "n/a"
+    return f"{(actual - anterior) / anterior * 100:+.1f}%"
+
+
+def _tabla(titulo: str, valores: dict, top: int, base: dict | None) -> None:
+    print(f"\n{titulo}")
+    print("-" * 72)
+    for nombre, ms in sorted(valores.items(), key=lambda kv: kv[1], reverse=True)[:top]:
+        linea = f"{nombre:<48}{ms:>10.1f} ms"
+        if base is not None:
+            linea += f"   {_delta(ms, base.get(nombre)):>8}"
+        print(linea)
+
+
+def imprimir(nombre: str, r: dict, top: int, base: dict | None = None) -> None:
+    print("\n" + "=" * 72)
+    linea = f"{nombre}: {r['pared_ms']:.0f} ms de pared, {r['imports_ms']:.0f} ms en imports"
+    if base:
+        linea += f"  (Δ {_delta(r['pared_ms'], base['pared_ms'])} / {_delta(r['imports_ms'], base['imports_ms'])})"
+    print(linea)
+    print("=" * 72)
+    _tabla("Módulos (tiempo acumulado, con dependencias)", r["modulos"], top, base and base["modulos"])
+    _tabla("Paquetes (tiempo propio sumado)", r["paquetes"], top, base and base["paquetes"])
+    if r["pesadas"]:
+        print(f"\n⚠️  Librerías pesadas cargadas al importar: {', '.join(r['pesadas'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de arranque de la API (import time por módulo)")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Arranques medidos (se toma la mediana)")
+    parser.add_argument("--top", type=int, default=20, help="Filas por tabla")
+    parser.add_argument("--con-modelo", action="store_true",
+                        help="Medir también la precarga del modelo (master de gunicorn con preload)")
+    parser.add_argument("--estricto", action="store_true",
+                        help="Terminar con código 1 si `import app` carga librerías pesadas")
+    parser.add_argument("--salida", type=Path, help="Archivo JSON de salida (default benchmarks/resultados/<fecha>.json)")
+    parser.add_argument("--comparar", type=Path, help="JSON de una corrida anterior para mostrar diferencias")
+    args = parser.parse_args()
+
+    base = json.loads(args.comparar.read_text(encoding="utf-8")) if args.comparar else {}
+
+    corridas = {"app": medir("import app", args.repeticiones)}
+    if args.con_modelo:
+        corridas["app+modelo"] = medir(
+            "import app; from services import modelo_service; modelo_service.precargar()",
+            args.repeticiones,
+        )
+
+    for nombre, r in corridas.items():
+        imprimir(nombre, r, args.top, base.get("corridas", {}).get(nombre))
+
+    resultado = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "entorno": entorno(),
+        "repeticiones": args.repeticiones,
+        "corridas": corridas,
+    }
+    salida = args.salida or RESULTADOS_DIR / f"arranque_{datetime.now():%Y%m%d_%H%M%S}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\n💾 Resultado guardado en {salida}")
+
+    if args.estricto and corridas["app"]["pesadas"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
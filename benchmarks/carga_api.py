@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga de la API.
+
+Lanza `--concurrencia` clientes async que, durante `--duracion` segundos,
+eligen endpoints al azar según una mezcla ponderada (login, lotes, costos,
+features, predict, dashboard). Reporta throughput, latencias p50/p95/p99 y
+tasa de error por endpoint, y guarda el resultado en JSON para comparar
+corridas (`--comparar`).
+
+Pensado para correr contra una API local con una BD Postgres local poblada
+(ver benchmarks/README.md). El endpoint predict crea registros Prediccion:
+con --iniciar-api la BD se indica explicitamente (--database-url o la
+variable DATABASE_URL) y tiene que ser local; nunca se toma el DATABASE_URL
+por defecto de api/.env o config.py, que apunta a la BD de produccion.
+
+Uso:
+    python benchmarks/carga_api.py --iniciar-api --database-url postgresql://postgres@localhost:5432/granja \
+        --workers 4 --concurrencia 20 --duracion 60
+    python benchmarks/carga_api.py --base-url http://127.0.0.1:8000 --mezcla lotes=3,predict=1
+    python benchmarks/carga_api.py --comparar benchmarks/resultados/base.json
+    python benchmarks/carga_api.py --iniciar-api --mezcla login=1 --rafaga-login 50
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+API_DIR = ROOT_DIR / "api"
+RESULTADOS_DIR = Path(__file__).resolve().parent / "resultados"
+
+MEZCLA_DEFAULT = "login=1,lotes=4,costos=3,features=2,predict=2,dashboard=1"
+HOSTS_LOCALES = {"localhost", "127.0.0.1", "::1"}
+
+# Usuario de prueba de los scripts de api/ml/tests
+EMAIL_DEFAULT = os.environ.get("BENCH_EMAIL", "dayanadelgadillo@granja.com")
+PASSWORD_DEFAULT = os.environ.get("BENCH_PASSWORD", "granjacerdo")
+
+
+# ---------------------------------------------------------------------------
+# Endpoints: cada uno devuelve (metodo, path, kwargs de httpx)
+# ---------------------------------------------------------------------------
+
+def _login(ctx, rng):
+    return "POST", "/api/v1/login", {"json": ctx["credenciales"]}
+
+def _lotes(ctx, rng):
+    return "GET", "/api/v1/lotes", {"params": {"limit": 50}}
+
+def _costos(ctx, rng):
+    return "GET", f"/api/v1/lotes/{rng.choice(ctx['ids_lote'])}/costos", {}
+
+def _features(ctx, rng):
+    return "GET", f"/api/v1/lotes/{rng.choice(ctx['ids_lote'])}/features", {}
+
+def _predict(ctx, rng):
+    return "POST", "/api/v1/lotes/predict", {"json": {"id_lote": rng.choice(ctx["ids_lote"])}}
+
+def _dashboard(ctx, rng):
+    return "GET", "/api/v1/dashboard/overview", {}
+
+ENDPOINTS = {
+    "login": _login,
+    "lotes": _lotes,
+    "costos": _costos,
+    "features": _features,
+    "predict": _predict,
+    "dashboard": _dashboard,
+}
+
+
+def parse_mezcla(texto: str) -> dict:
+    """'lotes=3,predict=1' -> {'lotes': 3.0, 'predict': 1.0}"""
+    mezcla = {}
+    for parte in texto.split(","):
+        nombre, _, peso = parte.strip().partition("=")
+        if nombre not in ENDPOINTS:
+            raise ValueError(f"Endpoint desconocido '{nombre}'. Opciones: {', '.join(ENDPOINTS)}")
+        mezcla[nombre] = float(peso or 1)
+    if not any(mezcla.values()):
+        raise ValueError("La mezcla debe tener al menos un peso mayor a 0")
+    return mezcla
+
+
+# ---------------------------------------------------------------------------
+# Estadísticas
+# ---------------------------------------------------------------------------
+
+def percentil(valores_ordenados: list, p: float) -> float | None:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not valores_ordenados:
+        return None
+    k = max(0, math.ceil(p / 100 * len(valores_ordenados)) - 1)
+    return valores_ordenados[k]
+
+
+def resumir(muestras: list, segundos: float) -> dict:
+    latencias = sorted(m["ms"] for m in muestras)
+    errores = sum(1 for m in muestras if not m["ok"])
+    status = {}
+    for m in muestras:
+        status[str(m["status"])] = status.get(str(m["status"]), 0) + 1
+    n = len(muestras)
+
+    def r(x):
+        return round(x, 2) if x is not None else None
+
+    return {
+        "requests": n,
+        "errores": errores,
+        "tasa_error": round(errores / n, 4) if n else None,
+        "rps": round(n / segundos, 2) if segundos else None,
+        "p50_ms": r(percentil(latencias, 50)),
+        "p95_ms": r(percentil(latencias, 95)),
+        "p99_ms": r(percentil(latencias, 99)),
+        "media_ms": r(sum(latencias) / n) if n else None,
+        "max_ms": r(latencias[-1]) if latencias else None,
+        "status": status,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Ejecución
+# ---------------------------------------------------------------------------
+
+async def preparar(cliente: httpx.AsyncClient, credenciales: dict) -> dict:
+    """Login inicial y lista de lotes existentes para elegir IDs al azar."""
+    resp = await cliente.post("/api/v1/login", json=credenciales)
+    if resp.status_code != 200:
+        raise RuntimeError(f"Login falló ({resp.status_code}): {resp.text[:200]}")
+    token = resp.json()["access_token"]
+    cliente.headers["Authorization"] = f"Bearer {token}"
+
+    resp = await cliente.get("/api/v1/lotes", params={"limit": 500})
+    resp.raise_for_status()
+    ids_lote = [l["id_lote"] for l in resp.json()]
+    if not ids_lote:
+        raise RuntimeError("No hay lotes en la BD. Poblarla con api/generar_datos_completos.py")
+    return {"credenciales": credenciales, "ids_lote": ids_lote}
+
+
+async def cliente_virtual(cliente, ctx, mezcla, hasta, registrar, rng):
+    nombres = list(mezcla)
+    pesos = [mezcla[n] for n in nombres]
+    while time.perf_counter() < hasta:
+        nombre = rng.choices(nombres, weights=pesos)[0]
+        metodo, path, kwargs = ENDPOINTS[nombre](ctx, rng)
+        t0 = time.perf_counter()
+        try:
+            resp = await cliente.request(metodo, path, **kwargs)
+            status, ok = resp.status_code, resp.status_code < 400
+        except httpx.HTTPError as e:
+            status, ok = type(e).__name__, False
+        registrar(nombre, (time.perf_counter() - t0) * 1000, status, ok)
+
+
+async def correr(args) -> dict:
+    mezcla = parse_mezcla(args.mezcla)
+    credenciales = {"email": args.email, "password": args.password}
+    limites = httpx.Limits(max_connections=args.concurrencia, max_keepalive_connections=args.concurrencia)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limites) as cliente:
+        ctx = await preparar(cliente, credenciales)
+        print(f"🐷 {len(ctx['ids_lote'])} lotes disponibles · mezcla: {mezcla}")
+
+        muestras = {nombre: [] for nombre in mezcla}
+        registrar_real = lambda n, ms, st, ok: muestras[n].append({"ms": ms, "status": st, "ok": ok})
+        descartar = lambda *a: None
+
+        if args.calentamiento > 0:
+            print(f"🔥 Calentamiento {args.calentamiento:.0f}s...")
+            hasta = time.perf_counter() + args.calentamiento
+            await asyncio.gather(*[
+                cliente_virtual(cliente, ctx, mezcla, hasta, descartar, random.Random(args.semilla + i))
+                for i in range(args.concurrencia)
+            ])
+
+        print(f"🚀 {args.concurrencia} clientes durante {args.duracion:.0f}s...")
+        inicio = time.perf_counter()
+        hasta = inicio + args.duracion
+        await asyncio.gather(*[
+            cliente_virtual(cliente, ctx, mezcla, hasta, registrar_real, random.Random(args.semilla + 1000 + i))
+            for i in range(args.concurrencia)
+        ])
+        segundos = time.perf_counter() - inicio
+
+        rafaga = await rafaga_login(cliente, credenciales, args.rafaga_login) if args.rafaga_login else None
+
+    todas = [m for lista in muestras.values() for m in lista]
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "base_url": args.base_url,
+            "concurrencia": args.concurrencia,
+            "duracion_s": args.duracion,
+            "calentamiento_s": args.calentamiento,
+            "mezcla": mezcla,
+            "workers_api": args.workers if args.iniciar_api else None,
+            "rafaga_login": args.rafaga_login,
+            "semilla": args.semilla,
+        },
+        "entorno": entorno(),
+        "segundos": round(segundos, 2),
+        "global": resumir(todas, segundos),
+        "endpoints": {nombre: resumir(lista, segundos) for nombre, lista in muestras.items()},
+        "rafaga_login": rafaga,
+    }
+
+
+async def rafaga_login(cliente: httpx.AsyncClient, credenciales: dict, n: int) -> dict:
+    """`n` logins a la vez, como al cambio de turno: logins/s y latencias de la ráfaga."""
+    print(f"🔑 Ráfaga de {n} logins simultáneos...")
+    limites = httpx.Limits(max_connections=n, max_keepalive_connections=n)
+    muestras = []
+
+    async def uno(c):
+        t0 = time.perf_counter()
+        try:
+            resp = await c.post("/api/v1/login", json=credenciales)
+            status, ok = resp.status_code, resp.status_code == 200
+        except httpx.HTTPError as e:
+            status, ok = type(e).__name__, False
+        muestras.append({"ms": (time.perf_counter() - t0) * 1000, "status": status, "ok": ok})
+
+    async with httpx.AsyncClient(base_url=str(cliente.base_url), timeout=cliente.timeout, limits=limites) as c:
+        inicio = time.perf_counter()
+        await asyncio.gather(*[uno(c) for _ in range(n)])
+        segundos = time.perf_counter() - inicio
+    return {"n": n, "segundos": round(segundos, 3), **resumir(muestras, segundos)}
+
+
+def entorno() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+# ---------------------------------------------------------------------------
+# API local
+# ---------------------------------------------------------------------------
+
+def es_bd_local(database_url: str) -> bool:
+    """True si la URL de Postgres apunta a esta maquina (host local o socket unix)."""
+    partes = urlsplit(database_url)
+    hosts = [partes.hostname] if partes.hostname else parse_qs(partes.query).get("host", [])
+    if not hosts:
+        return True  # Sin host: libpq usa el socket unix local
+    return all(h in HOSTS_LOCALES or h.startswith("/") for h in hosts)
+
+
+def iniciar_api(args) -> subprocess.Popen:
+    """
+    Inicia gunicorn en api/ sin rate limit efectivo, sobre la BD local de
+    `args.database_url`, y espera a /health.
+    """
+    puerto = httpx.URL(args.base_url).port or 8000
+    # DATABASE_URL explicito en el entorno: tiene prioridad sobre api/.env
+    env = dict(os.environ, DATABASE_URL=args.database_url,
+               RATE_LIMIT="1000000 per minute", RATE_LIMIT_COSTOSO="10000000 per minute")
+    if args.sin_preload:
+        env["GUNICORN_PRELOAD"] = "0"
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(args.workers), "-b", f"127.0.0.1:{puerto}", "app:app"],
+        cwd=API_DIR, env=env,
+    )
+    limite = time.time() + args.espera_api
+    while time.time() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"gunicorn terminó con código {proceso.returncode}")
+        try:
+            if httpx.get(f"{args.base_url}/health", timeout=1).status_code == 200:
+                modo = "sin preload" if args.sin_preload else "preload"
+                bd = urlsplit(args.database_url)
+                print(f"✅ API lista en {args.base_url} ({args.workers} workers, {modo}, "
+                      f"BD {bd.hostname or 'socket local'}{bd.path})")
+                return proceso
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    proceso.terminate()
+    raise RuntimeError(f"La API no respondió /health en {args.espera_api}s")
+
+
+# ---------------------------------------------------------------------------
+# Reporte
+# ---------------------------------------------------------------------------
+
+def imprimir(resultado: dict, base: dict | None = None) -> None:
+    print("\n" + "=" * 96)
+    print(f"{'endpoint':<12}{'req':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'error %':>9}   {'Δ p95 / Δ rps vs base' if base else ''}")
+    print("-" * 96)
+    filas = list(resultado["endpoints"].items()) + [("TOTAL", resultado["global"])]
+    for nombre, r in filas:
+        linea = (f"{nombre:<12}{r['requests']:>8}{r['rps'] or 0:>9.1f}{r['p50_ms'] or 0:>10.1f}"
+                 f"{r['p95_ms'] or 0:>10.1f}{r['p99_ms'] or 0:>10.1f}{(r['tasa_error'] or 0) * 100:>9.2f}")
+        if base:
+            b = base["global"] if nombre == "TOTAL" else base["endpoints"].get(nombre)
+            if b:
+                linea += f"   {_delta(r['p95_ms'], b['p95_ms']):>8} / {_delta(r['rps'], b['rps']):>8}"
+        print(linea)
+    print("=" * 96)
+
+    rafaga = resultado.get("rafaga_login")
+    if rafaga:
+        linea = (f"Ráfaga login: {rafaga['n']} en {rafaga['segundos']:.2f}s · {rafaga['rps'] or 0:.1f} logins/s · "
+                 f"p95 {rafaga['p95_ms'] or 0:.0f} ms · status {rafaga['status']}")
+        b = (base or {}).get("rafaga_login")
+        if b:
+            linea += f"   (Δ logins/s {_delta(rafaga['rps'], b['rps'])})"
+        print(linea)
+
+
+def _delta(actual, anterior) -> str:
+    if not actual or not anterior:
+        return "n/a"
+    return f"{(actual - anterior) / anterior * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga de la API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", default=EMAIL_DEFAULT)
+    parser.add_argument("--password", default=PASSWORD_DEFAULT)
+    parser.add_argument("--concurrencia", type=int, default=10, help="Clientes simultáneos")
+    parser.add_argument("--duracion", type=float, default=30, help="Segundos de medición")
+    parser.add_argument("--calentamiento", type=float, default=5, help="Segundos sin medir al inicio")
+    parser.add_argument("--mezcla", default=MEZCLA_DEFAULT, help=f"Pesos por endpoint (default {MEZCLA_DEFAULT})")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", type=Path, help="Archivo JSON de salida (default benchmarks/resultados/<fecha>.json)")
+    parser.add_argument("--comparar", type=Path, help="JSON de una corrida anterior para mostrar diferencias")
+    parser.add_argument("--rafaga-login", type=int, default=0,
+                        help="Al final, N logins simultáneos para medir logins/s (0 = no)")
+    parser.add_argument("--iniciar-api", action="store_true", help="Iniciar gunicorn localmente para la corrida")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"),
+                        help="Con --iniciar-api, Postgres local de la corrida (default: variable DATABASE_URL)")
+    parser.add_argument("--workers", type=int, default=4, help="Workers de gunicorn con --iniciar-api")
+    parser.add_argument("--sin-preload", action="store_true",
+                        help="Con --iniciar-api, cada worker carga el modelo por su cuenta (GUNICORN_PRELOAD=0)")
+    parser.add_argument("--espera-api", type=float, default=60, help="Segundos máximos esperando /health")
+    args = parser.parse_args()
+
+    # predict escribe en la BD: nunca contra el DATABASE_URL por defecto (produccion)
+    if args.iniciar_api:
+        if not args.database_url:
+            parser.error("--iniciar-api requiere --database-url (o DATABASE_URL) con la BD local del benchmark")
+        if not es_bd_local(args.database_url):
+            parser.error(f"--database-url debe apuntar a localhost, no a {urlsplit(args.database_url).hostname}")
+
+    base = json.loads(args.comparar.read_text(encoding="utf-8")) if args.comparar else None
+
+    proceso = iniciar_api(args) if args.iniciar_api else None
+    try:
+        resultado = asyncio.run(correr(args))
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait(timeout=30)
+
+    imprimir(resultado, base)
+
+    salida = args.salida or RESULTADOS_DIR / f"carga_{datetime.now():%Y%m%d_%H%M%S}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"💾 Resultado guardado en {salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Sustituto en memoria del cliente Prisma para los micro-benchmarks.
+
+Implementa solo lo que usa services/features_service.py (find_unique,
+find_first, find_many, count con filtros equals/gte/gt/lte/lt/in, y el
+indice de ocupacion en lugar de su consulta agregada), de modo
+que el benchmark mida el cálculo de features y no la red ni Postgres.
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+from ml.data.generate_data import DISTANCIAS_KM, FERIADOS_2026
+
+OPERADORES = {
+    "equals": lambda a, b: a == b,
+    "gte": lambda a, b: a is not None and a >= b,
+    "gt": lambda a, b: a is not None and a > b,
+    "lte": lambda a, b: a is not None and a <= b,
+    "lt": lambda a, b: a is not None and a < b,
+    "in": lambda a, b: a in b,
+    "not": lambda a, b: a != b,
+}
+
+
+def _coincide(fila, where) -> bool:
+    for campo, condicion in (where or {}).items():
+        valor = getattr(fila, campo, None)
+        if isinstance(condicion, dict):
+            if not all(OPERADORES[op](valor, esperado) for op, esperado in condicion.items()):
+                return False
+        elif valor != condicion:
+            return False
+    return True
+
+
+class _Tabla:
+    def __init__(self, filas):
+        self.filas = filas
+
+    async def find_many(self, where=None, order=None, take=None, skip=None, include=None, select=None):
+        filas = [f for f in self.filas if _coincide(f, where)]
+        for criterio in reversed(order if isinstance(order, list) else [order] if order else []):
+            (campo, sentido), = criterio.items()
+            filas.sort(key=lambda f: getattr(f, campo), reverse=sentido == "desc")
+        filas = filas[skip or 0:]
+        return filas[:take] if take is not None else filas
+
+    async def find_first(self, where=None, order=None, include=None):
+        filas = await self.find_many(where=where, order=order, take=1)
+        return filas[0] if filas else None
+
+    async def find_unique(self, where, include=None):
+        return await self.find_first(where=where)
+
+    async def count(self, where=None):
+        return sum(1 for f in self.filas if _coincide(f, where))
+
+
+class BDEnMemoria:
+    """Lotes, feriados y gastos mensuales sintéticos de 2026."""
+
+    def __init__(self, n_lotes: int = 2000, seed: int = 42):
+        rng = np.random.default_rng(seed)
+        inicio = datetime(2026, 1, 1)
+        ubicaciones = list(DISTANCIAS_KM)
+
+        self.lote = _Tabla([
+            SimpleNamespace(
+                id_lote=i + 1,
+                fecha_adquisicion=inicio + timedelta(days=int(rng.integers(0, 365))),
+                cantidad_animales=int(rng.integers(10, 121)),
+                peso_promedio_entrada=float(rng.uniform(80, 115)),
+                duracion_estadia_dias=int(rng.integers(1, 4)),
+                precio_compra_kg=float(rng.uniform(18, 25)),
+                costo_flete=None,
+                costo_combustible=None,
+                costo_peajes_lavado=None,
+                merma_peso_transporte=None,
+                ubicacion_origen=str(rng.choice(ubicaciones)),
+                id_usuario_creador=1,
+            )
+            for i in range(n_lotes)
+        ])
+
+        self.feriado = _Tabla([
+            SimpleNamespace(id_feriado=i + 1, nombre_feriado="Feriado", fecha=fecha, descripcion=None)
+            for i, fecha in enumerate(FERIADOS_2026)
+        ])
+
+        servicios = SimpleNamespace(id_tipo_costo=1, nombre_tipo="Servicios Basicos", categoria="FIJO")
+        mano_obra = SimpleNamespace(id_tipo_costo=2, nombre_tipo="Mano de Obra", categoria="FIJO")
+        self.gastomensual = _Tabla([
+            SimpleNamespace(mes=mes, anio=2026, monto=monto, tipo_costo=tipo, id_tipo_costo=tipo.id_tipo_costo)
+            for mes in range(1, 13)
+            for tipo, monto in ((servicios, 850.0), (mano_obra, 11000.0))
+        ])
+
+    def indice_ocupacion(self):
+        """Lo que devuelve la consulta agregada de ocupacion_service, sin SQL."""
+        from services.ocupacion_service import IndiceOcupacion
+        lotes = self.lote.filas
+        return IndiceOcupacion(
+            np.array([l.fecha_adquisicion for l in lotes], dtype="datetime64[D]"),
+            [l.cantidad_animales for l in lotes],
+        )
+
+    @property
+    def ids_lote(self):
+        return [l.id_lote for l in self.lote.filas]
@@ -0,0 +1,25 @@
+"""Generación de datos sintéticos y validación cruzada."""
+import pytest
+
+
+@pytest.mark.parametrize("n", [100, 1000, 10000])
+def test_generar_lote_completo(benchmark, n):
+    from ml.data.generate_data import generar_lote_completo
+    df = benchmark(generar_lote_completo, n)
+    assert len(df) == n
+
+
+def test_cross_validation_evaluation(benchmark, X_y):
+    import xgboost as xgb
+    from ml.core.cross_validation import cross_validation_evaluation
+
+    X, y = X_y
+    modelo = xgb.XGBRegressor(n_estimators=100, max_depth=6, random_state=42, n_jobs=1)
+    # Cada ronda entrena 5 modelos: pocas rondas, una iteración
+    resultado = benchmark.pedantic(
+        cross_validation_evaluation,
+        args=(modelo, X.values, y.values),
+        kwargs={"cv_folds": 5, "verbose": False},
+        rounds=3, iterations=1,
+    )
+    assert resultado["cv_folds"] == 5
@@ -0,0 +1,82 @@
+"""Construcción de features: servicio completo, batch, kernel puro y armado del vector."""
+import numpy as np
+import pandas as pd
+
+
+def test_build_features_24_xgboost(benchmark, features_en_memoria, bd_memoria, loop):
+    id_lote = bd_memoria.ids_lote[len(bd_memoria.ids_lote) // 2]
+    resultado = benchmark(
+        lambda: loop.run_until_complete(features_en_memoria.build_features_24_xgboost(id_lote))
+    )
+    assert len(resultado["features"]) == 24
+
+
+def test_build_features_24_xgboost_con_detalle(benchmark, features_en_memoria, bd_memoria, loop):
+    id_lote = bd_memoria.ids_lote[0]
+    resultado = benchmark(
+        lambda: loop.run_until_complete(
+            features_en_memoria.build_features_24_xgboost(id_lote, with_detalle=True)
+        )
+    )
+    assert "detalle" in resultado
+
+
+def test_build_features_batch(benchmark, features_en_memoria, bd_memoria, loop):
+    """500 lotes con 4 consultas en total, las mismas que para un solo lote."""
+    ids = bd_memoria.ids_lote[:500]
+    resultado = benchmark(lambda: loop.run_until_complete(features_en_memoria.build_features_batch(ids)))
+    assert len(resultado) == 500
+
+
+def test_kernel_features_100k(benchmark):
+    """Kernel puro (sin BD) sobre 100k lotes: el costo que paga generate_data.py."""
+    from ml.core.features_kernel import calcular_features, matriz_features
+
+    rng = np.random.default_rng(0)
+    n = 100_000
+    fechas = np.datetime64("2026-01-01") + rng.integers(0, 365, size=n)
+    entrada = dict(
+        cantidad_animales=rng.integers(10, 121, size=n),
+        peso_promedio_entrada=rng.uniform(80, 115, size=n),
+        precio_compra_kg=rng.uniform(18, 25, size=n),
+        duracion_estadia_dias=rng.integers(1, 4, size=n),
+        fechas=fechas,
+        distancia_km=rng.choice([350, 520, 680], size=n),
+        viajes_mes=rng.integers(1, 40, size=n),
+        animales_en_granja=rng.integers(300, 900, size=n),
+        animales_mes=rng.integers(500, 3000, size=n),
+        servicios_basicos_mes=850.0,
+        mano_obra_mes=11000.0,
+        gasto_total_mes=11850.0,
+        dias_festividad=rng.choice([0, 3, 7, 999], size=n),
+    )
+
+    X = benchmark(lambda: matriz_features(calcular_features(**entrada)[0]))
+    assert X.shape == (n, 24)
+
+
+def test_ocupacion_en_granja_10k(benchmark, bd_memoria):
+    """Animales en +/- 7 días para 10k fechas con el índice de sumas acumuladas."""
+    indice = bd_memoria.indice_ocupacion()
+    dias = np.datetime64("2026-01-01") + np.random.default_rng(0).integers(0, 365, size=10_000)
+    animales = benchmark(lambda: indice.en_granja(dias))
+    assert animales.shape == (10_000,)
+
+
+def test_ocupacion_serie_anual(benchmark, bd_memoria):
+    """Serie diaria completa del dashboard (GET /dashboard/ocupacion)."""
+    indice = bd_memoria.indice_ocupacion()
+    dias, animales = benchmark(indice.serie)
+    assert len(dias) == len(animales) > 300
+
+
+def test_armar_vector_features(benchmark, features_en_memoria, bd_memoria, loop, X_y):
+    """Dict de features -> DataFrame de una fila en el orden del entrenamiento (como /lotes/predict)."""
+    columnas = list(features_en_memoria.FEATURES_24)
+    assert columnas == list(X_y[0].columns)
+    features = loop.run_until_complete(
+        features_en_memoria.build_features_24_xgboost(bd_memoria.ids_lote[0])
+    )["features"]
+
+    X = benchmark(lambda: pd.DataFrame([features], columns=columnas))
+    assert X.shape == (1, 24)
@@ -0,0 +1,36 @@
+"""Carga del modelo e inferencia de una fila y por lotes."""
+import pytest
+
+
+def test_cargar_modelo(benchmark, modelo_pkl):
+    from services.modelo_service import leer_modelo
+    modelo, _, _, metadata = benchmark(leer_modelo, str(modelo_pkl))
+    assert metadata["n_features"] == 24
+
+
+def test_predict_una_fila(benchmark, modelo, X_y):
+    X = X_y[0].iloc[[0]]
+    pred = benchmark(modelo.predict, X)
+    assert pred.shape == (1,)
+
+
+@pytest.mark.parametrize("n", [100, 1000])
+def test_predict_batch(benchmark, modelo, X_y, n):
+    X = X_y[0].iloc[:n]
+    pred = benchmark(modelo.predict, X)
+    assert pred.shape == (n,)
+
+
+def test_registrar_deriva(benchmark, modelo, X_y, tmp_path, monkeypatch):
+    """Costo por prediccion del monitor de deriva (25 histogramas + Welford)."""
+    from config import settings
+    from ml.core.deriva import PREDICCION, perfil_referencia
+    from services import deriva_service
+    X = X_y[0]
+    columnas = {col: X[col].to_numpy() for col in X.columns}
+    columnas[PREDICCION] = modelo.predict(X)
+    metadata = {"version": "bench", "fecha_entrenamiento": None, "distribuciones": perfil_referencia(columnas)}
+    monkeypatch.setattr(settings, "DERIVA_PATH", str(tmp_path / "deriva.sqlite3"))
+
+    benchmark(deriva_service.registrar, X.iloc[0].to_dict(), 25.0, metadata)
+    assert deriva_service.reporte(metadata, dias=1)["predicciones"] > 0
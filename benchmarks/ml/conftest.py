@@ -0,0 +1,90 @@
+"""
+Fixtures de los micro-benchmarks del camino caliente de ML.
+
+Los módulos de la API se importan desde api/ (como lo hace la app), y el
+cliente Prisma de features_service se reemplaza por BDEnMemoria.
+"""
+import asyncio
+import pickle
+import sys
+from pathlib import Path
+
+import pytest
+
+API_DIR = Path(__file__).resolve().parents[2] / "api"
+sys.path.insert(0, str(API_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bd_memoria import BDEnMemoria  # noqa: E402
+
+N_DATASET = 2000
+TARGET = "precio_venta_kg"
+
+
+@pytest.fixture(scope="session")
+def bd_memoria():
+    return BDEnMemoria(n_lotes=2000)
+
+
+@pytest.fixture
+def features_en_memoria(bd_memoria, monkeypatch, tmp_path):
+    """features_service usando la BD en memoria (indice de ocupacion incluido)."""
+    from config import settings
+    from services import features_service, ocupacion_service
+
+    async def construir_indice(cliente):
+        return cliente.indice_ocupacion()
+
+    monkeypatch.setattr(features_service, "db", bd_memoria)
+    monkeypatch.setattr(settings, "OCUPACION_VERSION_PATH", str(tmp_path / "ocupacion.sqlite3"))
+    monkeypatch.setattr(ocupacion_service, "_construir", construir_indice)
+    monkeypatch.setitem(ocupacion_service._estado, "indice", None)
+    return features_service
+
+
+@pytest.fixture(scope="session")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def dataset():
+    from ml.data import generate_data
+    return generate_data.generar_lote_completo(N_DATASET)
+
+
+@pytest.fixture(scope="session")
+def X_y(dataset):
+    return dataset.drop(columns=[TARGET]), dataset[TARGET]
+
+
+@pytest.fixture(scope="session")
+def modelo(X_y):
+    """XGBoost con los hiperparámetros de train_xgboost.py, entrenado una vez por sesión."""
+    import xgboost as xgb
+    X, y = X_y
+    modelo = xgb.XGBRegressor(
+        objective="reg:squarederror", max_depth=6, learning_rate=0.1, n_estimators=200,
+        subsample=0.8, colsample_bytree=0.8, min_child_weight=3, gamma=0.1,
+        reg_alpha=0.1, reg_lambda=1.0, random_state=42, n_jobs=-1,
+    )
+    modelo.fit(X, y)
+    return modelo
+
+
+@pytest.fixture(scope="session")
+def modelo_pkl(modelo, tmp_path_factory):
+    """Artefacto con el mismo formato que guarda train_xgboost.guardar_modelo."""
+    path = tmp_path_factory.mktemp("modelo") / "xgboost_24_features.pkl"
+    with open(path, "wb") as f:
+        pickle.dump({
+            "modelo": modelo,
+            "metricas_cv": {"mae_mean": 0.5, "r2_mean": 0.9},
+            "metricas_full": {},
+            "version": "bench",
+            "fecha_entrenamiento": None,
+            "n_features": 24,
+        }, f)
+    return path
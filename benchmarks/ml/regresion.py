@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Gate de regresión de los micro-benchmarks de ML.
+
+Corre benchmarks/ml con pytest-benchmark y compara contra la última línea
+base guardada en benchmarks/ml/baselines/. Termina con código distinto de 0
+si algún benchmark es más lento que la base por encima del umbral.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/ml/regresion.py --guardar       # registrar nueva línea base
+    python benchmarks/ml/regresion.py                 # comparar (umbral 20% en la mediana)
+    python benchmarks/ml/regresion.py --umbral 10 -k predict
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASELINES_DIR = BENCH_DIR / "baselines"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de ML con gate de regresión")
+    parser.add_argument("--guardar", action="store_true", help="Guardar el resultado como nueva línea base")
+    parser.add_argument("--umbral", type=float, default=20.0, help="%% de empeoramiento tolerado en la mediana")
+    parser.add_argument("-k", dest="filtro", help="Filtrar benchmarks (igual que pytest -k)")
+    args = parser.parse_args()
+
+    comando = [
+        sys.executable, "-m", "pytest", str(BENCH_DIR), "-q", "--benchmark-only",
+        f"--benchmark-storage=file://{BASELINES_DIR}",
+    ]
+    if args.filtro:
+        comando += ["-k", args.filtro]
+
+    if args.guardar:
+        comando.append("--benchmark-save=base")
+    else:
+        hay_base = any(BASELINES_DIR.glob("*/*.json"))
+        if not hay_base:
+            print("⚠️ No hay línea base en benchmarks/ml/baselines/. Generarla con --guardar")
+            sys.exit(1)
+        comando += ["--benchmark-compare", f"--benchmark-compare-fail=median:{args.umbral:g}%"]
+
+    print(" ".join(comando))
+    sys.exit(subprocess.run(comando).returncode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Tamaño y tiempo de serializacion de las respuestas grandes.
+
+Arma un payload con la forma de GET /dashboard/overview (lotes y costos como
+los devuelve `.dict()` de Prisma, con datetimes, relaciones en None y el
+tipo de costo anidado) y mide, con la mediana de `--repeticiones`:
+
+- serializacion a bytes con el proveedor JSON de Flask (antes) y con
+  `ProveedorJSON` de api/utils/respuestas.py (orjson, despues);
+- bytes del cuerpo sin comprimir, con gzip y con brotli (con los niveles de
+  la configuracion) y lo que tarda cada compresion.
+
+No necesita BD ni la API levantada.
+
+Uso:
+    python benchmarks/respuestas_api.py
+    python benchmarks/respuestas_api.py --lotes 2000 --costos-por-lote 12 --repeticiones 20
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from carga_api import API_DIR, RESULTADOS_DIR, entorno
+
+sys.path.insert(0, str(API_DIR))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from config import settings  # noqa: E402
+from utils import respuestas  # noqa: E402
+
+TIPOS_COSTO = [
+    (1, "Alimento", "VARIABLE"), (2, "Flete", "VARIABLE"), (3, "Sanidad", "VARIABLE"),
+    (4, "Mano de obra", "FIJO"), (5, "Energia", "FIJO"), (6, "Alquiler", "FIJO"),
+]
+ORIGENES = ["Santa Cruz", "Cochabamba", "La Paz", "Tarija", "Beni"]
+
+
+# ---------------------------------------------------------------------------
+# Payload
+# ---------------------------------------------------------------------------
+
+def payload_dashboard(n_lotes: int, costos_por_lote: int, semilla: int) -> dict:
+    """Dicts con las claves y tipos de `Lote.dict()` / `Costo.dict()` (include tipo_costo)."""
+    rnd = random.Random(semilla)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    lotes, costos = [], []
+    id_costo = 1
+    for id_lote in range(1, n_lotes + 1):
+        fecha = base + timedelta(days=rnd.randint(0, 700))
+        lotes.append({
+            "id_lote": id_lote,
+            "fecha_adquisicion": fecha,
+            "cantidad_animales": rnd.randint(20, 400),
+            "peso_promedio_entrada": round(rnd.uniform(80, 120), 2),
+            "duracion_estadia_dias": rnd.randint(1, 3),
+            "precio_compra_kg": round(rnd.uniform(12, 18), 2),
+            "costo_flete": round(rnd.uniform(200, 1500), 2),
+            "costo_combustible": round(rnd.uniform(100, 800), 2),
+            "costo_peajes_lavado": round(rnd.uniform(20, 150), 2),
+            "merma_peso_transporte": round(rnd.uniform(0, 3), 3),
+            "ubicacion_origen": rnd.choice(ORIGENES),
+            "usuario_creador": None,
+            "id_usuario_creador": 1,
+            "costos": None,
+            "produccion": None,
+            "predicciones": None,
+        })
+        for _ in range(costos_por_lote):
+            id_tipo, nombre, categoria = rnd.choice(TIPOS_COSTO)
+            costos.append({
+                "id_costo": id_costo,
+                "monto": round(rnd.uniform(10, 5000), 2),
+                "fecha_gasto": fecha + timedelta(days=rnd.randint(0, 3), hours=rnd.randint(0, 23)),
+                "descripcion": f"{nombre} lote {id_lote}" if rnd.random() < 0.7 else None,
+                "tipo_costo": {
+                    "id_tipo_costo": id_tipo, "nombre_tipo": nombre, "categoria": categoria,
+                    "costos": None, "gastos_mensuales": None,
+                },
+                "id_tipo_costo": id_tipo,
+                "lote": None,
+                "id_lote": id_lote,
+            })
+            id_costo += 1
+    return {"lotes": lotes, "costos": costos}
+
+
+# ---------------------------------------------------------------------------
+# Medicion
+# ---------------------------------------------------------------------------
+
+def cronometrar(fn, repeticiones: int) -> tuple:
+    """(mediana en ms, ultimo resultado); una llamada previa de calentamiento."""
+    resultado = fn()
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = fn()
+        tiempos.append(time.perf_counter() - t0)
+    return round(statistics.median(tiempos) * 1000, 2), resultado
+
+
+def medir(payload: dict, repeticiones: int) -> dict:
+    app = Flask(__name__)
+    proveedores = {"flask": DefaultJSONProvider(app)}
+    if respuestas.orjson is not None:
+        proveedores["orjson"] = respuestas.ProveedorJSON(app)
+
+    serializacion = {}
+    cuerpos = {}
+    with app.app_context():
+        for nombre, proveedor in proveedores.items():
+            ms, resp = cronometrar(lambda: proveedor.response(payload).get_data(), repeticiones)
+            serializacion[nombre] = {"ms": ms, "bytes": len(resp)}
+            cuerpos[nombre] = resp
+
+    # La compresion se mide sobre el cuerpo que envia la API ahora
+    cuerpo = cuerpos.get("orjson", cuerpos["flask"])
+    compresion = {"identity": {"ms": 0.0, "bytes": len(cuerpo)}}
+    for codificacion in respuestas.CODIFICACIONES:
+        ms, comprimido = cronometrar(lambda: respuestas.comprimir_cuerpo(cuerpo, codificacion), repeticiones)
+        compresion[codificacion] = {"ms": ms, "bytes": len(comprimido)}
+
+    return {"serializacion": serializacion, "compresion": compresion}
+
+
+# ---------------------------------------------------------------------------
+# Reporte
+# ---------------------------------------------------------------------------
+
+def _kb(n: int) -> str:
+    return f"{n / 1024:,.1f} KB"
+
+
+def imprimir(r: dict) -> None:
+    ser, comp = r["serializacion"], r["compresion"]
+    print("\n" + "=" * 72)
+    print(f"Payload: {r['lotes']} lotes, {r['costos']} costos")
+    print("=" * 72)
+
+    print("\nSerializacion (jsonify -> bytes)")
+    print("-" * 72)
+    for nombre, m in ser.items():
+        linea = f"{nombre:<12}{m['ms']:>10.2f} ms{_kb(m['bytes']):>16}"
+        if nombre != "flask":
+            linea += f"   x{ser['flask']['ms'] / m['ms']:.1f} mas rapido"
+        print(linea)
+    if "orjson" not in ser:
+        print("(orjson no esta instalado: la API usa el proveedor de Flask)")
+
+    print("\nCompresion del cuerpo (lo que viaja por la red)")
+    print("-" * 72)
+    original = comp["identity"]["bytes"]
+    for codificacion, m in comp.items():
+        linea = f"{codificacion:<12}{m['ms']:>10.2f} ms{_kb(m['bytes']):>16}"
+        if codificacion != "identity":
+            linea += f"   {m['bytes'] / original * 100:.1f}% del original"
+        print(linea)
+
+    antes = ser["flask"]
+    mejor = min((c for c in comp if c != "identity"), key=lambda c: comp[c]["bytes"])
+    despues_ms = ser.get("orjson", antes)["ms"] + comp[mejor]["ms"]
+    print(f"\nAntes:   {antes['ms']:.2f} ms, {_kb(antes['bytes'])} (Flask, sin comprimir)")
+    print(f"Despues: {despues_ms:.2f} ms, {_kb(comp[mejor]['bytes'])} "
+          f"({'orjson' if 'orjson' in ser else 'Flask'} + {mejor})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes y tiempo de serializacion de las respuestas grandes")
+    parser.add_argument("--lotes", type=int, default=2000)
+    parser.add_argument("--costos-por-lote", type=int, default=8)
+    parser.add_argument("--repeticiones", type=int, default=10, help="Se toma la mediana")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", type=Path, help="Archivo JSON de salida (default benchmarks/resultados/<fecha>.json)")
+    args = parser.parse_args()
+
+    payload = payload_dashboard(args.lotes, args.costos_por_lote, args.semilla)
+    resultado = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "entorno": entorno(),
+        "lotes": len(payload["lotes"]),
+        "costos": len(payload["costos"]),
+        "repeticiones": args.repeticiones,
+        "config": {
+            "COMPRESION_MIN_BYTES": settings.COMPRESION_MIN_BYTES,
+            "COMPRESION_GZIP_NIVEL": settings.COMPRESION_GZIP_NIVEL,
+            "COMPRESION_BROTLI_CALIDAD": settings.COMPRESION_BROTLI_CALIDAD,
+        },
+        **medir(payload, args.repeticiones),
+    }
+    imprimir(resultado)
+
+    salida = args.salida or RESULTADOS_DIR / f"respuestas_{datetime.now():%Y%m%d_%H%M%S}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\n💾 Resultado guardado en {salida}")
+
+
+if __name__ == "__main__":
+    main()
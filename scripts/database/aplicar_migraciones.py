@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Aplica las migraciones SQL de scripts/database/migraciones/ en orden.
+
+Cada archivo NNN_nombre.sql se aplica una sola vez y queda registrado en la
+tabla "_migraciones_sql". Las sentencias se ejecutan en modo autocommit, una
+por una, para permitir CREATE INDEX CONCURRENTLY (no admite transacciones);
+por eso cada sentencia debe ser idempotente (IF NOT EXISTS).
+
+IMPORTANTE: Ejecutar desde la raíz del proyecto:
+    python scripts/database/aplicar_migraciones.py            # aplica pendientes
+    python scripts/database/aplicar_migraciones.py --listar   # solo muestra estado
+"""
+import sys
+import argparse
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Agregar path del directorio api para importar config
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "api"))
+
+import psycopg
+from config import settings
+
+MIGRACIONES_DIR = Path(__file__).parent / "migraciones"
+
+
+def conectar(autocommit: bool = True) -> psycopg.Connection:
+    """
+    Conecta a DATABASE_URL. Se quita el parámetro `schema` propio de Prisma,
+    que libpq no reconoce, y se usa como search_path.
+    """
+    partes = urlsplit(settings.DATABASE_URL)
+    params = dict(parse_qsl(partes.query))
+    schema = params.pop("schema", None)
+    url = urlunsplit(partes._replace(query=urlencode(params)))
+    options = {"options": f"-c search_path={schema}"} if schema else {}
+    return psycopg.connect(url, autocommit=autocommit, **options)
+
+
+def leer_sentencias(archivo: Path) -> list[str]:
+    """Divide un archivo SQL en sentencias terminadas en ';', ignorando comentarios."""
+    lineas = [
+        linea for linea in archivo.read_text(encoding="utf-8").splitlines()
+        if not linea.strip().startswith("--")
+    ]
+    return [s.strip() for s in "\n".join(lineas).split(";") if s.strip()]
+
+
+def migraciones_aplicadas(conn) -> set[str]:
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS "_migraciones_sql" ('
+        '  nombre TEXT PRIMARY KEY,'
+        '  aplicada_en TIMESTAMPTZ NOT NULL DEFAULT now()'
+        ')'
+    )
+    return {fila[0] for fila in conn.execute('SELECT nombre FROM "_migraciones_sql"')}
+
+
+def aplicar_migraciones(solo_listar: bool = False) -> int:
+    archivos = sorted(MIGRACIONES_DIR.glob("*.sql"))
+    with conectar() as conn:
+        aplicadas = migraciones_aplicadas(conn)
+        pendientes = [a for a in archivos if a.name not in aplicadas]
+
+        print("🗂️ Migraciones SQL")
+        for archivo in archivos:
+            estado = "✅ aplicada" if archivo.name in aplicadas else "⏳ pendiente"
+            print(f"   {estado}  {archivo.name}")
+
+        if solo_listar or not pendientes:
+            if not pendientes:
+                print("\n✅ No hay migraciones pendientes")
+            return 0
+
+        for archivo in pendientes:
+            print(f"\n▶️ Aplicando {archivo.name}...")
+            for sentencia in leer_sentencias(archivo):
+                print(f"   {sentencia.splitlines()[0]}")
+                conn.execute(sentencia)
+            conn.execute('INSERT INTO "_migraciones_sql" (nombre) VALUES (%s)', (archivo.name,))
+            print(f"   ✅ {archivo.name} aplicada")
+
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aplica las migraciones SQL pendientes")
+    parser.add_argument("--listar", action="store_true", help="Solo mostrar el estado de las migraciones")
+    args = parser.parse_args()
+    sys.exit(aplicar_migraciones(solo_listar=args.listar))
+
+
+if __name__ == "__main__":
+    main()
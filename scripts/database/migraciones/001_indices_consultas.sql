@@ -0,0 +1,30 @@
+-- Indices para los predicados y ordenamientos mas usados por la API.
+-- Los nombres siguen la convencion de Prisma (<Modelo>_<campos>_idx) y cada
+-- indice esta declarado tambien con @@index en api/prisma/schema.prisma, asi
+-- `prisma db push` los reconoce y no intenta recrearlos.
+--
+-- CONCURRENTLY: se crean sin bloquear escrituras sobre la tabla.
+
+-- Lote: rangos por fecha en features_service (feriados, prorrateo, viajes,
+-- ocupacion), orden del dashboard y listado paginado por fecha en GET /lotes
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "Lote_fecha_adquisicion_id_lote_idx"
+    ON "Lote" ("fecha_adquisicion", "id_lote");
+
+-- Lote: filtros de GET /lotes
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "Lote_ubicacion_origen_idx"
+    ON "Lote" ("ubicacion_origen");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "Lote_cantidad_animales_idx"
+    ON "Lote" ("cantidad_animales");
+
+-- Costo: GET /lotes/<id>/costos, resumen de costos y dashboard filtran por
+-- lote y ordenan/filtran por fecha_gasto
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "Costo_id_lote_fecha_gasto_idx"
+    ON "Costo" ("id_lote", "fecha_gasto");
+
+-- Costo: verificacion de costos asociados antes de borrar un tipo de costo
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "Costo_id_tipo_costo_idx"
+    ON "Costo" ("id_tipo_costo");
+
+-- Prediccion: historial de predicciones por lote, mas recientes primero
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "Prediccion_id_lote_fecha_prediccion_idx"
+    ON "Prediccion" ("id_lote", "fecha_prediccion");
@@ -0,0 +1,13 @@
+-- Seguimiento de precision de las predicciones (GET /predicciones/precision).
+-- Columnas declaradas tambien en api/prisma/schema.prisma.
+
+-- Produccion: precio de venta realizado, el target del modelo
+ALTER TABLE "Produccion" ADD COLUMN IF NOT EXISTS "precio_venta_kg" DOUBLE PRECISION;
+
+-- Prediccion: lo que predijo el modelo (sin margen) y los kilos que asumio
+ALTER TABLE "Prediccion" ADD COLUMN IF NOT EXISTS "precio_ml_kg" DOUBLE PRECISION;
+ALTER TABLE "Prediccion" ADD COLUMN IF NOT EXISTS "kilos_estimados" DOUBLE PRECISION;
+
+-- Prediccion: errores precalculados contra la Produccion del lote
+ALTER TABLE "Prediccion" ADD COLUMN IF NOT EXISTS "error_precio_kg" DOUBLE PRECISION;
+ALTER TABLE "Prediccion" ADD COLUMN IF NOT EXISTS "error_kilos" DOUBLE PRECISION;
@@ -0,0 +1,19 @@
+-- Orden de cierre de los lotes para el reentrenamiento incremental y la
+-- extraccion del dataset (api/services/dataset_service.py).
+-- Columna e indice declarados tambien en api/prisma/schema.prisma.
+
+-- Produccion: cuando se registro el precio de venta (el lote "cerro")
+ALTER TABLE "Produccion" ADD COLUMN IF NOT EXISTS "fecha_cierre" TIMESTAMP(3);
+
+-- Las producciones que ya tienen precio: fin de la estadia del lote como
+-- mejor estimacion de su cierre
+UPDATE "Produccion" pr
+SET "fecha_cierre" = l."fecha_adquisicion" + make_interval(days => COALESCE(l."duracion_estadia_dias", 0))
+FROM "Lote" l
+WHERE l."id_lote" = pr."id_lote"
+  AND pr."precio_venta_kg" IS NOT NULL
+  AND pr."fecha_cierre" IS NULL;
+
+-- Paginacion keyset por (fecha_cierre, id_produccion)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "Produccion_fecha_cierre_id_produccion_idx"
+    ON "Produccion" ("fecha_cierre", "id_produccion");
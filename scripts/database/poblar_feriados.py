@@ -14,6 +14,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent / "api"))
 import asyncio
 from datetime import datetime
 from db import db
+from services import versiones_service
+from services.bulk_service import ReporteThroughput, create_many_en_bloques
 
 # Feriados de Bolivia 2026
 FERIADOS_2026 = [
@@ -57,40 +59,40 @@ async def poblar_feriados():
     try:
         print("🎉 Poblando feriados de Bolivia 2026...")
         
-        feriados_creados = 0
-        feriados_existentes = 0
+        # Una sola consulta para detectar existentes y un create_many para el resto
+        existentes = await db.feriado.find_many(
+            where={"fecha": {"in": [f["fecha"] for f in FERIADOS_2026]}}
+        )
+        claves_existentes = {(f.fecha.date(), f.nombre_feriado) for f in existentes}
         
+        nuevos = []
         for feriado_data in FERIADOS_2026:
-            try:
-                # Verificar si ya existe
-                existe = await db.feriado.find_first(
-                    where={
-                        "fecha": feriado_data["fecha"],
-                        "nombre_feriado": feriado_data["nombre"]
-                    }
-                )
-                
-                if existe:
-                    feriados_existentes += 1
-                    print(f"⚠️  Ya existe: {feriado_data['nombre']} - {feriado_data['fecha'].strftime('%d/%m/%Y')}")
-                else:
-                    feriado = await db.feriado.create(
-                        data={
-                            "nombre_feriado": feriado_data["nombre"],
-                            "fecha": feriado_data["fecha"],
-                            "descripcion": feriado_data["descripcion"]
-                        }
-                    )
-                    feriados_creados += 1
-                    print(f"✅ Creado: {feriado.nombre_feriado} - {feriado.fecha.strftime('%d/%m/%Y')}")
-                    
-            except Exception as e:
-                print(f"❌ Error al crear {feriado_data['nombre']}: {str(e)}")
+            if (feriado_data["fecha"].date(), feriado_data["nombre"]) in claves_existentes:
+                print(f"⚠️  Ya existe: {feriado_data['nombre']} - {feriado_data['fecha'].strftime('%d/%m/%Y')}")
+            else:
+                nuevos.append({
+                    "nombre_feriado": feriado_data["nombre"],
+                    "fecha": feriado_data["fecha"],
+                    "descripcion": feriado_data["descripcion"]
+                })
+        
+        reporte = ReporteThroughput()
+        try:
+            feriados_creados = await create_many_en_bloques(db, "feriado", nuevos, reporte=reporte)
+            # Las features cacheadas por ETag en la API dependen de estos datos
+            versiones_service.invalidar(["feriados"])
+            for feriado_data in nuevos:
+                print(f"✅ Creado: {feriado_data['nombre_feriado']} - {feriado_data['fecha'].strftime('%d/%m/%Y')}")
+        except Exception as e:
+            feriados_creados = 0
+            print(f"❌ Error al crear feriados: {str(e)}")
+        feriados_existentes = len(FERIADOS_2026) - len(nuevos)
         
         print(f"\n📊 Resumen:")
         print(f"   Feriados creados: {feriados_creados}")
         print(f"   Feriados ya existentes: {feriados_existentes}")
         print(f"   Total en BD: {await db.feriado.count()}")
+        reporte.imprimir()
         
     finally:
         await db.disconnect()
@@ -14,6 +14,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent / "api"))
 import asyncio
 from datetime import datetime
 from db import db
+from services import versiones_service
+from services.bulk_service import ReporteThroughput, create_many_en_bloques
 
 async def poblar_gastos_mensuales_ejemplo():
     """
@@ -100,13 +102,17 @@ async def poblar_gastos_mensuales_ejemplo():
             },
         ]
         
-        # Crear gastos
-        for gasto_data in gastos_enero + gastos_febrero:
-            try:
-                gasto = await db.gastomensual.create(data=gasto_data)
-                print(f"✅ Gasto creado: {gasto.descripcion} - Bs {gasto.monto}")
-            except Exception as e:
-                print(f"⚠️ Gasto ya existe o error: {gasto_data['descripcion']}")
+        # Crear gastos en bloque; skip_duplicates respeta la restricción
+        # única (mes, anio, id_tipo_costo) en lugar de fallar fila por fila
+        gastos = gastos_enero + gastos_febrero
+        reporte = ReporteThroughput()
+        creados = await create_many_en_bloques(
+            db, "gastomensual", gastos, skip_duplicates=True, reporte=reporte
+        )
+        print(f"✅ Gastos creados: {creados} (omitidos por existir: {len(gastos) - creados})")
+        # Las features cacheadas por ETag en la API dependen de estos datos
+        versiones_service.invalidar(["gastos_mensuales"])
+        reporte.imprimir()
         
         print("\n✅ Gastos mensuales poblados exitosamente")
         
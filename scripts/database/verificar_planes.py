@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Verifica que las consultas de la API usen sus índices.
+
+Ejecuta EXPLAIN sobre el SQL equivalente a lo que emite Prisma en cada ruta
+o helper de features y falla (exit 1) si algún plan contiene un Seq Scan, no
+usa los índices esperados para esa consulta, o aplica un Filter sobre un
+índice recorrido entero; también si quedó algún índice inválido (p. ej. un
+CREATE INDEX CONCURRENTLY interrumpido).
+
+Por defecto se desactiva enable_seqscan en la sesión: en una BD local con
+pocos datos el planner prefiere Seq Scan aunque exista el índice. Sin el
+índice, con enable_seqscan = off el planner recorre la clave primaria
+entera filtrando las filas (Index Scan sobre <Tabla>_pkey con Filter), que
+no es un Seq Scan: por eso se exige el índice esperado de cada consulta.
+Con --planner-real se usa el costo real (útil sobre una BD grande).
+
+IMPORTANTE: Ejecutar desde la raíz del proyecto, con la BD local poblada
+(cd api && python generar_datos_completos.py) y las migraciones aplicadas:
+    python scripts/database/verificar_planes.py
+    python scripts/database/verificar_planes.py --verbose   # imprime los planes
+"""
+import sys
+import json
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from psycopg import ClientCursor
+from aplicar_migraciones import conectar
+
+TABLAS = ("Lote", "Costo", "Produccion", "Prediccion", "Feriado", "GastoMensual", "TipoCosto")
+
+COLUMNAS_LOTE = (
+    '"id_lote", "fecha_adquisicion", "cantidad_animales", "peso_promedio_entrada", '
+    '"duracion_estadia_dias", "precio_compra_kg", "ubicacion_origen", "id_usuario_creador"'
+)
+
+INICIO_MES = datetime(2025, 6, 1)
+FIN_MES = datetime(2025, 7, 1)
+
+# (origen, SQL, parámetros, índices esperados). El SQL replica los predicados
+# y el ORDER BY de cada consulta Prisma; al cambiar una consulta en la API,
+# actualizarla aquí. Los índices esperados deben aparecer todos en el plan
+# (nombres de las migraciones y de schema.prisma: <Modelo>_<campos>_idx,
+# _key para @unique y _pkey para @id).
+CONSULTAS = [
+    # routes/v1/lotes.py - GET /lotes
+    ("GET /lotes (orden id_desc, página siguiente)",
+     f'SELECT {COLUMNAS_LOTE} FROM "Lote" WHERE "id_lote" < %s ORDER BY "id_lote" DESC LIMIT 51',
+     (1000,), ("Lote_pkey",)),
+    ("GET /lotes (orden fecha_desc, página siguiente)",
+     f'SELECT {COLUMNAS_LOTE} FROM "Lote" '
+     'WHERE ("fecha_adquisicion" < %s OR ("fecha_adquisicion" = %s AND "id_lote" < %s)) '
+     'ORDER BY "fecha_adquisicion" DESC, "id_lote" DESC LIMIT 51',
+     (FIN_MES, FIN_MES, 1000), ("Lote_fecha_adquisicion_id_lote_idx",)),
+    ("GET /lotes?desde&hasta",
+     f'SELECT {COLUMNAS_LOTE} FROM "Lote" '
+     'WHERE "fecha_adquisicion" >= %s AND "fecha_adquisicion" < %s ORDER BY "id_lote" DESC LIMIT 51',
+     (INICIO_MES, FIN_MES), ("Lote_fecha_adquisicion_id_lote_idx",)),
+    ("GET /lotes?ubicacion_origen",
+     f'SELECT {COLUMNAS_LOTE} FROM "Lote" WHERE "ubicacion_origen" = %s ORDER BY "id_lote" DESC LIMIT 51',
+     ("Santa Cruz",), ("Lote_ubicacion_origen_idx",)),
+    ("GET /lotes?min_animales&max_animales (X-Total-Count)",
+     'SELECT COUNT(*) FROM "Lote" WHERE "cantidad_animales" >= %s AND "cantidad_animales" <= %s',
+     (10, 20), ("Lote_cantidad_animales_idx",)),
+    ("GET /lotes?con_produccion=true",
+     f'SELECT {COLUMNAS_LOTE} FROM "Lote" WHERE "id_lote" IN '
+     '(SELECT "id_lote" FROM "Produccion" WHERE "id_lote" IS NOT NULL) ORDER BY "id_lote" DESC LIMIT 51',
+     (), ("Produccion_id_lote_key",)),
+
+    # services/features_service.py
+    ("features: _calcular_dias_feriado",
+     'SELECT * FROM "Feriado" WHERE "fecha" >= %s AND "fecha" <= %s ORDER BY "fecha" ASC',
+     (INICIO_MES, FIN_MES), ("Feriado_fecha_idx",)),
+    ("features: _calcular_gastos_mes",
+     'SELECT * FROM "GastoMensual" WHERE "anio" IN (%s) AND "mes" IN (%s, %s)',
+     (2025, 6, 7), ("GastoMensual_mes_anio_id_tipo_costo_key",)),
+    ("features: build_features_batch",
+     'SELECT * FROM "Lote" WHERE "id_lote" IN (%s, %s, %s)',
+     (1, 2, 3), ("Lote_pkey",)),
+
+    # routes/v1/analytics.py
+    ("GET /dashboard/overview (lotes)",
+     'SELECT * FROM "Lote" ORDER BY "fecha_adquisicion" DESC',
+     (), ("Lote_fecha_adquisicion_id_lote_idx",)),
+    ("GET /dashboard/overview (costos)",
+     'SELECT * FROM "Costo" WHERE "id_lote" IN (%s, %s, %s) ORDER BY "fecha_gasto" DESC',
+     (1, 2, 3), ("Costo_id_lote_fecha_gasto_idx",)),
+    ("GET /lotes/<id>/costos/aggregates",
+     'SELECT * FROM "Costo" WHERE "id_lote" = %s AND "fecha_gasto" >= %s AND "fecha_gasto" <= %s '
+     'ORDER BY "fecha_gasto" ASC',
+     (1, INICIO_MES, FIN_MES), ("Costo_id_lote_fecha_gasto_idx",)),
+
+    # routes/v1/costos.py y tipos_costo.py
+    ("GET /lotes/<id>/costos",
+     'SELECT * FROM "Costo" WHERE "id_lote" = %s ORDER BY "fecha_gasto" DESC',
+     (1,), ("Costo_id_lote_fecha_gasto_idx",)),
+    ("DELETE /tipos-costo/<id> (costos asociados)",
+     'SELECT * FROM "Costo" WHERE "id_tipo_costo" = %s LIMIT 1',
+     (1,), ("Costo_id_tipo_costo_idx",)),
+
+    # routes/v1/produccion.py
+    ("GET /lotes/<id>/produccion",
+     'SELECT * FROM "Produccion" WHERE "id_lote" = %s LIMIT 1',
+     (1,), ("Produccion_id_lote_key",)),
+
+    # Historial de predicciones por lote
+    ("predicciones por lote",
+     'SELECT * FROM "Prediccion" WHERE "id_lote" = %s ORDER BY "fecha_prediccion" DESC',
+     (1,), ("Prediccion_id_lote_fecha_prediccion_idx",)),
+
+    # services/dataset_service.py - lotes_cerrados (página siguiente)
+    ("dataset: lotes cerrados en orden de cierre",
+     'SELECT * FROM "Produccion" WHERE "precio_venta_kg" IS NOT NULL AND "fecha_cierre" IS NOT NULL '
+     'AND ("fecha_cierre" > %s OR ("fecha_cierre" = %s AND "id_produccion" > %s)) '
+     'ORDER BY "fecha_cierre" ASC, "id_produccion" ASC LIMIT 1000',
+     (INICIO_MES, INICIO_MES, 1000), ("Produccion_fecha_cierre_id_produccion_idx",)),
+]
+
+
+def nodos_plan(nodo: dict):
+    """Recorre el árbol de un plan EXPLAIN (FORMAT JSON)."""
+    yield nodo
+    for hijo in nodo.get("Plans", []):
+        yield from nodos_plan(hijo)
+
+
+def problemas_plan(plan: dict, esperados: tuple) -> list[str]:
+    """
+    Motivos por los que un plan no usa los índices de la consulta: Seq Scan,
+    índices esperados ausentes o un Filter sobre un índice recorrido entero
+    (sin Index Cond). Esto último es lo que elige el planner con
+    enable_seqscan = off cuando falta el índice: p. ej. Lote_pkey completo
+    filtrando ubicacion_origen.
+    """
+    nodos = list(nodos_plan(plan))
+    problemas = [f"Seq Scan sobre {n.get('Relation Name')}" for n in nodos if n["Node Type"] == "Seq Scan"]
+    problemas += [
+        f"Filter sobre {n['Index Name']} completo ({n['Filter']})"
+        for n in nodos
+        if "Index Name" in n and "Filter" in n and "Index Cond" not in n
+    ]
+    usados = {n["Index Name"] for n in nodos if "Index Name" in n}
+    faltan = [i for i in esperados if i not in usados]
+    if faltan:
+        problemas.append(f"no usa {', '.join(faltan)} (usa {', '.join(sorted(usados)) or 'ninguno'})")
+    return problemas
+
+
+def indices_invalidos(conn) -> list[str]:
+    filas = conn.execute(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE NOT i.indisvalid"
+    ).fetchall()
+    return [f[0] for f in filas]
+
+
+def verificar_planes(planner_real: bool = False, verbose: bool = False) -> int:
+    fallos = 0
+    with conectar() as conn:
+        # Estadísticas al día para que el planner vea los índices nuevos
+        for tabla in TABLAS:
+            conn.execute(f'ANALYZE "{tabla}"')
+        if not planner_real:
+            conn.execute("SET enable_seqscan = off")
+
+        invalidos = indices_invalidos(conn)
+        if invalidos:
+            fallos += 1
+            print(f"❌ Índices inválidos (reaplicar la migración): {', '.join(invalidos)}")
+
+        print("🔎 Verificando planes de consulta\n")
+        cur = ClientCursor(conn)
+        for origen, sql, params, esperados in CONSULTAS:
+            cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cur.fetchone()[0][0]["Plan"]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            problemas = problemas_plan(plan, esperados)
+            if problemas:
+                fallos += 1
+                print(f"❌ {origen}: {'; '.join(problemas)}")
+            else:
+                indices = sorted({n["Index Name"] for n in nodos_plan(plan) if "Index Name" in n})
+                print(f"✅ {origen}: {', '.join(indices)}")
+            if verbose or problemas:
+                cur.execute(f"EXPLAIN {sql}", params)
+                for (linea,) in cur.fetchall():
+                    print(f"      {linea}")
+
+    print()
+    if fallos:
+        print(f"❌ {fallos} problema(s) de planes de consulta")
+        return 1
+    print(f"✅ {len(CONSULTAS)} consultas usan sus índices")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Falla si alguna consulta de la API no usa sus índices")
+    parser.add_argument("--planner-real", action="store_true",
+                        help="No desactivar enable_seqscan (usar costos reales del planner)")
+    parser.add_argument("--verbose", action="store_true", help="Imprimir el plan de cada consulta")
+    args = parser.parse_args()
+    sys.exit(verificar_planes(planner_real=args.planner_real, verbose=args.verbose))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,16 +9,33 @@ API_VERSION = "v1"
 
 # Endpoints
 LOGIN_ENDPOINT = f"{API_BASE_URL}/api/{API_VERSION}/login"
+REFRESH_ENDPOINT = f"{API_BASE_URL}/api/{API_VERSION}/refresh"
+LOGOUT_ENDPOINT = f"{API_BASE_URL}/api/{API_VERSION}/logout"
 LOTES_ENDPOINT = f"{API_BASE_URL}/api/{API_VERSION}/lotes"
 TIPOS_COSTO_ENDPOINT = f"{API_BASE_URL}/api/{API_VERSION}/tipos-costo"
 PREDICT_ENDPOINT = f"{API_BASE_URL}/api/{API_VERSION}/lotes/predict"
 DASHBOARD_OVERVIEW_ENDPOINT = f"{API_BASE_URL}/api/{API_VERSION}/dashboard/overview"
+DASHBOARD_OCUPACION_ENDPOINT = f"{API_BASE_URL}/api/{API_VERSION}/dashboard/ocupacion"
 
 # Session State Keys
 SESSION_TOKEN = "auth_token"
+SESSION_TOKEN_EXPIRA = "auth_token_expira_en"  # time.time() en que vence el access token
+SESSION_REFRESH_TOKEN = "refresh_token"
+SESSION_HTTP_CACHE = "http_cache"  # Respuestas con ETag para GET condicionales
 SESSION_USER = "user"
 SESSION_AUTHENTICATED = "authenticated"
 
+# El access token se renueva con el refresh token cuando le quedan menos de estos segundos
+TOKEN_REFRESH_MARGIN_SECONDS = 60
+
+# Respuestas GET que se guardan por sesión para revalidar con If-None-Match
+HTTP_CACHE_MAX_ENTRADAS = 64
+
+# Login con la API saturada (503): reintentos y espera máxima entre ellos
+# (la API indica la espera en Retry-After)
+LOGIN_REINTENTOS = 3
+LOGIN_REINTENTO_MAX_SECONDS = 5
+
 # App Configuration
 APP_TITLE = "Sistema de Gestión de Reventa de Cerdos"
 PAGE_LAYOUT = "wide"
@@ -169,6 +169,20 @@ def get_dashboard_data():
     return {"lotes": [], "costos": []}
 
 
+@st.cache_data(ttl=300)
+def get_ocupacion_data():
+    """Serie diaria de ocupacion de la granja (indice de ocupacion del backend)."""
+    result = api.get_dashboard_ocupacion()
+    if result.get("success"):
+        serie = (result.get("data") or {}).get("serie") or []
+        df = pd.DataFrame(serie, columns=["fecha", "animales", "factor"])
+        df["fecha"] = pd.to_datetime(df["fecha"])
+        return df
+
+    logging.error("Dashboard perf - error al obtener ocupacion: %s", result.get("error"))
+    return pd.DataFrame(columns=["fecha", "animales", "factor"])
+
+
 def process_data(data):
     """Procesa y transforma los datos"""
     lotes = data["lotes"]
@@ -540,9 +554,21 @@ with col_gauge1:
     perf["gauge_peso_s"] = time.perf_counter() - gauge_peso_start
     logger.info("Dashboard perf - gauge_peso_s: %.3fs", perf["gauge_peso_s"])
 
+# Ocupación diaria (animales en +/- 7 días / capacidad) en el rango filtrado
+ocupacion_start = time.perf_counter()
+df_ocupacion = get_ocupacion_data()
+if not df_ocupacion.empty and not df_filtered.empty:
+    fechas_lotes = df_filtered['fecha_adquisicion']
+    if fechas_lotes.dt.tz is not None:
+        fechas_lotes = fechas_lotes.dt.tz_localize(None)
+    fecha_min, fecha_max = fechas_lotes.min().normalize(), fechas_lotes.max().normalize()
+    df_ocupacion = df_ocupacion[df_ocupacion['fecha'].between(fecha_min, fecha_max)]
+perf["ocupacion_fetch_s"] = time.perf_counter() - ocupacion_start
+logger.info("Dashboard perf - ocupacion_fetch_s: %.3fs", perf["ocupacion_fetch_s"])
+
 with col_gauge2:
-    # Ocupación
-    ocupacion = (total_animales / (total_lotes * 15)) * 100 if total_lotes > 0 else 0
+    # Ocupación promedio de la granja
+    ocupacion = float(df_ocupacion['factor'].mean()) * 100 if not df_ocupacion.empty else 0
     gauge_ocupacion_start = time.perf_counter()
     fig_g2 = kpi_gauge(
         value=min(ocupacion, 100),
@@ -570,6 +596,24 @@ with col_gauge3:
     perf["gauge_crecimiento_s"] = time.perf_counter() - gauge_crecimiento_start
     logger.info("Dashboard perf - gauge_crecimiento_s: %.3fs", perf["gauge_crecimiento_s"])
 
+if not df_ocupacion.empty:
+    chart_ocupacion_start = time.perf_counter()
+    df_chart_ocupacion = pd.DataFrame({
+        'Fecha': df_ocupacion['fecha'],
+        'Ocupación (%)': df_ocupacion['factor'] * 100,
+    })
+    fig_ocupacion = interactive_line_chart(
+        data=df_chart_ocupacion,
+        x_col='Fecha',
+        y_cols=['Ocupación (%)'],
+        title="Ocupación Diaria de la Granja (lotes en ±7 días)",
+        y_title="% de capacidad",
+        show_range_selector=True
+    )
+    display_chart(fig_ocupacion, key="chart_ocupacion")
+    perf["chart_ocupacion_s"] = time.perf_counter() - chart_ocupacion_start
+    logger.info("Dashboard perf - chart_ocupacion_s: %.3fs", perf["chart_ocupacion_s"])
+
 # ========== TABLA DE DATOS ==========
 
 st.markdown('<div class="section-header">Datos Detallados</div>', unsafe_allow_html=True)
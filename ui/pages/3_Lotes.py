@@ -74,34 +74,67 @@ with tab1:
         if st.button("🔄 Actualizar", use_container_width=True):
             st.rerun()
     
+    with st.expander("🎛️ Filtros"):
+        col_f1, col_f2, col_f3 = st.columns(3)
+        with col_f1:
+            filtro_desde = st.date_input("Adquirido desde", value=None, key="filtro_desde")
+            filtro_hasta = st.date_input("Adquirido hasta", value=None, key="filtro_hasta")
+        with col_f2:
+            filtro_min = st.number_input("Mín. animales", min_value=0, value=None, step=1, key="filtro_min_animales")
+            filtro_max = st.number_input("Máx. animales", min_value=0, value=None, step=1, key="filtro_max_animales")
+        with col_f3:
+            filtro_origen = st.text_input("Ubicación de origen", key="filtro_origen", placeholder="Ej: Santa Cruz")
+            filtro_produccion = st.selectbox(
+                "Producción", ["Todos", "Con producción", "Sin producción"], key="filtro_produccion"
+            )
+    
     st.markdown("<br>", unsafe_allow_html=True)
     
+    ordenes = {
+        "Número (Descendente)": "id_desc",
+        "Número (Ascendente)": "id_asc",
+        "Fecha (Reciente)": "fecha_desc",
+        "Fecha (Antigua)": "fecha_asc",
+    }
+    filtros = {
+        "orden": ordenes[sort_option],
+        "desde": filtro_desde.isoformat() if filtro_desde else None,
+        "hasta": filtro_hasta.isoformat() if filtro_hasta else None,
+        "min_animales": filtro_min,
+        "max_animales": filtro_max,
+        "ubicacion_origen": filtro_origen.strip() or None,
+        "con_produccion": {"Con producción": True, "Sin producción": False}.get(filtro_produccion),
+    }
+    hay_filtros = bool(search_term) or any(v is not None for k, v in filtros.items() if k != "orden")
+    busqueda_valida = True
+    if search_term:
+        try:
+            filtros["id_lote"] = int(search_term)
+        except ValueError:
+            busqueda_valida = False
+    
+    # Paginación por cursor: se guarda la pila de cursores de las páginas visitadas
+    # y se reinicia cuando cambian los filtros o el orden
+    if st.session_state.get("lotes_filtros") != filtros:
+        st.session_state["lotes_filtros"] = filtros
+        st.session_state["lotes_cursores"] = [None]
+        st.session_state.pop("lotes_total", None)
+    cursores = st.session_state["lotes_cursores"]
+    
     with st.spinner("Cargando lotes..."):
-        result = api.get_lotes()
+        if busqueda_valida:
+            result = api.get_lotes(limit=50, cursor=cursores[-1], **filtros)
+        else:
+            result = {"success": True, "data": []}
+            alert_modern("El número debe ser válido", "warning")
         
         if result["success"]:
             lotes = result["data"]
+            if result.get("total") is not None:
+                st.session_state["lotes_total"] = result["total"]
             
-            if lotes:
-                # Filtrar por búsqueda
+            if lotes or len(cursores) > 1 or hay_filtros:
                 filtered_lotes = lotes
-                if search_term:
-                    try:
-                        search_id = int(search_term)
-                        filtered_lotes = [l for l in filtered_lotes if l.get("id_lote") == search_id]
-                    except ValueError:
-                        filtered_lotes = []
-                        alert_modern("El número debe ser válido", "warning")
-                
-                # Ordenar
-                if sort_option == "Número (Descendente)":
-                    filtered_lotes = sorted(filtered_lotes, key=lambda x: x.get("id_lote", 0), reverse=True)
-                elif sort_option == "Número (Ascendente)":
-                    filtered_lotes = sorted(filtered_lotes, key=lambda x: x.get("id_lote", 0))
-                elif sort_option == "Fecha (Reciente)":
-                    filtered_lotes = sorted(filtered_lotes, key=lambda x: x.get("fecha_adquisicion", ""), reverse=True)
-                elif sort_option == "Fecha (Antigua)":
-                    filtered_lotes = sorted(filtered_lotes, key=lambda x: x.get("fecha_adquisicion", ""))
                 
                 # Mostrar métricas rápidas (responsive)
                 total_animales = sum(l.get("cantidad_animales", 0) for l in filtered_lotes)
@@ -109,7 +142,7 @@ with tab1:
                 precio_prom = sum(l.get("precio_compra_kg", 0) or 0 for l in filtered_lotes) / len([l for l in filtered_lotes if l.get("precio_compra_kg")]) if filtered_lotes else 0
 
                 stats_card_responsive([
-                    {"label": "Total Lotes", "value": len(filtered_lotes), "icon": "🐷", "color": "primary"},
+                    {"label": "Total Lotes", "value": st.session_state.get("lotes_total", len(filtered_lotes)), "icon": "🐷", "color": "primary"},
                     {"label": "Total Animales", "value": f"{total_animales:,}", "icon": "🐖", "color": "success"},
                     {"label": "Peso Promedio", "value": f"{peso_prom:.2f} kg", "icon": "⚖️", "color": "warning"},
                     {"label": "Precio Promedio", "value": f"{precio_prom:.2f} Bs/kg", "icon": "💰", "color": "info"},
@@ -120,7 +153,10 @@ with tab1:
                 
                 # Tabla de datos
                 if filtered_lotes:
-                    st.markdown(f"**Mostrando {len(filtered_lotes)} lote(s)**")
+                    total_lotes = st.session_state.get("lotes_total")
+                    pagina = len(cursores)
+                    texto_total = f" de {total_lotes:,}" if total_lotes is not None else ""
+                    st.markdown(f"**Mostrando {len(filtered_lotes)} lote(s){texto_total} · Página {pagina}**")
                     
                     df_data = []
                     for lote in filtered_lotes:
@@ -157,6 +193,16 @@ with tab1:
                         hide_index=True,
                         height=500
                     )
+                    
+                    col_prev, _, col_next = st.columns([1, 2, 1])
+                    with col_prev:
+                        if len(cursores) > 1 and st.button("⬅️ Anterior", use_container_width=True):
+                            cursores.pop()
+                            st.rerun()
+                    with col_next:
+                        if result.get("next_cursor") and st.button("Siguiente ➡️", use_container_width=True):
+                            cursores.append(result["next_cursor"])
+                            st.rerun()
                 else:
                     empty_state_modern(
                         icon="🔍",
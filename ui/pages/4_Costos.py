@@ -359,6 +359,63 @@ with tab2:
                                 type="error"
                             )
 
+        # Factura completa: varias líneas en una sola llamada a la API
+        st.markdown("<br>", unsafe_allow_html=True)
+        with st.expander("🧾 Registrar factura completa (varias líneas)"):
+            st.caption("Agrega una fila por línea de la factura; se registran todas juntas o ninguna.")
+            tipo_nombres = list(tipo_options.keys())
+            factura_df = st.data_editor(
+                pd.DataFrame({
+                    "Tipo de Costo": pd.Series([tipo_nombres[0]], dtype="object"),
+                    "Monto (Bs.)": [0.0],
+                    "Fecha": [datetime.now().date()],
+                    "Descripción": [""],
+                }),
+                num_rows="dynamic",
+                use_container_width=True,
+                key="factura_editor",
+                column_config={
+                    "Tipo de Costo": st.column_config.SelectboxColumn(options=tipo_nombres, required=True),
+                    "Monto (Bs.)": st.column_config.NumberColumn(min_value=0.0, step=0.01, format="%.2f", required=True),
+                    "Fecha": st.column_config.DateColumn(required=True),
+                    "Descripción": st.column_config.TextColumn(max_chars=200),
+                },
+            )
+            
+            if st.button("✅ Registrar Factura", type="primary", use_container_width=True):
+                lineas = factura_df.dropna(subset=["Tipo de Costo", "Monto (Bs.)", "Fecha"])
+                lineas = lineas[lineas["Monto (Bs.)"] > 0]
+                if lineas.empty:
+                    alert_modern("Agrega al menos una línea con monto mayor a 0", "error")
+                else:
+                    costos_data = [
+                        {
+                            "id_tipo_costo": tipo_options[row["Tipo de Costo"]],
+                            "monto": float(row["Monto (Bs.)"]),
+                            "fecha_gasto": pd.Timestamp(row["Fecha"]).date().isoformat(),
+                            "descripcion": row["Descripción"] if pd.notna(row["Descripción"]) and row["Descripción"] else None,
+                        }
+                        for _, row in lineas.iterrows()
+                    ]
+                    with st.spinner(f"Registrando {len(costos_data)} líneas..."):
+                        result = api.create_costos_bulk(selected_lote_id, costos_data)
+                    
+                    if result["success"]:
+                        total = sum(c["monto"] for c in costos_data)
+                        alert_modern(
+                            message=f"{result['data']['costos_creados']} costos registrados: Bs. {total:,.2f}",
+                            type="success",
+                            title="¡Factura registrada!"
+                        )
+                    else:
+                        detalle = "; ".join(
+                            f"Línea {e['indice'] + 1}: {e['mensaje']}" for e in result.get("errores", [])
+                        )
+                        alert_modern(
+                            message=f"Error: {detalle or result.get('error', 'Error desconocido')}",
+                            type="error"
+                        )
+
 # ========== TAB 3: EDITAR ==========
 
 with tab3:
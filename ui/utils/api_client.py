@@ -1,9 +1,11 @@
 """
 Cliente API para comunicarse con el backend Flask
 """
+import random
 import requests
 import streamlit as st
 import sys
+import time
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 
@@ -13,11 +15,21 @@ sys.path.insert(0, str(ui_dir))
 
 from config import (
     LOGIN_ENDPOINT,
+    LOGOUT_ENDPOINT,
+    REFRESH_ENDPOINT,
     LOTES_ENDPOINT,
     TIPOS_COSTO_ENDPOINT,
     PREDICT_ENDPOINT,
     DASHBOARD_OVERVIEW_ENDPOINT,
-    SESSION_TOKEN
+    DASHBOARD_OCUPACION_ENDPOINT,
+    SESSION_TOKEN,
+    SESSION_TOKEN_EXPIRA,
+    SESSION_REFRESH_TOKEN,
+    SESSION_HTTP_CACHE,
+    TOKEN_REFRESH_MARGIN_SECONDS,
+    HTTP_CACHE_MAX_ENTRADAS,
+    LOGIN_REINTENTOS,
+    LOGIN_REINTENTO_MAX_SECONDS
 )
 
 class APIClient:
@@ -27,13 +39,39 @@ class APIClient:
         self.base_url = st.session_state.get("api_base_url", "http://127.0.0.1:8000")
     
     def _get_headers(self) -> Dict[str, str]:
-        """Obtiene los headers con el token de autenticación"""
+        """Obtiene los headers con el token de autenticación (renovándolo si está por vencer)"""
+        expira_en = st.session_state.get(SESSION_TOKEN_EXPIRA)
+        if (st.session_state.get(SESSION_TOKEN) and expira_en
+                and expira_en - time.time() < TOKEN_REFRESH_MARGIN_SECONDS):
+            self._refrescar_token()
         token = st.session_state.get(SESSION_TOKEN)
         headers = {"Content-Type": "application/json"}
         if token:
             headers["Authorization"] = f"Bearer {token}"
         return headers
     
+    def _get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 30) -> requests.Response:
+        """
+        GET condicional: reenvía el ETag de la última respuesta a la misma URL
+        y, si la API responde 304 (sin cambios), devuelve esa respuesta guardada.
+        """
+        cache = st.session_state.setdefault(SESSION_HTTP_CACHE, {})
+        clave = (url, tuple(sorted((params or {}).items())))
+        headers = self._get_headers()
+        anterior = cache.get(clave)
+        if anterior is not None:
+            headers["If-None-Match"] = anterior.headers["ETag"]
+
+        response = requests.get(url, headers=headers, params=params, timeout=timeout)
+        if response.status_code == 304 and anterior is not None:
+            return anterior
+        cache.pop(clave, None)
+        if response.status_code == 200 and response.headers.get("ETag"):
+            cache[clave] = response
+            while len(cache) > HTTP_CACHE_MAX_ENTRADAS:
+                cache.pop(next(iter(cache)))
+        return response
+
     def _handle_response(self, response: requests.Response) -> Dict[str, Any]:
         """Maneja la respuesta de la API"""
         try:
@@ -80,51 +118,130 @@ class APIClient:
     
     # Authentication
     def login(self, email: str, password: str) -> Dict[str, Any]:
-        """Inicia sesión en la API"""
+        """
+        Inicia sesión en la API. Si la API responde 503 (todos los cupos de
+        login ocupados, p. ej. al cambio de turno) reintenta tras el
+        Retry-After, hasta LOGIN_REINTENTOS veces.
+        """
         try:
-            response = requests.post(
-                LOGIN_ENDPOINT,
-                json={"email": email, "password": password},
-                headers={"Content-Type": "application/json"}
-            )
+            for intento in range(LOGIN_REINTENTOS + 1):
+                response = requests.post(
+                    LOGIN_ENDPOINT,
+                    json={"email": email, "password": password},
+                    headers={"Content-Type": "application/json"},
+                    timeout=30
+                )
+                if response.status_code != 503 or intento == LOGIN_REINTENTOS:
+                    break
+                time.sleep(self._retry_after(response))
             result = self._handle_response(response)
             if result["success"]:
-                token = result["data"].get("access_token")
+                self._guardar_tokens(result["data"])
                 user = result["data"].get("user")
-                st.session_state[SESSION_TOKEN] = token
                 st.session_state["user"] = user
                 st.session_state["authenticated"] = True
             return result
         except Exception as e:
             return {"success": False, "error": f"Error de conexión: {str(e)}"}
     
+    @staticmethod
+    def _retry_after(response: requests.Response) -> float:
+        """Segundos del header Retry-After (acotados), con un poco de azar para no reintentar todos juntos"""
+        try:
+            espera = float(response.headers.get("Retry-After", 1))
+        except ValueError:
+            espera = 1.0
+        return min(max(espera, 0.0), LOGIN_REINTENTO_MAX_SECONDS) + random.uniform(0, 0.5)
+
+    def _guardar_tokens(self, data: Dict[str, Any]) -> None:
+        """Guarda el access token (y el refresh token si vino) con su vencimiento"""
+        st.session_state[SESSION_TOKEN] = data.get("access_token")
+        st.session_state[SESSION_TOKEN_EXPIRA] = time.time() + float(data.get("expires_in") or 3600)
+        if data.get("refresh_token"):
+            st.session_state[SESSION_REFRESH_TOKEN] = data["refresh_token"]
+
+    def _refrescar_token(self) -> bool:
+        """
+        Pide un access token nuevo con el refresh token (sin contraseña).
+        Si falla, se mantiene el token actual; al vencer, la API responde 401
+        y se vuelve al login.
+        """
+        refresh_token = st.session_state.get(SESSION_REFRESH_TOKEN)
+        if not refresh_token:
+            return False
+        try:
+            response = requests.post(REFRESH_ENDPOINT, json={"refresh_token": refresh_token}, timeout=10)
+        except requests.RequestException:
+            return False
+        if response.status_code != 200:
+            if response.status_code == 401:
+                st.session_state[SESSION_REFRESH_TOKEN] = None  # Vencido o revocado
+            return False
+        self._guardar_tokens(response.json())
+        return True
+
     def logout(self):
         """Cierra sesión"""
+        # Revocar los tokens en la API (si falla, igual se cierra la sesión local)
+        if st.session_state.get(SESSION_TOKEN):
+            try:
+                requests.post(
+                    LOGOUT_ENDPOINT,
+                    json={"refresh_token": st.session_state.get(SESSION_REFRESH_TOKEN)},
+                    headers=self._get_headers(),
+                    timeout=5
+                )
+            except requests.RequestException:
+                pass
         # Limpiar session_state (sin cookies ni localStorage)
         st.session_state[SESSION_TOKEN] = None
+        st.session_state[SESSION_TOKEN_EXPIRA] = None
+        st.session_state[SESSION_REFRESH_TOKEN] = None
+        st.session_state[SESSION_HTTP_CACHE] = {}
         st.session_state["user"] = None
         st.session_state["authenticated"] = False
     
     # Lotes
-    def get_lotes(self, limit: int = 50) -> Dict[str, Any]:
-        """Obtiene lotes con límite por defecto para evitar timeouts"""
+    def get_lotes(self, limit: int = 50, cursor: Optional[str] = None, **filtros) -> Dict[str, Any]:
+        """
+        Obtiene una página de lotes. Los filtros (orden, id_lote, desde, hasta,
+        ubicacion_origen, min_animales, max_animales, con_produccion) se aplican
+        en el servidor. El resultado incluye "next_cursor" para pedir la página
+        siguiente y "total" (solo en la primera página).
+        """
         try:
             params = {"limit": limit} if limit else {}
-            response = requests.get(
-                LOTES_ENDPOINT, 
-                headers=self._get_headers(),
-                params=params,
-                timeout=30  # Timeout de 30 segundos
-            )
-            return self._handle_response(response)
+            if cursor:
+                params["cursor"] = cursor
+            for clave, valor in filtros.items():
+                if valor is None or valor == "":
+                    continue
+                params[clave] = str(valor).lower() if isinstance(valor, bool) else valor
+            response = self._get(LOTES_ENDPOINT, params=params, timeout=30)
+            result = self._handle_response(response)
+            if result["success"]:
+                result["next_cursor"] = response.headers.get("X-Next-Cursor")
+                total = response.headers.get("X-Total-Count")
+                result["total"] = int(total) if total else None
+            return result
         except Exception as e:
             return {"success": False, "error": f"Error de conexión: {str(e)}"}
     
     def get_dashboard_overview(self) -> Dict[str, Any]:
         """Obtiene datos consolidados para el dashboard"""
         try:
+            response = self._get(DASHBOARD_OVERVIEW_ENDPOINT, timeout=30)
+            return self._handle_response(response)
+        except Exception as e:
+            return {"success": False, "error": f"Error de conexión: {str(e)}"}
+    
+    def get_dashboard_ocupacion(self, desde: Optional[str] = None, hasta: Optional[str] = None) -> Dict[str, Any]:
+        """Obtiene la serie diaria de ocupacion de la granja (animales en +/- 7 dias)"""
+        try:
+            params = {k: v for k, v in (("desde", desde), ("hasta", hasta)) if v}
             response = requests.get(
-                DASHBOARD_OVERVIEW_ENDPOINT,
+                DASHBOARD_OCUPACION_ENDPOINT,
+                params=params,
                 headers=self._get_headers(),
                 timeout=30
             )
@@ -144,6 +261,31 @@ class APIClient:
         except Exception as e:
             return {"success": False, "error": f"Error de conexión: {str(e)}"}
     
+    def import_lotes(self, contenido: bytes, formato: str = "csv", atomico: bool = False) -> Dict[str, Any]:
+        """Importa lotes en bloque desde un archivo CSV o NDJSON"""
+        try:
+            headers = self._get_headers()
+            headers["Content-Type"] = "text/csv" if formato == "csv" else "application/x-ndjson"
+            response = requests.post(
+                f"{LOTES_ENDPOINT}/import",
+                data=contenido,
+                params={"formato": formato, "atomico": "true" if atomico else "false"},
+                headers=headers,
+                timeout=300
+            )
+            # 200 = importación parcial (con errores por fila), 422 = atómica abortada
+            if response.status_code in (200, 422):
+                try:
+                    data = response.json()
+                    return {"success": response.status_code == 200, "data": data,
+                            "error": f"{data.get('errores_total', 0)} filas con errores",
+                            "status_code": response.status_code}
+                except ValueError:
+                    pass
+            return self._handle_response(response)
+        except Exception as e:
+            return {"success": False, "error": f"Error de conexión: {str(e)}"}
+    
     def update_lote(self, id_lote: int, lote_data: Dict[str, Any]) -> Dict[str, Any]:
         """Actualiza un lote existente"""
         try:
@@ -171,10 +313,7 @@ class APIClient:
     def get_costos(self, id_lote: int) -> Dict[str, Any]:
         """Obtiene los costos de un lote"""
         try:
-            response = requests.get(
-                f"{LOTES_ENDPOINT}/{id_lote}/costos",
-                headers=self._get_headers()
-            )
+            response = self._get(f"{LOTES_ENDPOINT}/{id_lote}/costos")
             return self._handle_response(response)
         except Exception as e:
             return {"success": False, "error": f"Error de conexión: {str(e)}"}
@@ -191,6 +330,25 @@ class APIClient:
         except Exception as e:
             return {"success": False, "error": f"Error de conexión: {str(e)}"}
     
+    def create_costos_bulk(self, id_lote: int, costos: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Registra varias líneas de costo de un lote en una sola llamada (factura completa)"""
+        try:
+            response = requests.post(
+                f"{LOTES_ENDPOINT}/{id_lote}/costos/bulk",
+                json={"costos": costos},
+                headers=self._get_headers(),
+                timeout=60
+            )
+            result = self._handle_response(response)
+            if not result["success"] and response.status_code == 422:
+                try:
+                    result["errores"] = response.json().get("errores", [])
+                except ValueError:
+                    pass
+            return result
+        except Exception as e:
+            return {"success": False, "error": f"Error de conexión: {str(e)}"}
+    
     def update_costo(self, id_lote: int, id_costo: int, costo_data: Dict[str, Any]) -> Dict[str, Any]:
         """Actualiza un costo"""
         try:
@@ -218,7 +376,7 @@ class APIClient:
     def get_tipos_costo(self) -> Dict[str, Any]:
         """Obtiene todos los tipos de costo"""
         try:
-            response = requests.get(TIPOS_COSTO_ENDPOINT, headers=self._get_headers())
+            response = self._get(TIPOS_COSTO_ENDPOINT)
             return self._handle_response(response)
         except Exception as e:
             return {"success": False, "error": f"Error de conexión: {str(e)}"}
@@ -240,11 +398,7 @@ class APIClient:
         """Obtiene las features de un lote"""
         try:
             params = {"detalle": "true" if detalle else "false"}
-            response = requests.get(
-                f"{LOTES_ENDPOINT}/{id_lote}/features",
-                params=params,
-                headers=self._get_headers()
-            )
+            response = self._get(f"{LOTES_ENDPOINT}/{id_lote}/features", params=params)
             return self._handle_response(response)
         except Exception as e:
             return {"success": False, "error": f"Error de conexión: {str(e)}"}